@@ -0,0 +1,103 @@
+"""Compares the capacity-indexed best fit session lookup against the original
+linear scan through all of the sessions in the schedule.
+
+Run from the project directory:
+
+    python3 -m benchmarks.bench_best_fit
+"""
+
+import argparse
+import random
+import time
+
+from sort_talks import ConferenceSchedule, Talk, TRACK_DURATION
+
+
+class LinearScanConferenceSchedule(ConferenceSchedule):
+    """The original implementation, which scans through all of the sessions
+    for every talk."""
+
+    def find_best_fit_session(self, talk):
+        best_morning_session, best_afternoon_session = None, None
+        min_morning_wasted_time, min_afternoon_wasted_time = TRACK_DURATION, TRACK_DURATION
+        for session in self.get_all_sessions():
+            wasted_time = session.wasted_time - talk.duration
+            if session.is_morning_session:
+                if wasted_time >= 0 and wasted_time < min_morning_wasted_time:
+                    best_morning_session = session
+                    min_morning_wasted_time = wasted_time
+            else:
+                if wasted_time >= 0 and wasted_time < min_afternoon_wasted_time:
+                    best_afternoon_session = session
+                    min_afternoon_wasted_time = wasted_time
+        if best_morning_session and best_afternoon_session:
+            if best_afternoon_session.track.track_no < best_morning_session.track.track_no:
+                return best_afternoon_session
+        if best_morning_session:
+            return best_morning_session
+        return best_afternoon_session
+
+    def find_best_fit_session_prefer_mornings(self, talk):
+        best_session = None
+        min_wasted_time = TRACK_DURATION
+        for session in self.get_all_sessions():
+            wasted_time = session.wasted_time - talk.duration
+            if wasted_time >= 0 and wasted_time < min_wasted_time:
+                best_session = session
+                min_wasted_time = wasted_time
+        return best_session
+
+
+def generate_talks(count, seed):
+    rng = random.Random(seed)
+    durations = [5, 15, 30, 40, 45, 60]
+    return [Talk("Talk %d" % i, rng.choice(durations)) for i in range(count)]
+
+
+def time_add_talks(schedule_cls, talks, prefer_mornings):
+    schedule = schedule_cls(prefer_mornings=prefer_mornings)
+    start = time.perf_counter()
+    schedule.add_talks(talks)
+    return time.perf_counter() - start, len(schedule.tracks)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000,100000",
+        help="Comma-separated list of talk counts to benchmark (default: 1000,10000,100000)."
+    )
+    parser.add_argument(
+        "--max-linear",
+        type=int,
+        default=100000,
+        help="Skip the linear scan for inputs with more than this many talks, " +
+            "since it is quadratic (default: 100000)."
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the talk durations.")
+    args = parser.parse_args()
+
+    print("%10s %16s %12s %12s %10s %8s" % ("talks", "strategy", "linear (s)", "indexed (s)", "speedup", "tracks"))
+    for size in [int(size) for size in args.sizes.split(",")]:
+        talks = generate_talks(size, args.seed)
+        for prefer_mornings in (False, True):
+            indexed, tracks = time_add_talks(ConferenceSchedule, talks, prefer_mornings)
+            if size <= args.max_linear:
+                linear, linear_tracks = time_add_talks(LinearScanConferenceSchedule, talks, prefer_mornings)
+                assert tracks == linear_tracks
+                linear_str, speedup_str = "%.3f" % linear, "%.1fx" % (linear / indexed)
+            else:
+                linear_str, speedup_str = "skipped", "-"
+            print("%10d %16s %12s %12.3f %10s %8d" % (
+                size,
+                "prefer-mornings" if prefer_mornings else "default",
+                linear_str,
+                indexed,
+                speedup_str,
+                tracks
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Compares scheduling talks with speaker and track constraints against
+scheduling the same talks without them, to check that the constraint checks
+stay cheap as conferences grow.
+
+Run from the project directory:
+
+    python3 -m benchmarks.bench_constraints
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.generators import generate_durations
+from sort_talks import ConferenceSchedule, ScheduleStats, Talk, TalkConstraints
+
+
+def generate_talks(count, mix, seed, talks_per_speaker, apart_fraction):
+    """Generates talks where each speaker gives talks_per_speaker talks, every
+    tenth talk is in a group of three that must share a track, and the given
+    fraction of the rest have one of count // 20 apart tags."""
+    rng = random.Random(seed)
+    talks = []
+    for i, duration in enumerate(generate_durations(mix, count, seed)):
+        together = ["group %d" % (i // 30)] if i % 10 == 0 else []
+        apart = ["panel %d" % rng.randrange(max(count // 20, 1))] \
+            if not together and rng.random() < apart_fraction else []
+        constraints = TalkConstraints(["speaker %d" % (i // talks_per_speaker)], together, apart)
+        talks.append(Talk("Talk %d" % i, duration, constraints=constraints))
+    return talks
+
+
+def time_add_talks(talks, prefer_mornings):
+    stats = ScheduleStats()
+    schedule = ConferenceSchedule(prefer_mornings=prefer_mornings, hooks=stats)
+    start = time.perf_counter()
+    schedule.add_talks(talks)
+    return time.perf_counter() - start, len(schedule.tracks), stats.sessions_scanned / max(stats.talks_placed, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000,20000,50000",
+        help="Comma-separated list of talk counts to benchmark (default: 1000,10000,20000,50000)."
+    )
+    parser.add_argument("--mix", default="sixty", help="The duration mix of the talks (default: sixty).")
+    parser.add_argument(
+        "--talks-per-speaker",
+        type=int,
+        default=3,
+        help="How many talks each speaker gives (default: 3)."
+    )
+    parser.add_argument(
+        "--apart-fraction",
+        type=float,
+        default=0.2,
+        help="The fraction of the talks that have an apart tag (default: 0.2)."
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the talks.")
+    args = parser.parse_args()
+
+    print("%10s %16s %14s %14s %10s %16s %14s" % (
+        "talks", "strategy", "plain (s)", "constrained (s)", "slowdown", "tracks", "scanned/talk"))
+    for size in [int(size) for size in args.sizes.split(",")]:
+        talks = generate_talks(size, args.mix, args.seed, args.talks_per_speaker, args.apart_fraction)
+        plain_talks = [Talk(talk.title, talk.duration) for talk in talks]
+        for prefer_mornings in (False, True):
+            plain, plain_tracks, plain_scanned = time_add_talks(plain_talks, prefer_mornings)
+            constrained, tracks, scanned = time_add_talks(talks, prefer_mornings)
+            print("%10d %16s %14.3f %14.3f %9.1fx %16s %14s" % (
+                size,
+                "prefer-mornings" if prefer_mornings else "default",
+                plain,
+                constrained,
+                constrained / plain,
+                "%d -> %d" % (plain_tracks, tracks),
+                "%.1f -> %.1f" % (plain_scanned, scanned)
+            ))
+
+
+if __name__ == "__main__":
+    main()
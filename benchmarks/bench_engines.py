@@ -0,0 +1,78 @@
+"""Compares the time taken to pack the talks of synthetic conferences (see
+benchmarks.generators) by pack_duration_counts() and
+pack_duration_counts_numpy(), and to schedule them with each of the engines,
+for each mix of talk durations.
+
+Run from the project directory:
+
+    python3 -m benchmarks.bench_engines
+"""
+
+import argparse
+import time
+
+from benchmarks.generators import MIXES, generate_durations, generate_talks
+from sort_talks import ConferenceSchedule, numpy, pack_duration_counts, pack_duration_counts_numpy
+
+
+def time_call(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def time_engine(engine, talks):
+    return time_call(ConferenceSchedule(engine=engine).add_talks, talks)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        default="10000,100000,1000000",
+        help="Comma-separated list of talk counts to benchmark (default: 10000,100000,1000000)."
+    )
+    parser.add_argument(
+        "--mixes",
+        default=",".join(sorted(MIXES)),
+        help="Comma-separated list of duration mixes to benchmark (default: %s)." % ",".join(sorted(MIXES))
+    )
+    parser.add_argument(
+        "--skip-bfd",
+        action="store_true",
+        help="Don't time the bfd engine, which is slow for large numbers of talks."
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the talks.")
+    args = parser.parse_args()
+    if numpy is None:
+        print("NumPy isn't installed, so the numpy engine falls back to the multiset engine")
+
+    mixes = args.mixes.split(",")
+    for mix in mixes:
+        if mix not in MIXES:
+            raise Exception("Unknown duration mix: %s (expected one of %s)" % (mix, ", ".join(sorted(MIXES))))
+
+    print("%10s %10s %14s %14s %10s %12s %14s %12s" % (
+        "mix", "talks", "pack (s)", "pack numpy (s)", "speedup", "bfd (s)", "multiset (s)", "numpy (s)"
+    ))
+    for mix in mixes:
+        for size in [int(size) for size in args.sizes.split(",")]:
+            duration_counts = {}
+            for duration in generate_durations(mix, size, args.seed):
+                duration_counts[duration] = duration_counts.get(duration, 0) + 1
+            pack_time = time_call(pack_duration_counts, duration_counts)
+            numpy_pack_time = time_call(pack_duration_counts_numpy, duration_counts) if numpy is not None else None
+            talks = generate_talks(mix, size, args.seed)
+            print("%10s %10d %14.3f %14s %10s %12s %14.3f %12.3f" % (
+                mix,
+                size,
+                pack_time,
+                "-" if numpy_pack_time is None else "%.3f" % numpy_pack_time,
+                "-" if numpy_pack_time is None else "%.1fx" % (pack_time / numpy_pack_time),
+                "-" if args.skip_bfd else "%.3f" % time_engine("bfd", talks),
+                time_engine("multiset", talks),
+                time_engine("numpy", talks)
+            ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Measures the memory used to read talks from a file and schedule them, using
+tracemalloc.
+
+Run from the project directory:
+
+    python3 -m benchmarks.bench_memory
+"""
+
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from sort_talks import ConferenceSchedule, read_talks_from_file
+
+
+def write_talks_file(filename, count, seed, title_pool=0):
+    rng = random.Random(seed)
+    durations = ["lightning", "15min", "30min", "45min", "60min"]
+    with open(filename, "wt", encoding="utf-8") as outf:
+        for i in range(count):
+            title_no = rng.randrange(title_pool) if title_pool else i
+            outf.write("Talk number %d about topic %d %s\n" % (title_no, title_no % 100, rng.choice(durations)))
+
+
+def measure(filename, engine):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    talks = [talk for talk in read_talks_from_file(filename)]
+    schedule = ConferenceSchedule(engine=engine)
+    schedule.add_talks(talks)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    # how much memory the schedule itself retains once the talks are gone
+    del talks
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, retained, elapsed, len(schedule.tracks)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        default="10000,100000",
+        help="Comma-separated list of talk counts to benchmark (default: 10000,100000)."
+    )
+    parser.add_argument("--engine", default="bfd", help="The scheduling engine to use (default: bfd).")
+    parser.add_argument(
+        "--title-pool",
+        type=int,
+        default=0,
+        help="Pick the talks' titles from this many distinct titles, instead " +
+            "of giving every talk a unique title (default: 0)."
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the talks.")
+    args = parser.parse_args()
+
+    print("%10s %14s %14s %12s %12s %8s" % ("talks", "peak (MiB)", "retained (MiB)", "bytes/talk", "time (s)", "tracks"))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in [int(size) for size in args.sizes.split(",")]:
+            filename = os.path.join(tmp_dir, "talks-%d.txt" % size)
+            write_talks_file(filename, size, args.seed, title_pool=args.title_pool)
+            peak, retained, elapsed, tracks = measure(filename, args.engine)
+            print("%10d %14.1f %14.1f %12.1f %12.3f %8d" % (
+                size,
+                peak / 2**20,
+                retained / 2**20,
+                retained / size,
+                elapsed,
+                tracks
+            ))
+
+
+if __name__ == "__main__":
+    main()
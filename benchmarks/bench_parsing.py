@@ -0,0 +1,83 @@
+"""Compares reading a talk file with the read_talks_from_file() generator
+against the bulk read_talk_catalog() parser, and against loading a catalog
+compiled from the talk file with CompiledTalkCatalog.compile().
+
+Run from the project directory:
+
+    python3 -m benchmarks.bench_parsing
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.bench_memory import write_talks_file
+from sort_talks import CompiledTalkCatalog, read_talk_catalog, read_talks_from_file
+
+
+def time_reader(reader, filename):
+    start = time.perf_counter()
+    talks = reader(filename)
+    return time.perf_counter() - start, len(talks)
+
+
+def read_talk_list(filename):
+    return list(read_talks_from_file(filename))
+
+
+def read_catalog_talk_list(filename):
+    return list(read_talk_catalog(filename))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        default="10000,100000,1000000",
+        help="Comma-separated list of line counts to benchmark (default: 10000,100000,1000000)."
+    )
+    parser.add_argument(
+        "--title-pool",
+        type=int,
+        default=0,
+        help="Pick the talks' titles from this many distinct titles, instead " +
+            "of giving every talk a unique title (default: 0)."
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the talks.")
+    args = parser.parse_args()
+
+    # "catalog" only parses the file, while "catalog talks" also creates Talk
+    # instances from the catalog, like the generator does, and likewise for
+    # "compiled" and "compiled talks" with the compiled catalog
+    print("%10s %14s %14s %10s %16s %14s %14s %16s" % (
+        "lines", "generator (s)", "catalog (s)", "speedup", "catalog talks (s)",
+        "compile (s)", "compiled (s)", "compiled talks (s)"))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in [int(size) for size in args.sizes.split(",")]:
+            filename = os.path.join(tmp_dir, "talks-%d.txt" % size)
+            write_talks_file(filename, size, args.seed, title_pool=args.title_pool)
+            generator_time, generator_count = time_reader(read_talk_list, filename)
+            catalog_time, catalog_count = time_reader(read_talk_catalog, filename)
+            talks_time, _ = time_reader(read_catalog_talk_list, filename)
+            compiled_filename = os.path.join(tmp_dir, "talks-%d.catalog" % size)
+            start = time.perf_counter()
+            CompiledTalkCatalog.compile(filename, compiled_filename)
+            compile_time = time.perf_counter() - start
+            compiled_time, compiled_count = time_reader(read_talk_catalog, compiled_filename)
+            compiled_talks_time, _ = time_reader(read_catalog_talk_list, compiled_filename)
+            assert generator_count == catalog_count == compiled_count
+            print("%10d %14.3f %14.3f %9.1fx %16.3f %14.3f %14.6f %16.3f" % (
+                size,
+                generator_time,
+                catalog_time,
+                generator_time / catalog_time,
+                talks_time,
+                compile_time,
+                compiled_time,
+                compiled_talks_time
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compares packing a single large conference in shards (across as many
+worker processes as there are shards) against packing it in one go with
+ConferenceSchedule.add_talks(), showing the speedup and how many more tracks
+and wasted minutes the sharded schedules have.
+
+Run from the project directory:
+
+    python3 -m benchmarks.bench_sharding
+"""
+
+import argparse
+import os
+import time
+
+from benchmarks.generators import MIXES, generate_talks
+from sort_talks import ConferenceSchedule, schedule_sharded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        default="100000,1000000",
+        help="Comma-separated list of talk counts to benchmark (default: 100000,1000000)."
+    )
+    parser.add_argument(
+        "--shards",
+        default="2,4,8",
+        help="Comma-separated list of shard counts to benchmark (default: 2,4,8)."
+    )
+    parser.add_argument("--mix", default="uniform", choices=sorted(MIXES), help="The duration mix of the talks.")
+    parser.add_argument("--engine", default="bfd", help="The engine with which to pack each shard (default: bfd).")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the talk durations.")
+    args = parser.parse_args()
+
+    print("(%d CPUs available)" % os.cpu_count())
+    print("%10s %8s %12s %10s %16s %16s" % ("talks", "shards", "time (s)", "speedup", "tracks", "wasted (mins)"))
+    for size in [int(size) for size in args.sizes.split(",")]:
+        talks = generate_talks(args.mix, size, args.seed)
+        start = time.perf_counter()
+        schedule = ConferenceSchedule()
+        schedule.add_talks(talks)
+        single = time.perf_counter() - start
+        tracks, wasted_time = len(schedule.tracks), schedule.get_wasted_time()
+        print("%10d %8d %12.3f %10s %16d %16d" % (size, 1, single, "-", tracks, wasted_time))
+        for shards in [int(shards) for shards in args.shards.split(",")]:
+            start = time.perf_counter()
+            schedule = schedule_sharded(talks, shards, workers=shards, engine=args.engine)
+            elapsed = time.perf_counter() - start
+            print("%10d %8d %12.3f %9.1fx %16s %16s" % (
+                size,
+                shards,
+                elapsed,
+                single / elapsed,
+                "%d (%+d)" % (len(schedule.tracks), len(schedule.tracks) - tracks),
+                "%d (%+d)" % (schedule.get_wasted_time(), schedule.get_wasted_time() - wasted_time)
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compares the cost of keeping a copy of a schedule using
+ConferenceSchedule.copy_of() with taking (and restoring) a snapshot, as the
+schedule grows but the number of changes between copies stays the same.
+
+Run from the project directory:
+
+    python3 -m benchmarks.bench_snapshots
+"""
+
+import argparse
+import random
+import time
+
+from sort_talks import ConferenceSchedule, LocalSearch, Talk
+
+
+def make_schedule(count, seed):
+    rng = random.Random(seed)
+    talks = [Talk("Talk %d" % i, rng.choice([5, 15, 30, 45, 60])) for i in range(count)]
+    schedule = ConferenceSchedule()
+    schedule.add_talks(talks)
+    return schedule
+
+
+def time_per_call(function, make_changes, repeats):
+    """Times the function after each of the given number of rounds of
+    changes, not counting the time taken to make the changes."""
+    elapsed = 0
+    for _ in range(repeats):
+        make_changes()
+        start = time.perf_counter()
+        function()
+        elapsed += time.perf_counter() - start
+    return elapsed / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000,100000",
+        help="Comma-separated list of talk counts to benchmark (default: 1000,10000,100000)."
+    )
+    parser.add_argument(
+        "--moves",
+        type=int,
+        default=10,
+        help="The number of local search iterations between copies (default: 10)."
+    )
+    parser.add_argument("--repeats", type=int, default=20, help="The number of copies to time (default: 20).")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the talks.")
+    args = parser.parse_args()
+
+    print("%10s %8s %14s %14s %14s %14s" % (
+        "talks", "tracks", "copy_of (ms)", "first (ms)", "snapshot (ms)", "restore (ms)"
+    ))
+    for size in [int(size) for size in args.sizes.split(",")]:
+        schedule = make_schedule(size, args.seed)
+        local_search = LocalSearch(schedule, seed=args.seed)
+
+        def make_changes():
+            local_search.run(60.0, max_iterations=local_search.iterations + args.moves)
+
+        copy_time = time_per_call(lambda: ConferenceSchedule.copy_of(schedule), make_changes, args.repeats)
+        # the first snapshot has to look at every track
+        start = time.perf_counter()
+        schedule.snapshot()
+        first_snapshot_time = time.perf_counter() - start
+        snapshot_time = time_per_call(schedule.snapshot, make_changes, args.repeats)
+        snapshot = schedule.snapshot()
+        restore_time = time_per_call(lambda: schedule.restore(snapshot), make_changes, args.repeats)
+        print("%10d %8d %14.3f %14.3f %14.3f %14.3f" % (
+            size,
+            len(schedule.tracks),
+            copy_time * 1000,
+            first_snapshot_time * 1000,
+            snapshot_time * 1000,
+            restore_time * 1000
+        ))
+
+
+if __name__ == "__main__":
+    main()
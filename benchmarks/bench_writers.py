@@ -0,0 +1,54 @@
+"""Measures the time and peak memory (via tracemalloc) used to write out a
+schedule in each of the output formats, compared with building str(schedule).
+
+Run from the project directory:
+
+    python3 -m benchmarks.bench_writers
+"""
+
+import argparse
+import os
+import random
+import time
+import tracemalloc
+
+from sort_talks import SCHEDULE_WRITERS, ConferenceSchedule, Talk, write_schedule
+
+
+def measure(function):
+    # tracing slows everything down, so the time is measured separately
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        default="10000,100000",
+        help="Comma-separated list of talk counts to benchmark (default: 10000,100000)."
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the talks.")
+    args = parser.parse_args()
+
+    print("%10s %8s %10s %10s %16s" % ("talks", "tracks", "format", "time (s)", "peak (MiB)"))
+    for size in [int(size) for size in args.sizes.split(",")]:
+        rng = random.Random(args.seed)
+        schedule = ConferenceSchedule(engine="multiset")
+        schedule.add_talks([Talk("Talk number %d" % i, rng.choice([5, 15, 30, 45, 60])) for i in range(size)])
+        results = [("str()", measure(lambda: str(schedule)))]
+        with open(os.devnull, "wt", encoding="utf-8") as outf:
+            for format in sorted(SCHEDULE_WRITERS):
+                results.append((format, measure(lambda: write_schedule(schedule, outf, format=format))))
+        for format, (elapsed, peak) in results:
+            print("%10d %8d %10s %10.3f %16.2f" % (size, len(schedule.tracks), format, elapsed, peak / 2**20))
+
+
+if __name__ == "__main__":
+    main()
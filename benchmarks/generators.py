@@ -0,0 +1,37 @@
+"""Seeded generators for synthetic conferences with realistic mixes of talk
+durations, shared by the benchmarks."""
+
+import random
+
+from sort_talks import LIGHTNING_TALK_DURATION, MAX_TALK_DURATION, Talk
+
+# The relative weights of the talk durations in each mix.
+MIXES = {
+    # mostly lightning talks, with a few longer ones (e.g. a meetup)
+    "lightning": {LIGHTNING_TALK_DURATION: 60, 15: 15, 30: 10, 45: 5, 60: 10},
+    # mostly hour-long talks (e.g. an academic conference)
+    "sixty": {LIGHTNING_TALK_DURATION: 5, 15: 5, 30: 15, 45: 15, 60: 60},
+    # every multiple of 5 minutes up to the maximum is equally likely
+    "uniform": {duration: 1 for duration in range(5, MAX_TALK_DURATION + 1, 5)},
+}
+
+
+def generate_durations(mix, count, seed):
+    """Generates the given number of talk durations from one of the MIXES."""
+    weights = MIXES[mix]
+    rng = random.Random("%s-%d" % (mix, seed))
+    return rng.choices(list(weights), weights=list(weights.values()), k=count)
+
+
+def generate_talks(mix, count, seed):
+    return [
+        Talk("Talk number %d about topic %d" % (i, i % 100), duration)
+        for i, duration in enumerate(generate_durations(mix, count, seed))
+    ]
+
+
+def write_talks_file(filename, talks):
+    """Writes the given talks to a file in the input format."""
+    with open(filename, "wt", encoding="utf-8") as outf:
+        for talk in talks:
+            outf.write("%s %s\n" % (talk.title, talk.get_friendly_duration()))
@@ -0,0 +1,217 @@
+"""Runs the benchmark suite: times reading, scheduling and writing out
+synthetic conferences of different sizes and duration mixes (see
+benchmarks.generators), and saves the results to a JSON file. The results can
+then be compared against a saved baseline to flag regressions.
+
+Run from the project directory:
+
+    python3 -m benchmarks.suite run --output baseline.json
+    # ... make some changes ...
+    python3 -m benchmarks.suite run --output results.json
+    python3 -m benchmarks.suite compare baseline.json results.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.generators import MIXES, generate_talks, write_talks_file
+from sort_talks import ConferenceSchedule, read_talks_from_file
+
+DEFAULT_SIZES = "10,100,1000,10000,100000,1000000"
+# Fast operations are repeated until they've taken at least this long (in
+# seconds) or have been run MAX_REPEATS times, and the fastest run is reported.
+MIN_TIMING = 0.2
+MAX_REPEATS = 50
+# Timings below this (in seconds) are too noisy to flag as regressions.
+MIN_REGRESSION_TIME = 0.001
+
+
+def measure(function, trace_memory=True):
+    """Times the given function and measures its peak memory use.
+
+    Returns:
+        A (result, elapsed_time, peak_memory) tuple, where peak_memory is
+        None if trace_memory is False.
+    """
+    times = []
+    total_time = 0
+    gc.collect()
+    while not times or (total_time < MIN_TIMING and len(times) < MAX_REPEATS):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+        total_time += times[-1]
+    peak = None
+    if trace_memory:
+        # tracing slows everything down, so it has its own run
+        gc.collect()
+        tracemalloc.start()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, min(times), peak
+
+
+def run_suite(sizes, mixes, seed, trace_memory=True, verbose=False):
+    """Runs all of the benchmarks, returning a list of result dictionaries."""
+    results = []
+
+    def add_result(operation, mix, size, elapsed, peak, schedule=None):
+        result = {
+            "name": "%s/%s/%d" % (operation, mix, size),
+            "operation": operation,
+            "mix": mix,
+            "size": size,
+            "time": elapsed,
+            "peak_memory": peak
+        }
+        if schedule is not None:
+            result["tracks"] = len(schedule.tracks)
+            result["wasted"] = schedule.get_wasted_time()
+        results.append(result)
+        if verbose:
+            print("%-40s %10.4fs %12s %s" % (
+                result["name"],
+                elapsed,
+                "-" if peak is None else "%.2fMiB" % (peak / 2**20),
+                "" if schedule is None else "%d tracks, %d mins wasted" % (result["tracks"], result["wasted"])
+            ), file=sys.stderr)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for mix in mixes:
+            for size in sizes:
+                talks = generate_talks(mix, size, seed)
+                filename = os.path.join(tmp_dir, "talks-%s-%d.txt" % (mix, size))
+                write_talks_file(filename, talks)
+
+                _, elapsed, peak = measure(lambda: list(read_talks_from_file(filename)), trace_memory)
+                add_result("read_talks_from_file", mix, size, elapsed, peak)
+
+                schedules = {}
+                for strategy, prefer_mornings in (("tracks", False), ("mornings", True)):
+                    def add_talks():
+                        schedule = ConferenceSchedule(prefer_mornings=prefer_mornings)
+                        schedule.add_talks(talks)
+                        return schedule
+                    schedule, elapsed, peak = measure(add_talks, trace_memory)
+                    schedules[strategy] = schedule
+                    add_result("add_talks[%s]" % strategy, mix, size, elapsed, peak, schedule=schedule)
+
+                schedule = schedules["tracks"]
+                _, elapsed, peak = measure(lambda: str(schedule), trace_memory)
+                add_result("__str__", mix, size, elapsed, peak)
+                _, elapsed, peak = measure(schedule.get_wasted_time, trace_memory)
+                add_result("get_wasted_time", mix, size, elapsed, peak)
+    return results
+
+
+def compare_results(baseline, results, threshold):
+    """Compares the results against a baseline.
+
+    Args:
+        baseline: The baseline results (a list of result dictionaries).
+        results: The new results.
+        threshold: How much slower or larger (as a fraction) a result can be
+            than its baseline before it is flagged as a regression.
+
+    Returns:
+        A list of (name, metric, baseline_value, value) tuples, one for each
+        regression. Any increase in the number of tracks or wasted minutes is
+        a regression.
+    """
+    baseline_results = dict([(result["name"], result) for result in baseline])
+    regressions = []
+    for result in results:
+        base = baseline_results.get(result["name"])
+        if base is None:
+            continue
+        if result["time"] > base["time"]*(1 + threshold) and result["time"] - base["time"] > MIN_REGRESSION_TIME:
+            regressions.append((result["name"], "time", base["time"], result["time"]))
+        if result.get("peak_memory") is not None and base.get("peak_memory") is not None and \
+                result["peak_memory"] > base["peak_memory"]*(1 + threshold):
+            regressions.append((result["name"], "peak_memory", base["peak_memory"], result["peak_memory"]))
+        for metric in ("tracks", "wasted"):
+            if metric in result and metric in base and result[metric] > base[metric]:
+                regressions.append((result["name"], metric, base[metric], result[metric]))
+    return regressions
+
+
+def run(args):
+    sizes = [int(size) for size in args.sizes.split(",")]
+    mixes = args.mixes.split(",")
+    for mix in mixes:
+        if mix not in MIXES:
+            raise Exception("Unknown duration mix: %s (expected one of %s)" % (mix, ", ".join(sorted(MIXES))))
+    results = run_suite(sizes, mixes, args.seed, trace_memory=not args.no_memory, verbose=True)
+    with open(args.output, "wt", encoding="utf-8") as outf:
+        json.dump({
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results
+        }, outf, indent=2)
+    print("Wrote %d results to %s" % (len(results), args.output))
+
+
+def compare(args):
+    with open(args.baseline, "rt", encoding="utf-8") as inf:
+        baseline = json.load(inf)["results"]
+    with open(args.results, "rt", encoding="utf-8") as inf:
+        results = json.load(inf)["results"]
+    regressions = compare_results(baseline, results, args.threshold)
+    for name, metric, base_value, value in regressions:
+        print("REGRESSION %-40s %-12s %14.6g -> %14.6g" % (name, metric, base_value, value))
+    print("%d regression(s) in %d result(s)" % (len(regressions), len(results)))
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Runs the benchmarks and saves the results.")
+    run_parser.add_argument(
+        "--sizes",
+        default=DEFAULT_SIZES,
+        help="Comma-separated list of talk counts to benchmark (default: %s)." % DEFAULT_SIZES
+    )
+    run_parser.add_argument(
+        "--mixes",
+        default=",".join(sorted(MIXES)),
+        help="Comma-separated list of duration mixes to benchmark (default: %s)." % ",".join(sorted(MIXES))
+    )
+    run_parser.add_argument("--seed", type=int, default=42, help="Random seed for the talks.")
+    run_parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="Don't measure peak memory use (which takes an extra run of each benchmark)."
+    )
+    run_parser.add_argument("--output", default="benchmark-results.json", help="The file to which to write the results.")
+
+    compare_parser = subparsers.add_parser("compare", help="Compares results against a baseline.")
+    compare_parser.add_argument("baseline", help="The baseline results file.")
+    compare_parser.add_argument("results", help="The results file to compare against the baseline.")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Flag results that are this much slower or larger than the baseline (default: 0.2)."
+    )
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
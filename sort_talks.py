@@ -1,23 +1,80 @@
 #!/usr/bin/env python3
 
 import argparse
+import asyncio
+import bisect
+import collections
+import concurrent.futures
+import csv
+import hashlib
+import heapq
+import io
+import itertools
+import json
 import random
 import time
 import math
+import mmap
+import operator
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 __all__ = [
     "Talk",
     "TalkSession",
     "TalkTrack",
     "ConferenceSchedule",
+    "CompiledTalkCatalog",
+    "ConstraintIndex",
+    "CsvDaysScheduleWriter",
+    "CsvScheduleWriter",
+    "DayTemplate",
+    "ExactSolver",
+    "PackingRecorder",
+    "ScheduleCache",
+    "ScheduleEditor",
+    "ScheduleService",
+    "JsonScheduleWriter",
+    "LocalSearch",
+    "OnlineScheduler",
+    "ScheduleSnapshot",
+    "ServiceError",
+    "SessionCapacityIndex",
+    "TalkCatalog",
+    "TalkConstraints",
+    "TalkFileError",
+    "TextScheduleWriter",
+    "friendly_time",
+    "bin_lower_bound",
+    "compute_lower_bounds",
+    "distribute_talks",
     "main",
     "minutes_to_friendly_time",
-    "read_talks_from_file"
+    "pack_duration_counts",
+    "pack_duration_counts_numpy",
+    "read_day_templates",
+    "read_talk_catalog",
+    "read_schedule",
+    "read_talks",
+    "read_talks_from_file",
+    "schedule_days",
+    "schedule_sharded",
+    "search_schedules",
+    "write_days",
+    "write_schedule"
 ]
 
-# Some constants. NOTE: Changing these will necessarily also require some code
-# changes, including possibly to the
-# ConferenceSchedule.find_best_fit_session_prefer_mornings() function.
+# Some constants, which describe the default conference day. Days with
+# different hours (e.g. for multi-day events) are described by DayTemplate
+# instances instead.
 DAY_START_HOUR = 9
 LUNCH_START_HOUR = 12
 LUNCH_END_HOUR = 13
@@ -31,6 +88,34 @@ MORNING_SESSION_DURATION = HOURS_BEFORE_LUNCH*60
 AFTERNOON_SESSION_DURATION = HOURS_AFTER_LUNCH*60
 TRACK_DURATION = MORNING_SESSION_DURATION + AFTERNOON_SESSION_DURATION
 
+LIGHTNING_TALK_DURATION = 5
+# How many of the invalid lines in a talk file to include in a TalkFileError's
+# message (all of them are available from its errors attribute).
+MAX_REPORTED_ERRORS = 20
+
+# The default maximum total size (in bytes) of the files in a ScheduleCache.
+DEFAULT_CACHE_MAX_BYTES = 64*2**20
+# The default number of tracks kept open by the OnlineScheduler, and how few
+# minutes a track must waste for it to be closed straight away.
+DEFAULT_OPEN_TRACKS = 8
+DEFAULT_CLOSE_WASTED_TIME = 10
+# The defaults for the ScheduleService's maximum number of packings in
+# progress, and for the number of seconds after which its requests time out.
+DEFAULT_MAX_QUEUE = 64
+DEFAULT_REQUEST_TIMEOUT = 30.0
+
+# The engines that ConferenceSchedule.add_talks() can use to schedule talks.
+ENGINES = ("bfd", "multiset", "numpy")
+# The options (named as per main()'s arguments) that can be given for each
+# conference in a --batch manifest, overriding those on the command line.
+BATCH_OPTIONS = (
+    "shuffle", "prefer_mornings", "engine", "seed", "restarts", "both_strategies", "exact", "time_limit",
+    "improve_ms"
+)
+# How much (as a fraction of each talk's duration) to randomly perturb the
+# order in which talks are placed when restarting the search for a schedule.
+RESTART_PERTURBATION = 0.25
+
 
 def minutes_to_friendly_time(minutes, start_hour=0):
     """Converts the given number of minutes to a friendly time string."""
@@ -46,10 +131,173 @@ def minutes_to_friendly_time(minutes, start_hour=0):
     )
 
 
+# Friendly time strings for every minute of the day, so that writing out large
+# schedules doesn't have to format each time separately.
+FRIENDLY_TIMES = [minutes_to_friendly_time(minutes) for minutes in range(24*60)]
+
+
+def friendly_time(minutes, start_hour=0):
+    """A faster equivalent of minutes_to_friendly_time() for times within the
+    day, which looks the time up in FRIENDLY_TIMES."""
+    minutes += start_hour*60
+    if 0 <= minutes < len(FRIENDLY_TIMES):
+        return FRIENDLY_TIMES[minutes]
+    return minutes_to_friendly_time(minutes)
+
+
+class DayTemplate:
+    """Describes the shape of a conference day: when it starts, when lunch is,
+    and the window in which the networking event starts, from which the
+    lengths of the morning and afternoon sessions follow. Every track on the
+    day has the same shape.
+
+    Attributes:
+        name: An optional name for the day (e.g. "Monday").
+        rooms: The number of rooms (i.e. parallel tracks) available on the
+            day, or None if there's no limit. Talks are distributed across
+            days in proportion to their rooms (see distribute_talks()).
+        start_hour: The hour at which the morning session starts.
+        lunch_start_hour: The hour at which the morning session ends.
+        lunch_end_hour: The hour at which the afternoon session starts.
+        networking_start_hour_min: The earliest hour at which the networking
+            event may start.
+        networking_start_hour_max: The latest hour at which the networking
+            event may start, which is when the afternoon session ends.
+    """
+
+    # the keys of the dictionaries read by from_dict()
+    FIELDS = (
+        "name", "rooms", "start_hour", "lunch_start_hour", "lunch_end_hour", "networking_start_hour_min",
+        "networking_start_hour_max"
+    )
+
+    def __init__(self, name=None, rooms=None, start_hour=DAY_START_HOUR, lunch_start_hour=LUNCH_START_HOUR,
+                 lunch_end_hour=LUNCH_END_HOUR, networking_start_hour_min=NETWORKING_START_HOUR_MIN,
+                 networking_start_hour_max=NETWORKING_START_HOUR_MAX):
+        if not 0 <= start_hour < lunch_start_hour <= lunch_end_hour < networking_start_hour_max <= 24:
+            raise Exception("Invalid day template hours: the day must start before lunch, " +
+                            "and lunch must end before the networking event")
+        if not lunch_end_hour <= networking_start_hour_min <= networking_start_hour_max:
+            raise Exception("Invalid networking window for day template: %d-%d" % (
+                networking_start_hour_min,
+                networking_start_hour_max
+            ))
+        if rooms is not None and rooms < 1:
+            raise Exception("A day must have at least one room")
+        self.name = name
+        self.rooms = rooms
+        self.start_hour = start_hour
+        self.lunch_start_hour = lunch_start_hour
+        self.lunch_end_hour = lunch_end_hour
+        self.networking_start_hour_min = networking_start_hour_min
+        self.networking_start_hour_max = networking_start_hour_max
+        self.morning_session_duration = (lunch_start_hour - start_hour)*60
+        self.afternoon_session_duration = (networking_start_hour_max - lunch_end_hour)*60
+        self.track_duration = self.morning_session_duration + self.afternoon_session_duration
+        self.max_talk_duration = min(self.morning_session_duration, self.afternoon_session_duration)
+
+    def get_session_start_hour(self, is_morning_session):
+        return self.start_hour if is_morning_session else self.lunch_end_hour
+
+    def get_session_duration(self, is_morning_session):
+        return self.morning_session_duration if is_morning_session else self.afternoon_session_duration
+
+    def to_dict(self):
+        return dict([(key, getattr(self, key)) for key in self.FIELDS])
+
+    @classmethod
+    def from_dict(cls, data):
+        """Creates a DayTemplate from a dictionary with any of the FIELDS
+        (with the rest taking their default values)."""
+        unknown = sorted(set(data) - set(cls.FIELDS))
+        if unknown:
+            raise Exception("Unknown day template option(s): %s" % ", ".join(unknown))
+        return DayTemplate(**data)
+
+
+DEFAULT_DAY_TEMPLATE = DayTemplate()
+
+
+class TalkConstraints:
+    """The constraints on where a talk can be scheduled, which are given as
+    optional annotations after the talk's duration in a talk file, e.g.:
+
+        Scaling Rails 60min | speaker=Jane Doe, John Roe; together=rails; apart=keynotes
+
+    Attributes:
+        speakers: The talk's speakers, none of whom can give two talks at
+            overlapping times (in any tracks).
+        together: Tags shared with the talks that must be in the same track as
+            this one.
+        apart: Tags shared with the talks that must be in different tracks
+            from this one.
+    """
+
+    __slots__ = ("speakers", "together", "apart")
+
+    # the annotations' keys, in the order of the attributes they set
+    KEYS = ("speaker", "together", "apart")
+    # what separates the annotations from the rest of a talk's line
+    SEPARATOR = " | "
+
+    def __init__(self, speakers=(), together=(), apart=()):
+        self.speakers = tuple(speakers)
+        self.together = tuple(together)
+        self.apart = tuple(apart)
+
+    @classmethod
+    def split(cls, source_str):
+        """Splits the annotations (if any) off the end of a talk's line.
+
+        If the text after the last SEPARATOR isn't a list of known
+        "key=value[, value...]" annotations (separated by semicolons), the
+        line is taken to have no annotations, so titles can still contain the
+        separator.
+
+        Returns:
+            A (talk_str, constraints) tuple, where constraints is a
+            TalkConstraints instance, or None if there are no annotations.
+        """
+        talk_str, separator, annotations_str = source_str.rpartition(cls.SEPARATOR)
+        if not separator:
+            return source_str, None
+        constraints = cls.parse(annotations_str)
+        if constraints is None:
+            return source_str, None
+        return talk_str.rstrip(), constraints
+
+    @classmethod
+    def parse(cls, annotations_str):
+        """Parses a list of annotations (without the SEPARATOR before them).
+
+        Returns:
+            A TalkConstraints instance, or None if the string isn't a list of
+            known annotations.
+        """
+        values = dict([(key, []) for key in cls.KEYS])
+        for annotation in annotations_str.split(";"):
+            key, equals, value = annotation.partition("=")
+            key = key.strip()
+            if not equals or key not in values:
+                return None
+            values[key].extend(filter(None, [item.strip() for item in value.split(",")]))
+        return TalkConstraints(*[values[key] for key in cls.KEYS])
+
+    def __str__(self):
+        """Formats these constraints as annotations that parse() accepts."""
+        annotations = [
+            "%s=%s" % (key, ", ".join(values))
+            for key, values in zip(self.KEYS, (self.speakers, self.together, self.apart)) if values
+        ]
+        return "; ".join(annotations) if annotations else "%s=" % self.KEYS[0]
+
+
 class Talk:
     """Represents a single talk for our conference."""
 
-    def __init__(self, title, duration, start_time=None):
+    __slots__ = ("title", "duration", "start_time", "constraints")
+
+    def __init__(self, title, duration, start_time=None, constraints=None):
         """Constructor.
 
         Args:
@@ -57,24 +305,27 @@ class Talk:
             duration: The duration of the talk in minutes (int).
             start_time: The start time (in minutes) of this talk relative to
                 the start of the session.
+            constraints: An optional TalkConstraints instance.
         """
         self.title = title
         self.duration = duration
-        self.start_time, self.end_time = None, None
-        if start_time is not None:
-            self.start_at(start_time)
+        self.start_time = start_time
+        self.constraints = constraints
+
+    @property
+    def end_time(self):
+        return None if self.start_time is None else self.start_time + self.duration
 
     def start_at(self, minutes):
         self.start_time = minutes
-        self.end_time = minutes + self.duration
         return self
 
     def get_friendly_duration(self):
-        return "lightning" if self.duration == 5 else ("%dmin" % self.duration)
+        return "lightning" if self.duration == LIGHTNING_TALK_DURATION else ("%dmin" % self.duration)
 
     def to_string(self, session_start_hour):
         return "%s %s %s" % (
-            minutes_to_friendly_time(self.start_time, start_hour=session_start_hour),
+            friendly_time(self.start_time, start_hour=session_start_hour),
             self.title,
             self.get_friendly_duration()
         )
@@ -89,45 +340,123 @@ class Talk:
         Returns:
             On success, a Talk instance. On failure, raises an exception.
         """
-        parts = source_str.split(' ')
+        talk_str, constraints = TalkConstraints.split(source_str)
+        parts = talk_str.split(' ')
         if len(parts) < 2:
             raise Exception("Invalid talk format: %s" % source_str)
-        duration = parts[-1]
-        if duration != 'lightning' and not duration.endswith('min'):
+        duration = cls.parse_duration(parts[-1])
+        if duration is None:
             raise Exception("Invalid duration for talk: %s" % source_str)
-        # convert to minutes
-        duration = 5 if duration == 'lightning' else int(duration.replace('min', ''))
         if duration > MAX_TALK_DURATION:
             raise Exception("Talk exceeds maximum duration: %s (maximum is %d mins)" % (
                 source_str,
                 MAX_TALK_DURATION
             ))
-        return Talk(' '.join(parts[:-1]), duration)
+        return Talk(' '.join(parts[:-1]), duration, constraints=constraints)
+
+    @classmethod
+    def parse_duration(cls, duration_str):
+        """Converts a talk's duration ("lightning" or "<n>min") to minutes.
+
+        Returns:
+            The duration in minutes, or None if the duration string isn't in
+            a valid format.
+        """
+        if duration_str == 'lightning':
+            return LIGHTNING_TALK_DURATION
+        if duration_str.endswith('min') and duration_str[:-3].isdecimal():
+            return int(duration_str[:-3])
+        return None
 
     @classmethod
     def copy_of(cls, other):
-        talk = Talk(other.title, other.duration)
-        talk.start_time = other.start_time
-        talk.end_time = other.end_time
-        return talk
+        return Talk(other.title, other.duration, start_time=other.start_time, constraints=other.constraints)
 
 
 class TalkSession:
     """Represents a single session (either morning or afternoon) that can
     contain talks. In the bin packing algorithm, this represents a bin whose
-    contents we want to maximise."""
+    contents we want to maximise.
+
+    To keep large schedules compact, the session doesn't keep Talk instances
+    around: the talks' titles and durations are stored in separate arrays, and
+    the talks property creates Talk instances from them on demand. Talks are
+    always scheduled back-to-back, so their start times aren't stored either,
+    but are worked out from the durations of the preceding talks (and cached
+    by get_talk() until the session changes)."""
 
-    def __init__(self, is_morning_session, track=None, verbose=False):
-        self.start_hour = DAY_START_HOUR if is_morning_session else LUNCH_END_HOUR
+    __slots__ = (
+        "start_hour", "is_morning_session", "track", "verbose", "total_time",
+        "talk_titles", "talk_durations", "used_time", "wasted_time", "index",
+        "state", "changes", "start_times"
+    )
+
+    def __init__(self, is_morning_session, track=None, verbose=False, template=DEFAULT_DAY_TEMPLATE):
+        self.start_hour = template.get_session_start_hour(is_morning_session)
         self.is_morning_session = is_morning_session
         self.track = track
         self.verbose = verbose
         # how many minutes do we have in this session?
-        self.total_time = (MORNING_SESSION_DURATION if is_morning_session else AFTERNOON_SESSION_DURATION)
-        self.talks = []
+        self.total_time = template.get_session_duration(is_morning_session)
+        self.talk_titles = []
+        self.talk_durations = array('H')
         # this we want to maximise
         self.used_time = 0
         self.wasted_time = self.total_time
+        # the SessionCapacityIndex (if any) that needs to know about changes to
+        # this session's remaining capacity
+        self.index = None
+        # the immutable state of this session as of the last schedule snapshot
+        # (or None if the session has changed since then), and the list to
+        # which to add this session when it first changes after a snapshot
+        self.state = None
+        self.changes = None
+        # the talks' start times, followed by the end time of the last talk,
+        # or None if the session has changed since they were worked out
+        self.start_times = None
+
+    @property
+    def talks(self):
+        """A tuple of (copies of) the talks in this session. Since they're
+        copies, changing them doesn't change the session: use add_talk(),
+        remove_talk_at() or assign a new list of talks instead."""
+        talks, start_time = [], 0
+        for title, duration in zip(self.talk_titles, self.talk_durations):
+            talks.append(Talk(title, duration, start_time=start_time))
+            start_time += duration
+        return tuple(talks)
+
+    @talks.setter
+    def talks(self, talks):
+        """Replaces all of the talks in this session with the given ones (which
+        are scheduled one after the other)."""
+        self.use_time(-self.used_time)
+        self.talk_titles = []
+        self.talk_durations = array('H')
+        for talk in talks:
+            self.append_talk(talk)
+
+    def get_talk_count(self):
+        return len(self.talk_durations)
+
+    def get_talk(self, position):
+        """Returns a copy of the talk at the given position (which can be
+        negative, counting from the end)."""
+        if position < 0:
+            position += len(self.talk_durations)
+        duration = self.talk_durations[position]
+        if position == len(self.talk_durations) - 1:
+            start_time = self.used_time - duration
+        else:
+            if self.start_times is None:
+                self.start_times = array('H', itertools.accumulate(self.talk_durations, initial=0))
+            start_time = self.start_times[position]
+        return Talk(self.talk_titles[position], duration, start_time=start_time)
+
+    def get_end_time(self):
+        """The time (in minutes, relative to the start of the session) at which
+        the last talk in this session ends."""
+        return self.used_time
 
     def has_space(self):
         return (self.used_time < self.total_time)
@@ -135,9 +464,36 @@ class TalkSession:
     def use_time(self, duration):
         self.used_time += duration
         self.wasted_time -= duration
+        self.start_times = None
+        if self.index is not None:
+            self.index.update(self, self.wasted_time + duration)
+        if self.state is not None:
+            self.state = None
+            if self.changes is not None:
+                self.changes.append(self)
+
+    def get_state(self):
+        """Returns an immutable (titles, durations, used_time) tuple
+        representing the talks in this session, which is reused until the
+        session changes."""
+        if self.state is None:
+            self.state = (tuple(self.talk_titles), self.talk_durations.tobytes(), self.used_time)
+        return self.state
+
+    def restore_state(self, state):
+        """Replaces the talks in this session with those from the given state
+        (see get_state())."""
+        titles, durations, used_time = state
+        self.talk_titles = list(titles)
+        self.talk_durations = array('H')
+        self.talk_durations.frombytes(durations)
+        self.use_time(used_time - self.used_time)
+        self.state = state
     
     def add_talk(self, talk):
-        """Attempts to add the given talk to this session.
+        """Attempts to add the given talk to this session. The session only
+        keeps the talk's title and duration (see the talks property), but the
+        talk's start time is set.
         
         Args:
             talk: The talk to add to this session.
@@ -145,29 +501,66 @@ class TalkSession:
         Returns:
             True if the talk was successfully added, otherwise False.
         """
-        last_talk_end_time = self.talks[-1].end_time if len(self.talks) > 0 else 0
         # if the talk fits into this session
-        if last_talk_end_time + talk.duration <= self.total_time:
-            self.talks.append(talk.start_at(last_talk_end_time))
-            self.use_time(talk.duration)
+        if self.get_end_time() + talk.duration <= self.total_time:
+            self.append_talk(talk)
             if self.verbose and self.track:
-                print("Added talk \"%s\" to %s session of track %d (now only wasted %d mins)" % (
-                    talk.title,
-                    "morning" if self.is_morning_session else "afternoon",
-                    self.track.track_no,
-                    self.wasted_time
-                ))
+                print(self.get_placement_message(talk), file=sys.stderr)
             return True
         # no more space
         return False
 
+    def get_placement_message(self, talk):
+        """Describes the placement of the given talk (which has just been
+        added to this session) for verbose output."""
+        return "Added talk \"%s\" to %s session of track %d (now only wasted %d mins)" % (
+            talk.title,
+            "morning" if self.is_morning_session else "afternoon",
+            self.track.track_no,
+            self.wasted_time
+        )
+
+    def append_talk(self, talk):
+        """Appends the given talk to the end of this session, without checking
+        whether there's enough space for it."""
+        talk.start_at(self.get_end_time())
+        self.talk_titles.append(talk.title)
+        self.talk_durations.append(talk.duration)
+        self.use_time(talk.duration)
+
+    def append_talks(self, talks):
+        """Appends the given talks to the end of this session, one after the
+        other, without checking whether there's enough space for them."""
+        start_time = self.used_time
+        for talk in talks:
+            talk.start_time = start_time
+            start_time += talk.duration
+        self.talk_titles.extend([talk.title for talk in talks])
+        self.talk_durations.extend([talk.duration for talk in talks])
+        self.use_time(start_time - self.used_time)
+
+    def remove_talk_at(self, position):
+        """Removes the talk at the given position in this session, moving the
+        subsequent talks earlier to close the gap.
+
+        Returns:
+            The talk that was removed.
+        """
+        title = self.talk_titles.pop(position)
+        duration = self.talk_durations.pop(position)
+        self.use_time(-duration)
+        return Talk(title, duration)
+
     def __str__(self):
         return "\n".join(["%s" % talk.to_string(self.start_hour) for talk in self.talks])
 
     @classmethod
     def copy_of(cls, other):
         session = TalkSession(other.is_morning_session)
-        session.talks = [Talk.copy_of(talk) for talk in other.talks]
+        session.start_hour = other.start_hour
+        session.total_time = other.total_time
+        session.talk_titles = list(other.talk_titles)
+        session.talk_durations = array('H', other.talk_durations)
         session.used_time = other.used_time
         session.wasted_time = other.wasted_time
         return session
@@ -177,11 +570,14 @@ class TalkTrack:
     """Represents a single track, which contains a morning and afternoon
     talk session."""
 
-    def __init__(self, track_no, verbose=False):
+    __slots__ = ("track_no", "verbose", "template", "morning_session", "afternoon_session")
+
+    def __init__(self, track_no, verbose=False, template=DEFAULT_DAY_TEMPLATE):
         self.track_no = track_no
         self.verbose = verbose
-        self.morning_session = TalkSession(True, track=self, verbose=verbose)
-        self.afternoon_session = TalkSession(False, track=self, verbose=verbose)
+        self.template = template
+        self.morning_session = TalkSession(True, track=self, verbose=verbose, template=template)
+        self.afternoon_session = TalkSession(False, track=self, verbose=verbose, template=template)
 
     def add_talk(self, talk):
         added = False
@@ -192,79 +588,1096 @@ class TalkTrack:
         return added
 
     def get_lunchtime_string(self):
-        hour = LUNCH_START_HOUR
-        return "%s Lunch" % minutes_to_friendly_time(0, start_hour=LUNCH_START_HOUR)
+        return "%s Lunch" % minutes_to_friendly_time(0, start_hour=self.template.lunch_start_hour)
 
     def get_wasted_time(self):
         return self.morning_session.wasted_time + self.afternoon_session.wasted_time
 
     def get_latest_talk(self):
-        if len(self.afternoon_session.talks) > 0:
-            return self.afternoon_session.talks[-1]
-        elif len(self.morning_session.talks) > 0:
-            return self.morning_session.talks[-1]
+        if self.afternoon_session.get_talk_count() > 0:
+            return self.afternoon_session.get_talk(-1)
+        elif self.morning_session.get_talk_count() > 0:
+            return self.morning_session.get_talk(-1)
+        else:
+            return None
+
+    def get_latest_end_time(self):
+        """Returns the end time of the last talk in this track (relative to
+        the start of its session), or None if the track has no talks."""
+        if self.afternoon_session.get_talk_count() > 0:
+            return self.afternoon_session.used_time
+        elif self.morning_session.get_talk_count() > 0:
+            return self.morning_session.used_time
         else:
             return None
 
     def to_string(self, latest_talk_end_time):
-        return (
-            ('Track %d\n\n' % self.track_no) +
-            ('%s' % self.morning_session) +
-            '\n' + self.get_lunchtime_string() + '\n' +
-            (('%s\n' % self.afternoon_session) if self.afternoon_session.talks else '') +
-            minutes_to_friendly_time(latest_talk_end_time, start_hour=LUNCH_END_HOUR) +
-            ' Networking Event'
+        return TextScheduleWriter.format_track(
+            self,
+            friendly_time(latest_talk_end_time, start_hour=self.template.lunch_end_hour)
         )
 
     @classmethod
     def copy_of(cls, other):
-        track = TalkTrack(other.track_no)
+        track = TalkTrack(other.track_no, template=other.template)
         track.morning_session = TalkSession.copy_of(other.morning_session)
+        track.morning_session.track = track
         track.afternoon_session = TalkSession.copy_of(other.afternoon_session)
+        track.afternoon_session.track = track
         return track
 
 
+class ScheduleSnapshot:
+    """An immutable snapshot of the tracks in a ConferenceSchedule (see
+    ConferenceSchedule.snapshot()).
+
+    The tracks' states are stored in chunks of CHUNK_SIZE tracks, and a new
+    snapshot only copies the chunks containing tracks that have changed,
+    sharing all of the other chunks (and the states of the unchanged tracks
+    within copied chunks) with the snapshot on which it's based.
+    """
+
+    __slots__ = ("chunks", "track_count", "next_track_no")
+
+    CHUNK_SIZE = 64
+
+    def __init__(self, chunks, track_count, next_track_no):
+        self.chunks = chunks
+        self.track_count = track_count
+        self.next_track_no = next_track_no
+
+    @classmethod
+    def of_tracks(cls, tracks, next_track_no):
+        """Takes a snapshot of all of the given tracks."""
+        states = [ConferenceSchedule.get_track_state(track) for track in tracks]
+        return ScheduleSnapshot(
+            tuple([tuple(states[i:i+cls.CHUNK_SIZE]) for i in range(0, len(states), cls.CHUNK_SIZE)]),
+            len(states),
+            next_track_no
+        )
+
+    def get_track_state(self, position):
+        return self.chunks[position // self.CHUNK_SIZE][position % self.CHUNK_SIZE]
+
+    def replace(self, track_count, next_track_no, track_states):
+        """Creates a new snapshot from this one with the given number of
+        tracks, and with the tracks at the given positions replaced.
+
+        Args:
+            track_count: The number of tracks in the new snapshot.
+            next_track_no: The next track number of the new snapshot.
+            track_states: A list of (position, track_state) tuples, which
+                must include all of the positions beyond this snapshot's track
+                count.
+        """
+        chunk_size = self.CHUNK_SIZE
+        chunks = list(self.chunks[:(track_count + chunk_size - 1) // chunk_size])
+        if track_count % chunk_size and len(chunks) * chunk_size > track_count:
+            chunks[-1] = chunks[-1][:track_count % chunk_size]
+        changed_chunks = {}
+        for position, track_state in track_states:
+            chunk_no = position // chunk_size
+            chunk = changed_chunks.get(chunk_no)
+            if chunk is None:
+                chunk = changed_chunks[chunk_no] = list(chunks[chunk_no]) if chunk_no < len(chunks) else []
+            offset = position % chunk_size
+            if offset < len(chunk):
+                chunk[offset] = track_state
+            else:
+                chunk.append(track_state)
+        for chunk_no in sorted(changed_chunks):
+            if chunk_no < len(chunks):
+                chunks[chunk_no] = tuple(changed_chunks[chunk_no])
+            else:
+                chunks.append(tuple(changed_chunks[chunk_no]))
+        return ScheduleSnapshot(tuple(chunks), track_count, next_track_no)
+
+    def differences(self, other):
+        """Returns the positions of the tracks whose states differ between
+        this snapshot and the other one."""
+        positions = []
+        for chunk_no in range(max(len(self.chunks), len(other.chunks))):
+            chunk = self.chunks[chunk_no] if chunk_no < len(self.chunks) else ()
+            other_chunk = other.chunks[chunk_no] if chunk_no < len(other.chunks) else ()
+            if chunk is other_chunk:
+                continue
+            for offset in range(max(len(chunk), len(other_chunk))):
+                if offset >= len(chunk) or offset >= len(other_chunk) or chunk[offset] is not other_chunk[offset]:
+                    positions.append(chunk_no*self.CHUNK_SIZE + offset)
+        return positions
+
+
+class SessionCapacityIndex:
+    """Indexes talk sessions by their remaining capacity (in minutes), so that
+    the best fitting session for a talk can be found without having to scan
+    through all of the sessions in a schedule.
+
+    Session capacities are small, bounded integers, so sessions are kept in
+    per-capacity buckets (separately for morning and afternoon sessions). Each
+    bucket is a heap ordered by track number, and a sorted list of the
+    capacities of all non-empty buckets allows us to find the smallest capacity
+    into which a talk will fit with a binary search.
+
+    Sessions notify the index of changes to their capacity through
+    TalkSession.use_time(). Entries in the heaps are removed lazily, so an
+    entry is only considered valid if its session is still in the index with
+    the same track number and capacity.
+    """
+
+    def __init__(self):
+        # (is_morning_session, capacity) -> heap of (track_no, seq, session)
+        self.buckets = {}
+        # (is_morning_session, capacity) -> number of sessions in that bucket
+        self.bucket_sizes = {}
+        # is_morning_session -> sorted list of capacities of non-empty buckets
+        self.capacities = {True: [], False: []}
+        # session -> track number, for all of the sessions in the index
+        self.track_nos = {}
+        self.seq = 0
+
+    def __len__(self):
+        return len(self.track_nos)
+
+    def add(self, session, track_no):
+        """Adds the given session (which belongs to the track with the given
+        track number) to the index."""
+        if session in self.track_nos:
+            self.remove(session)
+        self.track_nos[session] = track_no
+        session.index = self
+        self._insert(session, track_no, session.wasted_time)
+
+    def remove(self, session):
+        """Removes the given session from the index, if it is present."""
+        if self.track_nos.pop(session, None) is not None:
+            self._discard(session, session.wasted_time)
+        if session.index is self:
+            session.index = None
+
+    def update(self, session, old_capacity):
+        """Must be called whenever the given session's remaining capacity
+        changes from old_capacity to its current wasted_time."""
+        track_no = self.track_nos.get(session)
+        if track_no is None or session.wasted_time == old_capacity:
+            return
+        self._discard(session, old_capacity)
+        self._insert(session, track_no, session.wasted_time)
+
+    def best_fit(self, duration, is_morning_session):
+        """Finds the session with the least remaining capacity into which a
+        talk of the given duration still fits, preferring sessions from
+        earlier tracks where there is a tie.
+
+        Args:
+            duration: The duration of the talk (in minutes).
+            is_morning_session: Whether to look at morning or afternoon
+                sessions.
+
+        Returns:
+            The best fitting TalkSession, or None if there is no session of the
+            requested kind with enough space.
+        """
+        capacities = self.capacities[is_morning_session]
+        i = bisect.bisect_left(capacities, duration)
+        if i == len(capacities):
+            return None
+        capacity = capacities[i]
+        bucket = self.buckets[(is_morning_session, capacity)]
+        track_nos = self.track_nos
+        # a non-empty bucket always has at least one valid entry in it
+        while True:
+            track_no, _, session = bucket[0]
+            if session.wasted_time == capacity and track_nos.get(session) == track_no:
+                return session
+            heapq.heappop(bucket)
+
+    def best_accepted_fit(self, duration, is_morning_session, accept, accept_capacity=None):
+        """Like best_fit(), but finds the best fitting session that is
+        accepted by the given functions. Sessions are looked at in the order
+        in which best_fit() would pick them, and whole buckets are skipped if
+        their capacity isn't accepted, so only the sessions that are actually
+        rejected have to be looked at.
+
+        Args:
+            duration: The duration of the talk (in minutes).
+            is_morning_session: Whether to look at morning or afternoon
+                sessions.
+            accept: A function that returns whether a session is acceptable.
+            accept_capacity: An optional function that returns whether the
+                sessions of a given kind (is_morning_session) with a given
+                remaining capacity can be acceptable at all.
+
+        Returns:
+            The best fitting accepted TalkSession, or None if there is none.
+        """
+        capacities = self.capacities[is_morning_session]
+        for capacity in capacities[bisect.bisect_left(capacities, duration):]:
+            if accept_capacity is not None and not accept_capacity(is_morning_session, capacity):
+                continue
+            for session in self.iter_bucket(is_morning_session, capacity):
+                if accept(session):
+                    return session
+        return None
+
+    def iter_bucket(self, is_morning_session, capacity):
+        """Yields the sessions of the given kind with the given remaining
+        capacity, in order of track number. Other than dropping stale entries
+        from its top (as best_fit() does), the bucket's heap isn't modified:
+        it's walked as a tree instead, using a second heap of the entries
+        whose parents have already been yielded."""
+        bucket = self.buckets[(is_morning_session, capacity)]
+        track_nos = self.track_nos
+        while True:
+            track_no, _, session = bucket[0]
+            if session.wasted_time == capacity and track_nos.get(session) == track_no:
+                break
+            heapq.heappop(bucket)
+        frontier = [(bucket[0], 0)]
+        while frontier:
+            entry, position = heapq.heappop(frontier)
+            track_no, _, session = entry
+            if session.wasted_time == capacity and track_nos.get(session) == track_no:
+                yield session
+            for child in (2*position + 1, 2*position + 2):
+                if child < len(bucket):
+                    heapq.heappush(frontier, (bucket[child], child))
+
+    def find_best_fit(self, duration, prefer_mornings=False, accept=None, accept_capacity=None):
+        """Finds the session into which a talk of the given duration best
+        fits, as per the Best Fit Decreasing (BFD) algorithm.
+
+        Args:
+            duration: The duration of the talk (in minutes).
+            prefer_mornings: If False, the best fitting morning session is
+                preferred unless the best fitting afternoon session is in an
+                earlier track. If True, whichever session would waste the least
+                time is preferred, with ties going to earlier tracks and then
+                to morning sessions.
+            accept, accept_capacity: Optional functions that restrict which
+                sessions can be picked (see best_accepted_fit()).
+
+        Returns:
+            The best fitting session, or None if the talk doesn't fit anywhere.
+        """
+        if accept is None:
+            best_morning_session = self.best_fit(duration, True)
+            best_afternoon_session = self.best_fit(duration, False)
+        else:
+            best_morning_session = self.best_accepted_fit(duration, True, accept, accept_capacity)
+            best_afternoon_session = self.best_accepted_fit(duration, False, accept, accept_capacity)
+        # if we have competing morning and afternoon sessions here
+        if best_morning_session is not None and best_afternoon_session is not None:
+            morning_track_no = self.track_nos[best_morning_session]
+            afternoon_track_no = self.track_nos[best_afternoon_session]
+            if prefer_mornings:
+                if (best_afternoon_session.wasted_time, afternoon_track_no) < \
+                        (best_morning_session.wasted_time, morning_track_no):
+                    return best_afternoon_session
+            # if the afternoon session is in an earlier track, prefer it
+            elif afternoon_track_no < morning_track_no:
+                return best_afternoon_session
+            return best_morning_session
+        return best_morning_session if best_morning_session is not None else best_afternoon_session
+
+    def _insert(self, session, track_no, capacity):
+        key = (session.is_morning_session, capacity)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = []
+        heapq.heappush(bucket, (track_no, self.seq, session))
+        self.seq += 1
+        size = self.bucket_sizes.get(key, 0)
+        if size == 0:
+            bisect.insort(self.capacities[session.is_morning_session], capacity)
+        self.bucket_sizes[key] = size + 1
+
+    def _discard(self, session, capacity):
+        key = (session.is_morning_session, capacity)
+        size = self.bucket_sizes[key] - 1
+        if size > 0:
+            self.bucket_sizes[key] = size
+            return
+        # all remaining entries in this bucket are stale
+        del self.bucket_sizes[key]
+        del self.buckets[key]
+        capacities = self.capacities[session.is_morning_session]
+        del capacities[bisect.bisect_left(capacities, capacity)]
+
+
+class InstrumentedSessionCapacityIndex(SessionCapacityIndex):
+    """A SessionCapacityIndex that counts how many sessions it examines when
+    looking for the best fitting session for a talk (see ScheduleStats)."""
+
+    def __init__(self, stats):
+        super().__init__()
+        self.stats = stats
+
+    def best_fit(self, duration, is_morning_session):
+        capacities = self.capacities[is_morning_session]
+        i = bisect.bisect_left(capacities, duration)
+        if i == len(capacities):
+            return None
+        capacity = capacities[i]
+        bucket = self.buckets[(is_morning_session, capacity)]
+        track_nos = self.track_nos
+        stats = self.stats
+        while True:
+            stats.sessions_scanned += 1
+            track_no, _, session = bucket[0]
+            if session.wasted_time == capacity and track_nos.get(session) == track_no:
+                return session
+            heapq.heappop(bucket)
+
+    def iter_bucket(self, is_morning_session, capacity):
+        stats = self.stats
+        for session in super().iter_bucket(is_morning_session, capacity):
+            stats.sessions_scanned += 1
+            yield session
+
+
+class ConstraintIndex:
+    """Indexes the placements of talks with TalkConstraints, so that whether
+    another constrained talk can go into a session can be checked without
+    looking at the talks in the parallel sessions.
+
+    Each speaker's busy times are kept as a bitmask of the minutes of the day
+    (in a Python int), so checking whether a talk would overlap with one of
+    its speakers' other talks takes a single AND per speaker. Since talks are
+    always added to the end of a session, all of the sessions of the same kind
+    with the same remaining capacity would start a talk at the same time, so
+    the speakers only need to be checked once per bucket of the
+    SessionCapacityIndex (see SessionCapacityIndex.best_accepted_fit()).
+    Tracks are checked against the track to which each "together" tag is
+    bound, and the set of tracks in which each "apart" tag has been placed.
+    A talk with a together tag is only put into a session if the tag's other
+    talks can still be split between the track's two sessions, which is a
+    subset sum over their durations (kept as a bitmask of reachable sums).
+    """
+
+    def __init__(self, talks, template=DEFAULT_DAY_TEMPLATE):
+        """Constructor.
+
+        Args:
+            talks: All of the talks that are to be scheduled.
+            template: The DayTemplate of the schedule.
+        """
+        self.template = template
+        # speaker -> bitmask of the minutes of the day in which they're busy
+        self.speaker_masks = {}
+        # together tag -> the TalkTrack to which its talks are bound
+        self.together_tracks = {}
+        # together tag -> the durations of its talks yet to be placed
+        self.together_pending = {}
+        # apart tag -> the set of TalkTracks in which its talks have been placed
+        self.apart_tracks = {}
+        # session -> the constraints (or None) of each of its talks, in order
+        self.session_constraints = {}
+        for talk in talks:
+            if talk.constraints is not None:
+                for tag in talk.constraints.together:
+                    self.together_pending.setdefault(tag, []).append(talk.duration)
+        for tag, durations in self.together_pending.items():
+            if not self.can_split(durations, template.morning_session_duration, template.afternoon_session_duration):
+                raise Exception("The talks that must share a track (together=%s) don't fit into one track" % tag)
+
+    @staticmethod
+    def can_split(durations, morning_capacity, afternoon_capacity):
+        """Returns whether talks of the given durations can be split between a
+        morning and an afternoon session with the given remaining capacities
+        (ignoring any other constraints)."""
+        total = sum(durations)
+        low, high = max(total - afternoon_capacity, 0), morning_capacity
+        if low > high:
+            return False
+        sums = 1
+        for duration in durations:
+            sums |= sums << duration
+        return (sums >> low) & ((1 << (high - low + 1)) - 1) != 0
+
+    def get_start_time(self, is_morning_session, capacity):
+        """Returns the time (in minutes since midnight) at which a talk added
+        to a session of the given kind with the given remaining capacity would
+        start."""
+        template = self.template
+        return template.get_session_start_hour(is_morning_session)*60 + \
+            template.get_session_duration(is_morning_session) - capacity
+
+    def is_time_free(self, constraints, start_time, duration):
+        """Returns whether all of a talk's speakers are free for the given
+        duration from the given start time (in minutes since midnight)."""
+        mask = ((1 << duration) - 1) << start_time
+        speaker_masks = self.speaker_masks
+        for speaker in constraints.speakers:
+            if speaker_masks.get(speaker, 0) & mask:
+                return False
+        return True
+
+    def is_session_allowed(self, constraints, session, duration):
+        """Returns whether a talk of the given duration can go into the given
+        session as far as its together and apart tags are concerned."""
+        track = session.track
+        for tag in constraints.together:
+            bound_track = self.together_tracks.get(tag)
+            if bound_track is not None and bound_track is not track:
+                return False
+            other_durations = list(self.together_pending[tag])
+            other_durations.remove(duration)
+            if other_durations:
+                morning_capacity = track.morning_session.wasted_time
+                afternoon_capacity = track.afternoon_session.wasted_time
+                if session.is_morning_session:
+                    morning_capacity -= duration
+                else:
+                    afternoon_capacity -= duration
+                if not self.can_split(other_durations, morning_capacity, afternoon_capacity):
+                    return False
+        for tag in constraints.apart:
+            if track in self.apart_tracks.get(tag, ()):
+                return False
+        return True
+
+    def get_bound_track(self, constraints):
+        """Returns the track into which a talk has to go because of its
+        together tags, or None if it could go into any track."""
+        for tag in constraints.together:
+            bound_track = self.together_tracks.get(tag)
+            if bound_track is not None:
+                return bound_track
+        return None
+
+    def accepts(self, constraints, session, duration):
+        """Checks whether a talk of the given duration can be added to the end
+        of the given session."""
+        return self.is_time_free(constraints, session.start_hour*60 + session.used_time, duration) and \
+            self.is_session_allowed(constraints, session, duration)
+
+    def add(self, talk, session):
+        """Records a talk (with or without constraints) that has just been
+        added to the end of a session."""
+        constraints = talk.constraints
+        self.session_constraints.setdefault(session, []).append(constraints)
+        if constraints is None:
+            return
+        start_time = session.start_hour*60 + session.used_time - talk.duration
+        mask = ((1 << talk.duration) - 1) << start_time
+        for speaker in constraints.speakers:
+            self.speaker_masks[speaker] = self.speaker_masks.get(speaker, 0) | mask
+        for tag in constraints.together:
+            self.together_tracks[tag] = session.track
+            self.together_pending[tag].remove(talk.duration)
+        for tag in constraints.apart:
+            self.apart_tracks.setdefault(tag, set()).add(session.track)
+
+    def get_last_constraints(self, session):
+        """Returns the constraints of the last talk in the given session."""
+        return self.session_constraints[session][-1]
+
+    def remove_last(self, session):
+        """Forgets the last talk in the given session (which doesn't have any
+        together tags), before it is removed from the session."""
+        constraints = self.session_constraints[session].pop()
+        if constraints is None:
+            return
+        duration = session.talk_durations[-1]
+        mask = ((1 << duration) - 1) << (session.start_hour*60 + session.used_time - duration)
+        for speaker in constraints.speakers:
+            self.speaker_masks[speaker] &= ~mask
+        for tag in constraints.apart:
+            self.apart_tracks[tag].discard(session.track)
+
+
+class ScheduleHooks:
+    """Instrumentation hooks through which a ConferenceSchedule reports on its
+    progress as it schedules talks. This base class does nothing, so
+    subclasses only need to override the hooks they're interested in.
+
+    A schedule without hooks skips all of its instrumentation, so hooks cost
+    nothing when they're not used.
+    """
+
+    def create_session_index(self):
+        """Creates the index that the schedule uses to find the best fitting
+        sessions for talks."""
+        return SessionCapacityIndex()
+
+    def talk_placed(self, session, talk):
+        """Called after the given talk has been added to the given session."""
+        pass
+
+    def track_added(self, track, no_space):
+        """Called after a track has been added while scheduling talks, where
+        no_space is True if the talk being placed didn't fit anywhere else, or
+        False if the track was one of the estimated number of tracks."""
+        pass
+
+    def phase_finished(self, phase, elapsed_time):
+        """Called when a phase of the work (e.g. "sort" or "place") has taken
+        the given number of seconds."""
+        pass
+
+
+class VerboseHooks(ScheduleHooks):
+    """Prints out each talk as it is placed."""
+
+    def talk_placed(self, session, talk):
+        print(session.get_placement_message(talk), file=sys.stderr)
+
+
+class MultiHooks(ScheduleHooks):
+    """Passes everything on to each of a list of hooks in turn."""
+
+    def __init__(self, hooks):
+        self.hooks = hooks
+
+    @classmethod
+    def combine(cls, *hooks):
+        """Combines the given hooks (ignoring any that are None), returning
+        None if there are none at all."""
+        hooks = [hook for hook in hooks if hook is not None]
+        if len(hooks) < 2:
+            return hooks[0] if hooks else None
+        return MultiHooks(hooks)
+
+    def create_session_index(self):
+        # use the first index that does more than the default one
+        for hooks in self.hooks:
+            index = hooks.create_session_index()
+            if type(index) is not SessionCapacityIndex:
+                return index
+        return SessionCapacityIndex()
+
+    def talk_placed(self, session, talk):
+        for hooks in self.hooks:
+            hooks.talk_placed(session, talk)
+
+    def track_added(self, track, no_space):
+        for hooks in self.hooks:
+            hooks.track_added(track, no_space)
+
+    def phase_finished(self, phase, elapsed_time):
+        for hooks in self.hooks:
+            hooks.phase_finished(phase, elapsed_time)
+
+
+class ScheduleStats(ScheduleHooks):
+    """Collects counters and per-phase timings while talks are scheduled.
+
+    Attributes:
+        talks_placed: The number of talks placed into sessions.
+        sessions_scanned: The number of sessions (including stale index
+            entries) examined while looking for the best fitting sessions for
+            talks.
+        tracks_estimated: The number of tracks added up front, based on the
+            total duration of the talks.
+        tracks_added_no_space: The number of tracks added because a talk
+            didn't fit anywhere else.
+        phase_times: A dictionary mapping each phase to the number of seconds
+            spent on it, in the order in which the phases first finished.
+    """
+
+    def __init__(self):
+        self.talks_placed = 0
+        self.sessions_scanned = 0
+        self.tracks_estimated = 0
+        self.tracks_added_no_space = 0
+        self.phase_times = {}
+
+    def create_session_index(self):
+        return InstrumentedSessionCapacityIndex(self)
+
+    def talk_placed(self, session, talk):
+        self.talks_placed += 1
+
+    def track_added(self, track, no_space):
+        if no_space:
+            self.tracks_added_no_space += 1
+        else:
+            self.tracks_estimated += 1
+
+    def phase_finished(self, phase, elapsed_time):
+        self.phase_times[phase] = self.phase_times.get(phase, 0) + elapsed_time
+
+    def to_dict(self, schedule=None):
+        """Summarises the statistics (and the given schedule, if any) as a
+        JSON-serialisable dictionary."""
+        summary = {
+            "talks_placed": self.talks_placed,
+            "sessions_scanned": self.sessions_scanned,
+            "sessions_scanned_per_placement": self.sessions_scanned / max(self.talks_placed, 1),
+            "tracks_estimated": self.tracks_estimated,
+            "tracks_added_no_space": self.tracks_added_no_space,
+            "phase_times": dict(self.phase_times),
+            "total_time": sum(self.phase_times.values())
+        }
+        if schedule is not None:
+            summary["engine"] = schedule.engine
+            summary["prefer_mornings"] = schedule.prefer_mornings
+            summary["tracks"] = len(schedule.tracks)
+            summary["wasted_time"] = schedule.get_wasted_time()
+            summary["min_tracks"], summary["min_sessions"] = schedule.get_lower_bounds()
+        return summary
+
+
+class PackingRecorder(ScheduleHooks):
+    """Records the order in which talks are placed into sessions, so that the
+    resulting schedule's packing can be reused (see ScheduleCache).
+
+    Consecutive placements of talks of the same duration into the same
+    session form a run, and runs are numbered in the order in which they were
+    started. Binding talks to the recorded packing with
+    ConferenceSchedule.apply_packing() therefore puts each talk in the same
+    place as when it was recorded.
+    """
+
+    def __init__(self):
+        # session -> list of [duration, count, order] runs
+        self.session_runs = {}
+        self.last_run = None
+        self.last_session = None
+        self.next_order = 0
+
+    def talk_placed(self, session, talk):
+        run = self.last_run
+        if session is self.last_session and run[0] == talk.duration:
+            run[1] += 1
+            return
+        run = [talk.duration, 1, self.next_order]
+        self.next_order += 1
+        self.session_runs.setdefault(session, []).append(run)
+        self.last_run = run
+        self.last_session = session
+
+    def get_packing(self, schedule):
+        """Returns the recorded packing of the given schedule's tracks, in the
+        same format as pack_duration_counts()."""
+        return [
+            (
+                [tuple(run) for run in self.session_runs.get(track.morning_session, [])],
+                [tuple(run) for run in self.session_runs.get(track.afternoon_session, [])]
+            )
+            for track in schedule.tracks
+        ]
+
+
 class ConferenceSchedule:
     """Allows us to organise our talks into a schedule with multiple tracks,
     giving additional information about the schedule to help with finding the
     optimal schedule later."""
 
-    def __init__(self, prefer_mornings=False, verbose=False):
+    # the multiset engine falls back to placing the talks one at a time when
+    # there are fewer than this many talks per session for each distinct
+    # duration (see has_short_runs())
+    MIN_TALKS_PER_RUN = 0.25
+
+    def __init__(self, prefer_mornings=False, verbose=False, engine="bfd", hooks=None,
+                 template=DEFAULT_DAY_TEMPLATE):
+        """Constructor.
+
+        Args:
+            prefer_mornings: Whether to prefer filling up morning sessions
+                before afternoon ones.
+            verbose: If True, prints out each talk as it is placed (through a
+                VerboseHooks instance, in addition to any other hooks).
+            engine: One of the ENGINES with which to schedule talks.
+            hooks: An optional ScheduleHooks instance to notify as talks are
+                scheduled. Without hooks, no instrumentation is done at all.
+            template: The DayTemplate that gives the shape of each track.
+        """
+        if engine not in ENGINES:
+            raise Exception("Unknown scheduling engine: %s" % engine)
+        if verbose:
+            hooks = MultiHooks.combine(VerboseHooks(), hooks)
         self.tracks = []
         self.next_track_no = 1
         self.prefer_mornings = prefer_mornings
         self.verbose = verbose
+        self.engine = engine
+        self.hooks = hooks
+        self.template = template
+        self.session_index = self.create_session_index()
+        # the ConstraintIndex of the talks being scheduled, if any of them
+        # have constraints
+        self.constraint_index = None
+        # the last snapshot taken (or restored), and the sessions that have
+        # changed since then
+        self.last_snapshot = None
+        self.changed_sessions = []
+
+    def clear(self):
+        """Removes all of the tracks from this schedule."""
+        self.tracks = []
+        self.next_track_no = 1
+        self.session_index = self.create_session_index()
+        self.constraint_index = None
+        self.last_snapshot = None
+        self.changed_sessions = []
+
+    def create_session_index(self):
+        if self.hooks is None:
+            return SessionCapacityIndex()
+        return self.hooks.create_session_index()
 
-    def add_talks(self, talks):
+    def add_talks(self, talks, presorted=False):
         """Adds the given collection of talks to this conference schedule. This
         will first clear out any existing talk tracks prior to adding the talks,
         and then add talks according to the Best Fit Decreasing (BFD) algorithm.
 
+        With the "multiset" engine, the talks are first collapsed into counts
+        of talks per duration, which are packed by pack_duration_counts(), and
+        the talks are only bound to their slots once the packing is done. The
+        "numpy" engine does the same with pack_duration_counts_numpy(), or
+        falls back to pack_duration_counts() if NumPy isn't installed. Where
+        pack_duration_counts() would place only a talk or two per run (see
+        has_short_runs()), the talks are placed one at a time as with the
+        "bfd" engine instead. The resulting schedules are identical to that of
+        the "bfd" engine.
+
+        If any of the talks have TalkConstraints, the "bfd" engine is always
+        used, and each talk goes into the best fitting session that doesn't
+        break its constraints.
+
         Args:
             talks: A collection of Talk instances to add to the schedule.
+            presorted: If True, the talks will be placed in the order given
+                instead of in order of decreasing duration (always using the
+                "bfd" engine).
         """
+        hooks = self.hooks
+        constrained = any([talk.constraints is not None for talk in talks])
+        pack = None
+        if self.engine != "bfd" and not presorted and not constrained:
+            start_time = time.perf_counter()
+            duration_counts = {}
+            for talk in talks:
+                duration_counts[talk.duration] = duration_counts.get(talk.duration, 0) + 1
+            if self.engine == "numpy" and numpy is not None:
+                pack = pack_duration_counts_numpy
+            elif not self.has_short_runs(duration_counts, len(talks)):
+                pack = pack_duration_counts
+        if pack is not None:
+            packing = pack(duration_counts, prefer_mornings=self.prefer_mornings, template=self.template)
+            if hooks is not None:
+                hooks.phase_finished("pack", time.perf_counter() - start_time)
+                start_time = time.perf_counter()
+            self.apply_packing(packing, talks)
+            if hooks is not None:
+                hooks.phase_finished("bind", time.perf_counter() - start_time)
+            return
+        start_time = time.perf_counter()
+        self.clear()
+        if constrained:
+            self.constraint_index = ConstraintIndex(talks, template=self.template)
         # estimate total talk duration
         total_talks_duration = sum([talk.duration for talk in talks])
         # estimate minimum number of tracks
-        est_tracks = int(math.ceil(total_talks_duration / TRACK_DURATION))
-        self.tracks = [self.create_track() for i in range(est_tracks)]
+        est_tracks = int(math.ceil(total_talks_duration / self.template.track_duration))
+        for i in range(est_tracks):
+            track = self.create_track()
+            if hooks is not None:
+                hooks.track_added(track, False)
         # sort talks according to decreasing duration (Best Fit Decreasing algorithm)
-        sorted_talks = sorted(talks, key=lambda talk: -talk.duration)
-        for talk in sorted_talks:
-            # find the best session into which to insert this talk
-            session = self.find_best_fit_session_prefer_mornings(talk) \
-                if self.prefer_mornings else self.find_best_fit_session(talk)
-            # no space anywhere
-            if session is None:
-                # add a new track
-                self.tracks.append(self.create_track())
+        if presorted:
+            sorted_talks = talks
+        elif constrained:
+            sorted_talks = sorted(talks, key=self.get_constrained_sort_key)
+        else:
+            sorted_talks = sorted(talks, key=lambda talk: -talk.duration)
+        if hooks is not None:
+            hooks.phase_finished("sort", time.perf_counter() - start_time)
+            start_time = time.perf_counter()
+        # constrained talks that don't fit anywhere are first deferred until
+        # all of the other talks have been placed, by which time there may be
+        # sessions in which they can start at a time their speakers are free
+        deferred = []
+        for talks_to_place, can_defer in ((sorted_talks, constrained), (deferred, False)):
+            for talk in talks_to_place:
+                # find the best session into which to insert this talk
                 session = self.find_best_fit_session_prefer_mornings(talk) \
                     if self.prefer_mornings else self.find_best_fit_session(talk)
-                # paranoia here
+                # no space anywhere
                 if session is None:
+                    if can_defer and talk.constraints is not None:
+                        deferred.append(talk)
+                        continue
+                    # add a new track
+                    track = self.create_track()
+                    if hooks is not None:
+                        hooks.track_added(track, True)
+                    session = self.find_best_fit_session_prefer_mornings(talk) \
+                        if self.prefer_mornings else self.find_best_fit_session(talk)
+                    if session is None and talk.constraints is not None:
+                        session = self.make_room_for(talk, track)
+                    # paranoia here
+                    if session is None:
+                        if talk.constraints is not None:
+                            raise Exception("Can't schedule talk without breaking its constraints: %s" % talk.title)
+                        raise Exception("Something went horribly wrong")
+                if not session.add_talk(talk):
                     raise Exception("Something went horribly wrong")
-            if not session.add_talk(talk):
-                raise Exception("Something went horribly wrong")
+                if self.constraint_index is not None:
+                    self.constraint_index.add(talk, session)
+                if hooks is not None:
+                    hooks.talk_placed(session, talk)
+        if hooks is not None:
+            hooks.phase_finished("place", time.perf_counter() - start_time)
+
+    def make_room_for(self, talk, track):
+        """The last resort for a constrained talk that doesn't even fit into a
+        new track, because its speakers are busy when the track's sessions
+        start: moves the last talk of another session to the start of one of
+        the new track's sessions, so that the talk can either follow it or
+        take its old place.
+
+        Args:
+            talk: The talk that needs a home.
+            track: The new (empty) track.
+
+        Returns:
+            The best fitting session for the talk after moving another talk,
+            or None if no move helps (in which case nothing is moved).
+        """
+        index = self.constraint_index
+        targets = (track.morning_session, track.afternoon_session)
+        for other_track in reversed(self.tracks):
+            if other_track is track:
+                continue
+            for session in (other_track.afternoon_session, other_track.morning_session):
+                if session.get_talk_count() == 0:
+                    continue
+                constraints = index.get_last_constraints(session)
+                if constraints is not None and constraints.together:
+                    continue
+                # only move talks after which the talk could start in the new
+                # track, or whose place the talk could take
+                moved_duration = session.talk_durations[-1]
+                moved_start_time = session.start_hour*60 + session.used_time - moved_duration
+                if not any(
+                    target.total_time >= moved_duration + talk.duration and
+                    index.is_time_free(talk.constraints, target.start_hour*60 + moved_duration, talk.duration)
+                    for target in targets
+                ) and not (
+                    session.wasted_time + moved_duration >= talk.duration and
+                    index.is_time_free(talk.constraints, moved_start_time, talk.duration)
+                ):
+                    continue
+                index.remove_last(session)
+                moved_talk = session.remove_talk_at(session.get_talk_count() - 1)
+                moved_talk.constraints = constraints
+                for target in targets:
+                    if target.total_time < moved_talk.duration or \
+                            (constraints is not None and not index.accepts(constraints, target, moved_talk.duration)):
+                        continue
+                    target.append_talk(moved_talk)
+                    index.add(moved_talk, target)
+                    best_session = self.find_best_fit_session_prefer_mornings(talk) \
+                        if self.prefer_mornings else self.find_best_fit_session(talk)
+                    if best_session is not None:
+                        return best_session
+                    index.remove_last(target)
+                    target.remove_talk_at(target.get_talk_count() - 1)
+                session.append_talk(moved_talk)
+                index.add(moved_talk, session)
+        return None
+
+    @staticmethod
+    def get_constrained_sort_key(talk):
+        """The order in which to place talks when some of them have
+        constraints: the talks that must share a track go first, one group at
+        a time (so that other talks can't take the space the rest of a group
+        needs), then the other constrained talks, and then the rest, each in
+        order of decreasing duration."""
+        constraints = talk.constraints
+        if constraints is None:
+            return (2, "", -talk.duration)
+        if constraints.together:
+            return (0, constraints.together[0], -talk.duration)
+        return (1, "", -talk.duration)
+
+    def has_short_runs(self, duration_counts, talk_count):
+        """Returns whether pack_duration_counts() would place so few talks per
+        run that it would be slower than placing the talks one at a time.
+
+        Every duration can go into every session, so when the talks are
+        spread over many distinct durations (compared to the number of talks
+        that fit into a session), most runs only hold a talk or two, and the
+        multiset engine then does the work of the "bfd" engine twice (once to
+        pack the runs and once to bind the talks to them).
+
+        Args:
+            duration_counts: A mapping of talk durations (in minutes) to the
+                number of talks with that duration.
+            talk_count: The total number of talks.
+        """
+        total_talks_duration = sum([duration*count for duration, count in duration_counts.items()])
+        sessions = 2*int(math.ceil(total_talks_duration / self.template.track_duration))
+        return talk_count < self.MIN_TALKS_PER_RUN*sessions*len(duration_counts)
+
+    def apply_packing(self, packing, talks):
+        """Clears out any existing talk tracks, and then schedules the given
+        talks according to the given packing.
+
+        Args:
+            packing: A packing of talk durations into tracks, as returned by
+                pack_duration_counts() or to_packing().
+            talks: A collection of Talk instances to bind to the packing's
+                slots. Talks of the same duration are bound to runs in the
+                order in which they appear in this collection, and the order
+                in which the runs were placed.
+        """
+        self.clear()
+        self.add_packing(packing, talks)
+
+    def add_packing(self, packing, talks):
+        """Like apply_packing(), but adds the packing's tracks after any
+        existing tracks instead of clearing them out first."""
+        talks_by_duration = {}
+        for talk in talks:
+            talks_by_duration.setdefault(talk.duration, []).append(talk)
+        # work out where each run's talks start in the list of talks of its
+        # duration, going through the runs in the order in which they were
+        # placed
+        run_starts = {}
+        bound_counts = dict.fromkeys(talks_by_duration, 0)
+        for duration, count, order in sorted(
+                [run for track_runs in packing for runs in track_runs for run in runs],
+                key=operator.itemgetter(2)):
+            bound = bound_counts.get(duration, 0)
+            if bound + count > len(talks_by_duration.get(duration, ())):
+                raise Exception("Not enough %d min talks for the given packing" % duration)
+            run_starts[order] = bound
+            bound_counts[duration] = bound + count
+        for duration, bound in bound_counts.items():
+            if bound < len(talks_by_duration[duration]):
+                raise Exception("The given packing has no space for some %d min talks" % duration)
+        hooks = self.hooks
+        if hooks is None:
+            # nothing needs to hear about each talk, so each session's titles
+            # and durations can be filled in at once
+            self.bind_packing(packing, talks_by_duration, run_starts)
+            self.reindex()
+            return
+        # otherwise add the talks one at a time, in the order in which their
+        # runs were placed (which keeps the runs in each session in order),
+        # only indexing the sessions once they're full
+        runs = []
+        for morning_runs, afternoon_runs in packing:
+            track = TalkTrack(self.next_track_no, template=self.template)
+            self.tracks.append(track)
+            self.next_track_no += 1
+            runs.extend([(run, track.morning_session) for run in morning_runs])
+            runs.extend([(run, track.afternoon_session) for run in afternoon_runs])
+        runs.sort(key=lambda run_session: run_session[0][2])
+        for (duration, count, order), session in runs:
+            start = run_starts[order]
+            for talk in talks_by_duration[duration][start:start+count]:
+                if not session.add_talk(talk):
+                    raise Exception("Talks do not fit into the given packing")
+                hooks.talk_placed(session, talk)
+        self.reindex()
+
+    def bind_packing(self, packing, talks_by_duration, run_starts):
+        """Creates the tracks of the given packing, filling in each session's
+        titles and durations at once (see apply_packing()).
+
+        Args:
+            packing: A packing of talk durations into tracks.
+            talks_by_duration: A dictionary mapping each talk duration to a
+                list of the talks with that duration.
+            run_starts: A dictionary mapping the order of each run to the
+                position of its first talk in talks_by_duration.
+        """
+        titles_by_duration = dict([
+            (duration, [talk.title for talk in duration_talks])
+            for duration, duration_talks in talks_by_duration.items()
+        ])
+        template, tracks = self.template, self.tracks
+        for track_runs in packing:
+            track = TalkTrack(self.next_track_no, template=template)
+            self.next_track_no += 1
+            tracks.append(track)
+            for session, runs in zip((track.morning_session, track.afternoon_session), track_runs):
+                if not runs:
+                    continue
+                titles, durations, start_time = [], array('H'), 0
+                for duration, count, order in runs:
+                    start = run_starts[order]
+                    titles.extend(titles_by_duration[duration][start:start+count])
+                    durations.fromlist([duration]*count)
+                    for talk in talks_by_duration[duration][start:start+count]:
+                        talk.start_time = start_time
+                        start_time += duration
+                if start_time > session.total_time:
+                    raise Exception("Talks do not fit into the given packing")
+                session.talk_titles = titles
+                session.talk_durations = durations
+                session.use_time(start_time)
+
+    def add_talks_exact(self, talks, time_limit=None):
+        """Clears out any existing talk tracks, and then schedules the given
+        talks using the fewest possible tracks (and hence with the least
+        possible wasted time), as found by the ExactSolver.
+
+        Args:
+            talks: A collection of Talk instances to add to the schedule.
+            time_limit: The maximum number of seconds to spend searching. If
+                the time limit is reached, the best schedule found so far is
+                used.
+
+        Returns:
+            True if the schedule is known to be optimal, otherwise False.
+        """
+        duration_counts = {}
+        for talk in talks:
+            duration_counts[talk.duration] = duration_counts.get(talk.duration, 0) + 1
+        solver = ExactSolver(duration_counts, time_limit=time_limit, template=self.template)
+        packing, optimal = solver.solve(prefer_mornings=self.prefer_mornings)
+        if self.verbose:
+            print("Exact solver explored %d nodes in %.3f seconds (%s)" % (
+                solver.nodes,
+                solver.elapsed_time,
+                "optimal" if optimal else "time limit reached"
+            ), file=sys.stderr)
+        self.apply_packing(packing, talks)
+        return optimal
+
+    def apply_assignment(self, talks, talk_indices, session_lengths):
+        """Clears out any existing talk tracks, and then schedules the given
+        talks according to a compact assignment of talks to sessions.
+
+        Args:
+            talks: A sequence of Talk instances.
+            talk_indices: The indices (into talks) of the scheduled talks, in
+                the order in which they appear in the schedule.
+            session_lengths: The number of talks in each session, alternating
+                between each track's morning and afternoon sessions.
+        """
+        self.clear()
+        hooks = self.hooks
+        position = 0
+        for i in range(0, len(session_lengths), 2):
+            track = TalkTrack(self.next_track_no, template=self.template)
+            self.tracks.append(track)
+            self.next_track_no += 1
+            for session, length in ((track.morning_session, session_lengths[i]), (track.afternoon_session, session_lengths[i+1])):
+                for talk_index in talk_indices[position:position+length]:
+                    if not session.add_talk(talks[talk_index]):
+                        raise Exception("Talks do not fit into the given assignment")
+                    if hooks is not None:
+                        hooks.talk_placed(session, talks[talk_index])
+                position += length
+        self.reindex()
+
+    def to_packing(self):
+        """Returns this schedule's packing of talk durations into tracks, in
+        the same format as pack_duration_counts()."""
+        packing, order = [], 0
+        for track in self.tracks:
+            morning_runs = duration_runs(track.morning_session.talk_durations, first_order=order)
+            order += len(morning_runs)
+            afternoon_runs = duration_runs(track.afternoon_session.talk_durations, first_order=order)
+            order += len(afternoon_runs)
+            packing.append((morning_runs, afternoon_runs))
+        return packing
 
     def get_all_sessions(self):
         for track in self.tracks:
@@ -281,91 +1694,3106 @@ class ConferenceSchedule:
         Returns:
             The TalkSession into which to fit this talk.
         """
-        best_morning_session, best_afternoon_session = None, None
-        min_morning_wasted_time, min_afternoon_wasted_time = TRACK_DURATION, TRACK_DURATION
-        for session in self.get_all_sessions():
-            wasted_time = session.wasted_time - talk.duration
-            if session.is_morning_session:
-                if wasted_time >= 0 and wasted_time < min_morning_wasted_time:
-                    best_morning_session = session
-                    min_morning_wasted_time = wasted_time
-            else:
-                if wasted_time >= 0 and wasted_time < min_afternoon_wasted_time:
-                    best_afternoon_session = session
-                    min_afternoon_wasted_time = wasted_time
-        # if we have competing morning and afternoon sessions here
-        if best_morning_session and best_afternoon_session:
-            # if the afternoon session is in an earlier track, prefer it
-            if best_afternoon_session.track.track_no < best_morning_session.track.track_no:
-                return best_afternoon_session
-        # otherwise go for the morning session
-        if best_morning_session:
-            return best_morning_session
-        return best_afternoon_session
+        if talk.constraints is not None and self.constraint_index is not None:
+            return self.find_best_fit_constrained_session(talk)
+        return self.session_index.find_best_fit(talk.duration)
 
     def find_best_fit_session_prefer_mornings(self, talk):
         """Similar to find_best_fit_session(), but prefers to fill up morning
         sessions prior to filling up afternoon ones. This is a natural consequence of
         having afternoon sessions of longer durations than morning ones (given the
         choice of algorithm)."""
-        best_session = None
-        min_wasted_time = TRACK_DURATION
-        for session in self.get_all_sessions():
-            wasted_time = session.wasted_time - talk.duration
-            if wasted_time >= 0 and wasted_time < min_wasted_time:
-                best_session = session
-                min_wasted_time = wasted_time
-        return best_session
+        if talk.constraints is not None and self.constraint_index is not None:
+            return self.find_best_fit_constrained_session(talk, prefer_mornings=True)
+        return self.session_index.find_best_fit(talk.duration, prefer_mornings=True)
+
+    def find_best_fit_constrained_session(self, talk, prefer_mornings=False):
+        """Finds the best fitting session for a talk with TalkConstraints,
+        among the sessions into which it can go without breaking them (see
+        ConstraintIndex). Talks bound to a track by a together tag only look
+        at that track's sessions."""
+        constraints = talk.constraints
+        duration = talk.duration
+        index = self.constraint_index
+        track = index.get_bound_track(constraints)
+        if track is not None:
+            sessions = [
+                session for session in (track.morning_session, track.afternoon_session)
+                if session.wasted_time >= duration and index.accepts(constraints, session, duration)
+            ]
+            if prefer_mornings:
+                sessions.sort(key=lambda session: session.wasted_time)
+            return sessions[0] if sessions else None
+        return self.session_index.find_best_fit(
+            duration,
+            prefer_mornings=prefer_mornings,
+            accept=lambda session: index.is_session_allowed(constraints, session, duration),
+            accept_capacity=lambda is_morning_session, capacity: index.is_time_free(
+                constraints,
+                index.get_start_time(is_morning_session, capacity),
+                duration
+            )
+        )
 
     def create_track(self):
-        track = TalkTrack(self.next_track_no, verbose=self.verbose)
+        track = TalkTrack(self.next_track_no, template=self.template)
         self.tracks.append(track)
+        for session in (track.morning_session, track.afternoon_session):
+            self.session_index.add(session, track.track_no)
+            session.changes = self.changed_sessions
+            self.changed_sessions.append(session)
         self.next_track_no += 1
         return track
 
-    def get_latest_talk(self):
-        return max(
-            [track.get_latest_talk() for track in self.tracks],
-            key=lambda talk: talk.end_time
-        )
+    def add_track_states(self, track_states):
+        """Adds a track after any existing tracks for each of the given
+        (morning_state, afternoon_state) tuples (see TalkSession.get_state()),
+        e.g. to put together tracks that were scheduled in other processes."""
+        hooks = self.hooks
+        for morning_state, afternoon_state in track_states:
+            track = TalkTrack(self.next_track_no, template=self.template)
+            self.tracks.append(track)
+            self.next_track_no += 1
+            for session, state in ((track.morning_session, morning_state), (track.afternoon_session, afternoon_state)):
+                session.restore_state(state)
+                if hooks is not None:
+                    for position in range(session.get_talk_count()):
+                        hooks.talk_placed(session, session.get_talk(position))
+        # only index the sessions once they're full
+        self.reindex()
+
+    def reindex(self):
+        """Rebuilds the session capacity index from this schedule's tracks.
+        Needed if the tracks have been modified directly."""
+        self.session_index = self.create_session_index()
+        self.last_snapshot = None
+        self.changed_sessions = []
+        for track in self.tracks:
+            for session in (track.morning_session, track.afternoon_session):
+                self.session_index.add(session, track.track_no)
+                session.changes = self.changed_sessions
+
+    def snapshot(self):
+        """Takes an immutable snapshot of this schedule, which can later be
+        restored with restore().
+
+        Snapshots share the states of unchanged tracks with the previous
+        snapshot, so taking a snapshot only costs as much as the number of
+        sessions that have changed since the previous one (plus a small amount
+        per ScheduleSnapshot.CHUNK_SIZE tracks).
+        """
+        base = self.last_snapshot
+        positions = self.changed_positions(base)
+        if positions is None:
+            snapshot = ScheduleSnapshot.of_tracks(self.tracks, self.next_track_no)
+        else:
+            snapshot = base.replace(
+                len(self.tracks),
+                self.next_track_no,
+                [(position, self.get_track_state(self.tracks[position])) for position in positions]
+            )
+        self.last_snapshot = snapshot
+        del self.changed_sessions[:]
+        return snapshot
+
+    def restore(self, snapshot):
+        """Restores this schedule to the given snapshot, only touching the
+        sessions that differ between the schedule and the snapshot."""
+        base = self.last_snapshot
+        positions = self.changed_positions(base)
+        if positions is None:
+            positions = set(range(snapshot.track_count))
+        else:
+            positions = set(positions)
+            positions.update(base.differences(snapshot))
+        while len(self.tracks) > snapshot.track_count:
+            self.remove_last_track()
+        while len(self.tracks) < snapshot.track_count:
+            positions.add(len(self.tracks))
+            self.create_track()
+        for position in positions:
+            if position < snapshot.track_count:
+                track = self.tracks[position]
+                track_no, morning_state, afternoon_state = snapshot.get_track_state(position)
+                track.morning_session.restore_state(morning_state)
+                track.afternoon_session.restore_state(afternoon_state)
+        self.next_track_no = snapshot.next_track_no
+        self.last_snapshot = snapshot
+        del self.changed_sessions[:]
+
+    def changed_positions(self, base):
+        """Works out the positions of the tracks that have changed since the
+        given snapshot was taken, or returns None if that can't be done
+        without looking at all of the tracks."""
+        if base is None:
+            return None
+        positions = set(range(base.track_count, len(self.tracks)))
+        for session in self.changed_sessions:
+            if session.changes is None:
+                # the session's track has since been removed
+                continue
+            position = session.track.track_no - 1
+            if position >= len(self.tracks) or self.tracks[position] is not session.track:
+                return None
+            positions.add(position)
+        return sorted(positions)
+
+    @staticmethod
+    def get_track_state(track):
+        return (track.track_no, track.morning_session.get_state(), track.afternoon_session.get_state())
+
+    def get_latest_talk(self):
+        return max(
+            [track.get_latest_talk() for track in self.tracks],
+            key=lambda talk: talk.end_time
+        )
+
+    def remove_last_track(self):
+        """Removes the last track from this schedule (which should be empty)."""
+        track = self.tracks.pop()
+        for session in (track.morning_session, track.afternoon_session):
+            self.session_index.remove(session)
+            session.changes = None
+        self.next_track_no -= 1
+        return track
 
     def get_wasted_time(self):
         return sum([track.get_wasted_time() for track in self.tracks])
 
-    def __str__(self):
-        latest_talk = self.get_latest_talk()
-        return "\n"+("\n\n".join(['%s' % track.to_string(latest_talk.end_time) for track in self.tracks]))
+    def get_duration_counts(self):
+        """Returns a mapping of the durations of the talks in this schedule to
+        the number of talks with each duration."""
+        duration_counts = {}
+        for session in self.get_all_sessions():
+            for duration in session.talk_durations:
+                duration_counts[duration] = duration_counts.get(duration, 0) + 1
+        return duration_counts
+
+    def get_lower_bounds(self):
+        """Returns a (min_tracks, min_sessions) tuple of lower bounds on the
+        number of tracks and non-empty sessions needed for this schedule's
+        talks (see compute_lower_bounds())."""
+        return compute_lower_bounds(self.get_duration_counts(), template=self.template)
+
+    def describe_gap(self):
+        """Describes how far this schedule is from the lower bounds on the
+        number of tracks and sessions, for verbose output."""
+        min_tracks, min_sessions = self.get_lower_bounds()
+        gap = len(self.tracks) - min_tracks
+        return "Lower bound: %d tracks (%d non-empty sessions), so this schedule is %s" % (
+            min_tracks,
+            min_sessions,
+            "optimal" if gap <= 0 else "at most %d track(s) (%d mins) from optimal" % (
+                gap,
+                gap*self.template.track_duration
+            )
+        )
+
+    def get_latest_end_time(self):
+        """Returns the end time of the talk that ends the latest across all
+        tracks (see TalkTrack.get_latest_end_time()), or None if there are no
+        talks."""
+        end_times = [end_time for end_time in map(TalkTrack.get_latest_end_time, self.tracks) if end_time is not None]
+        return max(end_times) if end_times else None
+
+    def __str__(self):
+        outf = io.StringIO()
+        TextScheduleWriter(outf, end="").write(self)
+        return outf.getvalue()
+
+    @classmethod
+    def copy_of(cls, other):
+        schedule = ConferenceSchedule(template=other.template)
+        schedule.tracks = [TalkTrack.copy_of(track) for track in other.tracks]
+        schedule.next_track_no = other.next_track_no
+        schedule.reindex()
+        return schedule
+
+
+class PackedSession:
+    """A lightweight stand-in for a TalkSession, used by
+    pack_duration_counts(), which only keeps track of runs of talk durations
+    rather than individual talks."""
+
+    __slots__ = ("is_morning_session", "wasted_time", "runs", "index")
+
+    def __init__(self, is_morning_session, template=DEFAULT_DAY_TEMPLATE):
+        self.is_morning_session = is_morning_session
+        self.wasted_time = template.get_session_duration(is_morning_session)
+        self.runs = []
+        self.index = None
+
+    def add_run(self, duration, count, order):
+        self.runs.append((duration, count, order))
+        old_wasted_time = self.wasted_time
+        self.wasted_time -= duration*count
+        if self.index is not None:
+            self.index.update(self, old_wasted_time)
+
+
+def duration_runs(durations, first_order=0):
+    """Run-length encodes the given sequence of talk durations into a list of
+    (duration, count, order) tuples, where the runs are numbered
+    consecutively from first_order."""
+    runs = []
+    for duration in durations:
+        if runs and runs[-1][0] == duration:
+            runs[-1] = (duration, runs[-1][1] + 1, runs[-1][2])
+        else:
+            runs.append((duration, 1, first_order + len(runs)))
+    return runs
+
+
+def pack_duration_counts(duration_counts, prefer_mornings=False, template=DEFAULT_DAY_TEMPLATE):
+    """Packs talks into tracks as per the Best Fit Decreasing (BFD) algorithm,
+    given only the number of talks of each duration.
+
+    Once a session is the best fit for a talk, it remains the best fit for
+    subsequent talks of the same duration until it is full, so all of the talks
+    of a particular duration that will fit into it are placed in one step. This
+    produces exactly the same packing as ConferenceSchedule.add_talks(), but
+    its running time depends on the number of distinct durations and tracks
+    rather than on the number of talks.
+
+    Args:
+        duration_counts: A mapping of talk durations (in minutes) to the number
+            of talks with that duration.
+        prefer_mornings: Whether to prefer filling up morning sessions before
+            afternoon ones (see
+            ConferenceSchedule.find_best_fit_session_prefer_mornings()).
+        template: The DayTemplate that gives the sessions' capacities.
+
+    Returns:
+        A list containing a (morning_runs, afternoon_runs) tuple for each
+        track, where each list of runs contains (duration, count, order) tuples
+        in the order in which the talks are scheduled in that session. The
+        order of a run is its position in the sequence in which runs were
+        placed, which determines which talks are bound to which run (see
+        ConferenceSchedule.apply_packing()).
+    """
+    index = SessionCapacityIndex()
+    tracks = []
+    order = 0
+
+    def create_track():
+        track = (PackedSession(True, template=template), PackedSession(False, template=template))
+        tracks.append(track)
+        index.add(track[0], len(tracks))
+        index.add(track[1], len(tracks))
+
+    total_talks_duration = sum([duration*count for duration, count in duration_counts.items()])
+    for i in range(int(math.ceil(total_talks_duration / template.track_duration))):
+        create_track()
+    for duration in sorted(duration_counts, reverse=True):
+        remaining = duration_counts[duration]
+        while remaining > 0:
+            session = index.find_best_fit(duration, prefer_mornings=prefer_mornings)
+            # no space anywhere
+            if session is None:
+                create_track()
+                session = index.find_best_fit(duration, prefer_mornings=prefer_mornings)
+                if session is None:
+                    raise Exception("Talk exceeds maximum duration: %d mins (maximum is %d mins)" % (
+                        duration,
+                        template.max_talk_duration
+                    ))
+            count = min(remaining, session.wasted_time // duration) if duration > 0 else remaining
+            session.add_run(duration, count, order)
+            order += 1
+            remaining -= count
+    return [(morning.runs, afternoon.runs) for morning, afternoon in tracks]
+
+
+def pack_duration_counts_numpy(duration_counts, prefer_mornings=False, template=DEFAULT_DAY_TEMPLATE):
+    """A NumPy version of pack_duration_counts(), which produces exactly the
+    same packing, but places all of the talks of each duration at once.
+
+    The sessions' remaining capacities are kept in arrays (one for morning
+    sessions and one for afternoon sessions, indexed by track). BFD fills
+    each session that is the best fit for a talk with as many talks of that
+    duration as fit, after which the session no longer has space for another
+    one, so the sessions into which the talks of a duration go are simply the
+    sessions with enough space, in the order in which find_best_fit() would
+    pick them. Each of the two kinds of sessions is picked in order of
+    increasing capacity (and then track), and the two orders are merged as
+    per find_best_fit(): by capacity with prefer_mornings, and otherwise by
+    track, for which merging by the highest track number seen so far in each
+    order gives the same result. The talks are then spread over the sessions
+    in that order using a cumulative sum, and any talks left over go into
+    new tracks. Requires NumPy (see pack_duration_counts() otherwise).
+    """
+    total_talks_duration = sum([duration*count for duration, count in duration_counts.items()])
+    track_count = int(math.ceil(total_talks_duration / template.track_duration))
+    session_durations = [template.afternoon_session_duration, template.morning_session_duration]
+    # the remaining capacity of each track's session, indexed by
+    # is_morning_session and then by track
+    capacities = [
+        numpy.full(track_count, session_durations[False], dtype=numpy.int64),
+        numpy.full(track_count, session_durations[True], dtype=numpy.int64)
+    ]
+    # which of a new track's sessions find_best_fit() picks first: the morning
+    # session, unless it's longer than the afternoon one with prefer_mornings
+    first_is_morning = not prefer_mornings or session_durations[True] <= session_durations[False]
+    # the (is_morning_session, track, duration, count) of each run, in the
+    # order in which the runs were placed
+    runs = []
+    for duration in sorted(duration_counts, reverse=True):
+        remaining = duration_counts[duration]
+        if remaining <= 0:
+            continue
+        tracks, kinds = [], []
+        for is_morning_session in (True, False):
+            session_tracks = numpy.flatnonzero(capacities[is_morning_session] >= duration)
+            session_capacities = capacities[is_morning_session][session_tracks]
+            session_tracks = session_tracks[numpy.lexsort((session_tracks, session_capacities))]
+            tracks.append(session_tracks)
+            kinds.append(numpy.full(len(session_tracks), is_morning_session, dtype=bool))
+        if prefer_mornings:
+            merge_keys = [
+                numpy.concatenate([capacities[True][tracks[0]], capacities[False][tracks[1]]]),
+                numpy.concatenate(tracks)
+            ]
+        else:
+            merge_keys = [numpy.concatenate([numpy.maximum.accumulate(tracks[0]), numpy.maximum.accumulate(tracks[1])])]
+        # ties go to morning sessions, and then to the order within each kind
+        positions = numpy.concatenate([numpy.arange(len(tracks[0])), numpy.arange(len(tracks[1]))])
+        kinds = numpy.concatenate(kinds)
+        order = numpy.lexsort([positions, ~kinds] + merge_keys[::-1])
+        tracks = numpy.concatenate(tracks)[order]
+        kinds = kinds[order]
+        if len(tracks) > 0:
+            if duration == 0:
+                # they all go into the best fitting session
+                tracks, kinds = tracks[:1], kinds[:1]
+                counts = numpy.array([remaining], dtype=numpy.int64)
+            else:
+                counts = numpy.where(kinds, capacities[True][tracks], capacities[False][tracks]) // duration
+                totals = numpy.cumsum(counts)
+                last = int(numpy.searchsorted(totals, remaining))
+                if last < len(counts):
+                    counts = counts[:last+1]
+                    counts[last] = remaining - (totals[last-1] if last > 0 else 0)
+                    tracks, kinds = tracks[:last+1], kinds[:last+1]
+            for is_morning_session in (True, False):
+                mask = kinds == is_morning_session
+                capacities[is_morning_session][tracks[mask]] -= counts[mask]*duration
+            runs.extend(zip(kinds.tolist(), tracks.tolist(), itertools.repeat(duration), counts.tolist()))
+            remaining -= int(counts.sum())
+        if remaining > 0:
+            # no session has space for any more of these talks, so each new
+            # track takes as many of them as fit into its first session and
+            # then its second session
+            kinds = (first_is_morning, not first_is_morning)
+            if duration > 0:
+                first_count = session_durations[kinds[0]] // duration
+                second_count = session_durations[kinds[1]] // duration
+            else:
+                first_count, second_count = remaining, 0
+            if first_count + second_count == 0:
+                raise Exception("Talk exceeds maximum duration: %d mins (maximum is %d mins)" % (
+                    duration,
+                    template.max_talk_duration
+                ))
+            full_tracks, leftover = divmod(remaining, first_count + second_count)
+            new_tracks = [(first_count, second_count)]*full_tracks
+            if leftover > 0:
+                new_tracks.append((min(leftover, first_count), max(0, leftover - first_count)))
+            remaining = 0
+            for track, talk_counts in enumerate(new_tracks, track_count):
+                for is_morning_session, talks in zip(kinds, talk_counts):
+                    if talks > 0:
+                        runs.append((is_morning_session, track, duration, talks))
+            new_capacities = numpy.array(new_tracks, dtype=numpy.int64).reshape(-1, 2)
+            for column, is_morning_session in enumerate(kinds):
+                capacities[is_morning_session] = numpy.concatenate([
+                    capacities[is_morning_session],
+                    session_durations[is_morning_session] - new_capacities[:, column]*duration
+                ])
+            track_count += len(new_tracks)
+    packing = [([], []) for _ in range(track_count)]
+    for order, (is_morning_session, track, duration, count) in enumerate(runs):
+        packing[track][0 if is_morning_session else 1].append((duration, count, order))
+    return packing
+
+
+def bin_lower_bound(duration_counts, capacity):
+    """Martello and Toth's L2 lower bound on the number of bins of the given
+    capacity into which talks with the given durations can be packed.
+
+    For each threshold k (up to half the capacity), talks longer than
+    capacity - k can't share a bin with any talk of at least k, talks longer
+    than half the capacity each need a bin of their own, and the talks of at
+    least k that don't fit into the space left over in the bins of the
+    latter need at least their total duration's worth of further bins.
+
+    Args:
+        duration_counts: A mapping of talk durations (in minutes) to the number
+            of talks with that duration.
+        capacity: The capacity of each bin (in minutes).
+
+    Returns:
+        The lower bound on the number of bins.
+    """
+    durations = sorted([duration for duration, count in duration_counts.items() if count > 0 and duration > 0])
+    best = 0
+    for k in [0] + [duration for duration in durations if 2*duration <= capacity]:
+        large_count, medium_count, medium_total, small_total = 0, 0, 0, 0
+        for duration in durations:
+            count = duration_counts[duration]
+            if duration > capacity - k:
+                large_count += count
+            elif 2*duration > capacity:
+                medium_count += count
+                medium_total += duration*count
+            elif duration >= k:
+                small_total += duration*count
+        overflow = small_total - (medium_count*capacity - medium_total)
+        best = max(best, large_count + medium_count + max(0, -(-overflow // capacity)))
+    return best
+
+
+def compute_lower_bounds(duration_counts, template=DEFAULT_DAY_TEMPLATE):
+    """Works out lower bounds on the number of tracks and non-empty sessions
+    that any schedule of talks with the given durations needs, in time that
+    only depends on the number of distinct durations.
+
+    The track bound is the best of:
+
+    * the total duration of the talks over the length of a track (which is
+      how many tracks ConferenceSchedule.add_talks() starts with),
+    * for each duration, the number of talks at least that long over how many
+      of them fit into one track's sessions, and
+    * half of the bound on the number of sessions, which is
+      bin_lower_bound() with each session as long as the longest one.
+
+    Args:
+        duration_counts: A mapping of talk durations (in minutes) to the number
+            of talks with that duration.
+        template: The DayTemplate that gives the sessions' capacities.
+
+    Returns:
+        A (min_tracks, min_sessions) tuple.
+    """
+    morning, afternoon = template.morning_session_duration, template.afternoon_session_duration
+    total_talks_duration = sum([duration*count for duration, count in duration_counts.items()])
+    min_tracks = int(math.ceil(total_talks_duration / template.track_duration))
+    longer_count = 0
+    for duration in sorted(duration_counts, reverse=True):
+        longer_count += duration_counts[duration]
+        if duration > 0 and longer_count > 0:
+            per_track = morning // duration + afternoon // duration
+            if per_track == 0:
+                raise Exception("Talk exceeds maximum duration: %d mins (maximum is %d mins)" % (
+                    duration,
+                    template.max_talk_duration
+                ))
+            min_tracks = max(min_tracks, -(-longer_count // per_track))
+    min_sessions = bin_lower_bound(duration_counts, max(morning, afternoon))
+    return max(min_tracks, -(-min_sessions // 2)), min_sessions
+
+
+class ExactSolver:
+    """Finds a packing of talks into the fewest possible tracks (and hence with
+    the least possible wasted time) using a branch-and-bound search.
+
+    The search starts from the Best Fit Decreasing (BFD) packing, and then
+    repeatedly tries to pack the talks into one track fewer than the best
+    packing found so far. Each attempt fills one session at a time, choosing
+    from the sub-multisets of the remaining talk durations that fit into the
+    session without exceeding the total amount of time that may still be
+    wasted. Since session lengths are small, the sums of durations that can
+    be reached are tracked as bitsets (Python integers), which prunes
+    sub-multisets whose remainder can't fill the session well enough.
+
+    Only fills that leave no space for any of the remaining talks are
+    considered, and fills of sessions of the same length must be in
+    (lexicographically) decreasing order, since there's always an optimal
+    packing of that form.
+    """
+
+    # how often (in search nodes) to check whether we're out of time
+    TIME_CHECK_INTERVAL = 1024
+
+    def __init__(self, duration_counts, time_limit=None, template=DEFAULT_DAY_TEMPLATE):
+        """Constructor.
+
+        Args:
+            duration_counts: A mapping of talk durations (in minutes) to the
+                number of talks with that duration.
+            time_limit: The maximum number of seconds to spend searching (or
+                None to search until the optimal packing is found).
+            template: The DayTemplate giving the lengths of the sessions.
+        """
+        self.duration_counts = dict(duration_counts)
+        self.template = template
+        self.durations = sorted([duration for duration, count in duration_counts.items() if count > 0 and duration > 0], reverse=True)
+        self.counts = tuple([duration_counts[duration] for duration in self.durations])
+        self.total_duration = sum([duration*count for duration, count in duration_counts.items()])
+        self.time_limit = time_limit
+        self.deadline = None
+        self.timed_out = False
+        self.nodes = 0
+        self.elapsed_time = 0.0
+        self.capacities = []
+        self.failed_states = set()
+
+    def solve(self, prefer_mornings=False):
+        """Searches for the packing with the fewest tracks.
+
+        Args:
+            prefer_mornings: Which variant of BFD to use for the initial packing.
+
+        Returns:
+            A (packing, optimal) tuple, where packing is in the same format as
+            that returned by pack_duration_counts(), and optimal indicates
+            whether the packing is known to be optimal (False if the time
+            limit was reached first).
+        """
+        start_time = time.perf_counter()
+        if self.time_limit is not None:
+            self.deadline = start_time + self.time_limit
+        packing = pack_duration_counts(self.duration_counts, prefer_mornings=prefer_mornings, template=self.template)
+        track_count = len(packing)
+        lower_bound, _ = compute_lower_bounds(self.duration_counts, template=self.template)
+        optimal = True
+        while track_count > lower_bound:
+            if self.deadline is not None and time.perf_counter() > self.deadline:
+                self.timed_out = True
+            fills = None if self.timed_out else self.find_fills(track_count - 1)
+            if fills is None:
+                optimal = not self.timed_out
+                break
+            track_count -= 1
+            packing = self.fills_to_packing(fills, track_count)
+        self.elapsed_time = time.perf_counter() - start_time
+        return packing, optimal
+
+    def find_fills(self, track_count):
+        """Attempts to pack the talks into the given number of tracks.
+
+        Returns:
+            A list of the fills (tuples of talk counts per duration) for all of
+            the afternoon sessions followed by all of the morning sessions, or
+            None if no packing was found.
+        """
+        template = self.template
+        self.capacities = [template.afternoon_session_duration]*track_count + \
+            [template.morning_session_duration]*track_count
+        self.failed_states = set()
+        fills = []
+        if self.search(0, self.counts, None, track_count*template.track_duration - self.total_duration, fills):
+            return fills
+        return None
+
+    def search(self, session_no, remaining, previous_fill, slack, fills):
+        if not any(remaining):
+            fills.extend([tuple([0]*len(remaining))]*(len(self.capacities) - session_no))
+            return True
+        if session_no == len(self.capacities):
+            return False
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % self.TIME_CHECK_INTERVAL == 0 and \
+                time.perf_counter() > self.deadline:
+            self.timed_out = True
+        if self.timed_out:
+            return False
+        capacity = self.capacities[session_no]
+        # sessions of the same length are interchangeable, so we only consider
+        # packings in which their fills are in decreasing order
+        symmetric = session_no > 0 and self.capacities[session_no-1] == capacity
+        state = (session_no, remaining, previous_fill if symmetric else None)
+        if state in self.failed_states:
+            return False
+        for fill, used_time in self.session_fills(remaining, capacity, capacity - slack):
+            if symmetric and fill > previous_fill:
+                continue
+            fills.append(fill)
+            if self.search(
+                session_no + 1,
+                tuple([count - used for count, used in zip(remaining, fill)]),
+                fill,
+                slack - (capacity - used_time),
+                fills
+            ):
+                return True
+            fills.pop()
+            if self.timed_out:
+                return False
+        self.failed_states.add(state)
+        return False
+
+    def session_fills(self, remaining, capacity, min_used_time):
+        """Finds all of the ways of filling a session with the given capacity
+        from the remaining talks, using at least min_used_time minutes.
+
+        Returns:
+            A list of (fill, used_time) tuples, fullest fills first.
+        """
+        min_used_time = max(0, min_used_time)
+        durations = self.durations
+        # reachable[i] is a bitset of the sums of durations that can be
+        # reached using the remaining talks with durations[i:]
+        mask = (1 << (capacity + 1)) - 1
+        reachable = [0]*len(durations) + [1]
+        for i in range(len(durations) - 1, -1, -1):
+            bits, duration = reachable[i+1], durations[i]
+            count, part = min(remaining[i], capacity // duration), 1
+            while count > 0:
+                part = min(part, count)
+                bits |= (bits << (duration*part)) & mask
+                count -= part
+                part *= 2
+            reachable[i] = bits
+        if reachable[0] >> min_used_time == 0:
+            return []
+        results = []
+        fill = [0]*len(durations)
+
+        def add_fills(i, used_time):
+            if i == len(durations):
+                # there's no point in leaving space for a talk that would fit,
+                # since we could always move that talk here
+                leftover_time = capacity - used_time
+                for duration, count, used in zip(durations, remaining, fill):
+                    if used < count and duration <= leftover_time:
+                        return
+                results.append((tuple(fill), used_time))
+                return
+            duration = durations[i]
+            for count in range(min(remaining[i], (capacity - used_time) // duration), -1, -1):
+                new_used_time = used_time + count*duration
+                low = max(0, min_used_time - new_used_time)
+                high = capacity - new_used_time
+                # only carry on if the rest of the talks can get us into range
+                if (reachable[i+1] >> low) & ((1 << (high - low + 1)) - 1):
+                    fill[i] = count
+                    add_fills(i + 1, new_used_time)
+            fill[i] = 0
+
+        add_fills(0, 0)
+        results.sort(key=lambda result: -result[1])
+        return results
+
+    def fills_to_packing(self, fills, track_count):
+        """Converts the fills found by find_fills() into a packing in the same
+        format as that returned by pack_duration_counts()."""
+        packing, order = [], 0
+        for track_no in range(track_count):
+            track = ([], [])
+            for runs, fill in zip(track, (fills[track_count + track_no], fills[track_no])):
+                for duration, count in zip(self.durations, fill):
+                    if count > 0:
+                        runs.append((duration, count, order))
+                        order += 1
+            packing.append(track)
+        # talks that take no time at all can go anywhere
+        if self.duration_counts.get(0, 0) > 0 and packing:
+            packing[0][0].append((0, self.duration_counts[0], order))
+        return packing
+
+
+class LocalSearch:
+    """Improves an existing schedule by moving talks between sessions, trying
+    to empty out (and then remove) the last track.
+
+    Each iteration picks a random neighbouring schedule:
+
+    * moving a talk from the last track into a session with enough space,
+    * swapping a talk from the last track with a shorter talk elsewhere,
+    * swapping a talk from the last track with two shorter talks elsewhere, or
+    * moving or swapping talks between two sessions outside of the last track.
+
+    Moves are scored in constant time from the sessions' wasted_time. Moves
+    that take time out of the last track are always accepted. Moves between
+    other sessions are accepted if they don't decrease the sum of the squares
+    of those sessions' wasted time, which gathers the free space into fewer
+    sessions, making room for longer talks from the last track.
+    """
+
+    # how often (in iterations) to check whether we're out of time
+    TIME_CHECK_INTERVAL = 256
+    # how often to accept a rearrangement that scatters the free space
+    WORSENING_MOVE_PROBABILITY = 0.2
+
+    def __init__(self, schedule, seed=0):
+        self.schedule = schedule
+        self.rng = random.Random(seed)
+        self.iterations = 0
+        self.tracks_removed = 0
+        self.elapsed_time = 0.0
+        # no schedule can have fewer tracks than this
+        self.min_tracks = max(schedule.get_lower_bounds()[0], 1)
+
+    def run(self, time_limit, max_iterations=None):
+        """Runs the local search until the time limit (in seconds) or the
+        maximum number of iterations is reached, or until the schedule has no
+        more tracks than the lower bound (see compute_lower_bounds()).
+
+        Returns:
+            The number of tracks that were removed from the schedule.
+        """
+        start_time = time.perf_counter()
+        deadline = start_time + time_limit
+        tracks = self.schedule.tracks
+        while len(tracks) > self.min_tracks:
+            if max_iterations is not None and self.iterations >= max_iterations:
+                break
+            self.iterations += 1
+            if self.iterations % self.TIME_CHECK_INTERVAL == 0 and time.perf_counter() > deadline:
+                break
+            last_track = tracks[-1]
+            if not last_track.morning_session.talk_durations and not last_track.afternoon_session.talk_durations:
+                self.schedule.remove_last_track()
+                self.tracks_removed += 1
+                continue
+            if self.rng.random() < 0.5:
+                self.try_emptying_last_track(last_track)
+            else:
+                self.try_rearranging()
+        self.elapsed_time = time.perf_counter() - start_time
+        return self.tracks_removed
+
+    def random_session(self, tracks):
+        """Picks a random session from any track but the last one (without
+        copying the list of tracks)."""
+        track = tracks[self.rng.randrange(len(tracks) - 1)]
+        return track.morning_session if self.rng.random() < 0.5 else track.afternoon_session
+
+    def try_emptying_last_track(self, last_track):
+        rng = self.rng
+        tracks = self.schedule.tracks
+        source = last_track.morning_session if last_track.morning_session.talk_durations and \
+            (not last_track.afternoon_session.talk_durations or rng.random() < 0.5) else last_track.afternoon_session
+        target = self.random_session(tracks)
+        i = rng.randrange(len(source.talk_durations))
+        duration = source.talk_durations[i]
+        # move
+        if target.wasted_time >= duration:
+            target.append_talk(source.remove_talk_at(i))
+            return True
+        if not target.talk_durations:
+            return False
+        # swap for a shorter talk
+        j = rng.randrange(len(target.talk_durations))
+        other_duration = target.talk_durations[j]
+        if other_duration < duration <= target.wasted_time + other_duration:
+            self.swap(source, i, target, j)
+            return True
+        # swap for two shorter talks
+        if len(target.talk_durations) > 1:
+            k = rng.randrange(len(target.talk_durations) - 1)
+            k += (k >= j)
+            other_duration += target.talk_durations[k]
+            if other_duration < duration <= target.wasted_time + other_duration:
+                first, second = sorted((j, k), reverse=True)
+                talk = source.remove_talk_at(i)
+                source.append_talk(target.remove_talk_at(first))
+                source.append_talk(target.remove_talk_at(second))
+                target.append_talk(talk)
+                return True
+        return False
+
+    def try_rearranging(self):
+        rng = self.rng
+        tracks = self.schedule.tracks
+        if len(tracks) < 2:
+            return False
+        source, target = self.random_session(tracks), self.random_session(tracks)
+        if source is target or not source.talk_durations:
+            return False
+        i = rng.randrange(len(source.talk_durations))
+        duration = source.talk_durations[i]
+        if target.wasted_time >= duration:
+            if self.accept(self.squared_waste_delta(source, target, duration)):
+                target.append_talk(source.remove_talk_at(i))
+                return True
+            return False
+        if not target.talk_durations:
+            return False
+        j = rng.randrange(len(target.talk_durations))
+        difference = duration - target.talk_durations[j]
+        if 0 < difference <= target.wasted_time and self.accept(self.squared_waste_delta(source, target, difference)):
+            self.swap(source, i, target, j)
+            return True
+        return False
+
+    def accept(self, delta):
+        return delta >= 0 or self.rng.random() < self.WORSENING_MOVE_PROBABILITY
+
+    @staticmethod
+    def squared_waste_delta(source, target, duration):
+        """The change in the sum of the squares of the two sessions' wasted
+        time if the given number of minutes is moved from source to target."""
+        return (source.wasted_time + duration)**2 + (target.wasted_time - duration)**2 - \
+            source.wasted_time**2 - target.wasted_time**2
+
+    @staticmethod
+    def swap(source, i, target, j):
+        talk = source.remove_talk_at(i)
+        other_talk = target.remove_talk_at(j)
+        target.append_talk(talk)
+        source.append_talk(other_talk)
+
+
+# The durations of the talks, and the random seed, for search_schedules()'
+# worker processes.
+restart_worker_state = {}
+
+
+def init_restart_worker(durations, seed):
+    restart_worker_state["durations"] = durations
+    restart_worker_state["seed"] = seed
+
+
+def run_restart(task):
+    """Runs a single restart of search_schedules() in a worker process.
+
+    Args:
+        task: A (restart_no, strategy_no, prefer_mornings) tuple.
+
+    Returns:
+        A compact (wasted_time, track_count, restart_no, strategy_no,
+        talk_indices, session_lengths) tuple describing the resulting schedule
+        (see ConferenceSchedule.apply_assignment()).
+    """
+    restart_no, strategy_no, prefer_mornings = task
+    durations = restart_worker_state["durations"]
+    order = list(range(len(durations)))
+    if restart_no == 0:
+        order.sort(key=lambda i: -durations[i])
+    else:
+        rng = random.Random("%d:%d" % (restart_worker_state["seed"], restart_no))
+        noise = [rng.uniform(1 - RESTART_PERTURBATION, 1 + RESTART_PERTURBATION) for i in order]
+        order.sort(key=lambda i: -durations[i]*noise[i])
+    # the talks' titles are their indices into the list of durations
+    schedule = ConferenceSchedule(prefer_mornings=prefer_mornings)
+    schedule.add_talks([Talk("%d" % i, durations[i]) for i in order], presorted=True)
+    sessions = list(schedule.get_all_sessions())
+    return (
+        schedule.get_wasted_time(),
+        len(schedule.tracks),
+        restart_no,
+        strategy_no,
+        array('I', [int(title) for session in sessions for title in session.talk_titles]),
+        array('H', [session.get_talk_count() for session in sessions])
+    )
+
+
+def search_schedules(talks, restarts=1, workers=1, seed=0, prefer_mornings=False,
+                     both_strategies=False, verbose=False, hooks=None):
+    """Searches for the best schedule for the given talks by running the Best
+    Fit Decreasing (BFD) algorithm several times.
+
+    The first restart is plain BFD. Subsequent restarts place the talks in a
+    randomly perturbed order of decreasing duration (since BFD sorts talks by
+    duration, merely shuffling them would only reorder talks of equal
+    duration). Restarts can be run in parallel across a pool of worker
+    processes, and the result is deterministic for a given seed regardless of
+    the number of workers.
+
+    Args:
+        talks: A sequence of Talk instances to schedule.
+        restarts: How many times to run BFD.
+        workers: How many worker processes to use.
+        seed: The random seed from which each restart's seed is derived.
+        prefer_mornings: Which find_best_fit_session() variant to use.
+        both_strategies: If True, each restart is run with both variants of
+            find_best_fit_session().
+        verbose: Whether to print out the results of each restart.
+        hooks: Optional ScheduleHooks for the resulting schedule, which are
+            notified as the best schedule's talks are placed.
+
+    The search stops as soon as a restart reaches the lower bound on the
+    number of tracks (see compute_lower_bounds()), since no later restart
+    could beat it. Results are looked at in order of restart, so this
+    doesn't change which schedule is picked.
+
+    Returns:
+        The ConferenceSchedule with the least wasted time, with ties going to
+        the schedule with fewer tracks, and then to earlier restarts.
+    """
+    talks = list(talks)
+    durations = array('H', [talk.duration for talk in talks])
+    duration_counts = {}
+    for duration in durations:
+        duration_counts[duration] = duration_counts.get(duration, 0) + 1
+    min_tracks, _ = compute_lower_bounds(duration_counts)
+    strategies = [prefer_mornings, not prefer_mornings] if both_strategies else [prefer_mornings]
+    tasks = [
+        (restart_no, strategy_no, strategy)
+        for restart_no in range(restarts)
+        for strategy_no, strategy in enumerate(strategies)
+    ]
+    results = []
+    if workers > 1:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_restart_worker,
+            initargs=(durations, seed)
+        ) as executor:
+            for result in executor.map(run_restart, tasks, chunksize=max(1, len(tasks) // (4*workers))):
+                results.append(result)
+                if result[1] <= min_tracks:
+                    executor.shutdown(cancel_futures=True)
+                    break
+    else:
+        init_restart_worker(durations, seed)
+        for task in tasks:
+            results.append(run_restart(task))
+            if results[-1][1] <= min_tracks:
+                break
+
+    if verbose:
+        for wasted_time, track_count, restart_no, strategy_no, talk_indices, session_lengths in results:
+            print("Restart %d (%s): %d tracks, %d mins wasted" % (
+                restart_no,
+                "prefer mornings" if strategies[strategy_no] else "default",
+                track_count,
+                wasted_time
+            ), file=sys.stderr)
+        if len(results) < len(tasks):
+            print("Stopped after %d of %d runs, having reached the lower bound of %d tracks" % (
+                len(results),
+                len(tasks),
+                min_tracks
+            ), file=sys.stderr)
+    best = min(results, key=lambda result: result[:4])
+    schedule = ConferenceSchedule(prefer_mornings=strategies[best[3]], verbose=verbose, hooks=hooks)
+    schedule.apply_assignment(talks, best[4], best[5])
+    return schedule
+
+
+def distribute_talks(talks, templates):
+    """Distributes talks across the days of a multi-day event, so that each
+    day can then be scheduled on its own.
+
+    Each day's share of the talks is in proportion to its capacity (the
+    length of its tracks, times its number of rooms if it's limited). Talks
+    are dealt out in order of decreasing duration, each going to the day that
+    is the least full relative to its capacity, among the days on which it
+    fits. This balancing pass takes O(n log d) time for n talks and d days.
+
+    Args:
+        talks: A sequence of Talk instances.
+        templates: A DayTemplate for each day.
+
+    Returns:
+        A list with the talks for each day, in the order in which they were
+        given.
+    """
+    talks = list(talks)
+    if not templates:
+        raise Exception("There must be at least one day")
+    capacities = [template.track_duration*(template.rooms or 1) for template in templates]
+    # the days, in order of decreasing maximum talk duration, so that they can
+    # be added to the heap as soon as the talks are short enough for them
+    days_by_max_duration = sorted(range(len(templates)), key=lambda day: -templates[day].max_talk_duration)
+    next_day = 0
+    # heap of (used_time / capacity, day)
+    heap = []
+    used_times = [0]*len(templates)
+    talk_days = array('H', [0])*len(talks)
+    for i in sorted(range(len(talks)), key=lambda i: -talks[i].duration):
+        duration = talks[i].duration
+        while next_day < len(days_by_max_duration) and \
+                templates[days_by_max_duration[next_day]].max_talk_duration >= duration:
+            heapq.heappush(heap, (0.0, days_by_max_duration[next_day]))
+            next_day += 1
+        if not heap:
+            raise Exception("Talk exceeds maximum duration on every day: %s (maximum is %d mins)" % (
+                talks[i].title,
+                max([template.max_talk_duration for template in templates])
+            ))
+        _, day = heap[0]
+        talk_days[i] = day
+        used_times[day] += duration
+        heapq.heapreplace(heap, (used_times[day] / capacities[day], day))
+    days = [[] for _ in templates]
+    for talk, day in zip(talks, talk_days):
+        days[day].append(talk)
+    return days
+
+
+def pack_day(task):
+    """Packs a single day's talks for schedule_days(), possibly in a worker
+    process.
+
+    Args:
+        task: A (duration_counts, prefer_mornings, template, engine) tuple.
+
+    Returns:
+        The packing, as returned by pack_duration_counts().
+    """
+    duration_counts, prefer_mornings, template, engine = task
+    pack = pack_duration_counts_numpy if engine == "numpy" and numpy is not None else pack_duration_counts
+    return pack(duration_counts, prefer_mornings=prefer_mornings, template=template)
+
+
+def schedule_days(talks, templates, prefer_mornings=False, workers=1, engine="multiset", verbose=False,
+                  hooks=None):
+    """Schedules a multi-day event: the talks are distributed across the days
+    by distribute_talks(), and then each day is packed independently, in
+    parallel across a pool of worker processes. Only the per-duration talk
+    counts are sent to the workers, and the talks are bound to the packings
+    (see ConferenceSchedule.apply_packing()) once they come back, so the
+    scheduling time is that of the largest day rather than of the whole event.
+
+    Args:
+        talks: A sequence of Talk instances to schedule.
+        templates: A DayTemplate for each day.
+        prefer_mornings: Whether to prefer filling up morning sessions before
+            afternoon ones.
+        workers: How many worker processes to use.
+        engine: The engine with which to pack each day ("numpy" to use
+            pack_duration_counts_numpy(), otherwise pack_duration_counts(),
+            which gives the same schedule as the "bfd" engine).
+        verbose: Whether to print out each talk as it is placed.
+        hooks: Optional ScheduleHooks for the days' schedules.
+
+    Returns:
+        A ConferenceSchedule for each day.
+    """
+    start_time = time.perf_counter()
+    days = distribute_talks(talks, templates)
+    tasks = []
+    for day_talks, template in zip(days, templates):
+        duration_counts = {}
+        for talk in day_talks:
+            duration_counts[talk.duration] = duration_counts.get(talk.duration, 0) + 1
+        tasks.append((duration_counts, prefer_mornings, template, engine))
+    if hooks is not None:
+        hooks.phase_finished("distribute", time.perf_counter() - start_time)
+        start_time = time.perf_counter()
+    if workers > 1 and len(tasks) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            packings = list(executor.map(pack_day, tasks))
+    else:
+        packings = [pack_day(task) for task in tasks]
+    if hooks is not None:
+        hooks.phase_finished("pack", time.perf_counter() - start_time)
+        start_time = time.perf_counter()
+    schedules = []
+    for day_talks, template, packing in zip(days, templates, packings):
+        schedule = ConferenceSchedule(prefer_mornings=prefer_mornings, verbose=verbose, hooks=hooks, template=template)
+        schedule.apply_packing(packing, day_talks)
+        schedules.append(schedule)
+    if hooks is not None:
+        hooks.phase_finished("bind", time.perf_counter() - start_time)
+    return schedules
+
+
+def split_duration_counts(duration_counts, shards):
+    """Splits the number of talks of each duration between the given number
+    of shards, so that the shards' total durations are balanced. Each
+    duration's talks are dealt out evenly, with any left over going to the
+    shards with the least total duration so far (longest durations first).
+
+    Returns:
+        A list with a duration_counts mapping for each shard.
+    """
+    shard_counts = [{} for _ in range(shards)]
+    totals = [0]*shards
+    for duration in sorted(duration_counts, reverse=True):
+        share, remainder = divmod(duration_counts[duration], shards)
+        lightest = set(sorted(range(shards), key=lambda shard: (totals[shard], shard))[:remainder])
+        for shard in range(shards):
+            count = share + 1 if shard in lightest else share
+            if count > 0:
+                shard_counts[shard][duration] = count
+                totals[shard] += duration*count
+    return shard_counts
+
+
+def find_shard_tail(wasted_times):
+    """Finds where a shard's tail starts: its last track, and the tracks
+    before it that waste more time than the shard's median track.
+
+    Args:
+        wasted_times: How many minutes each of the shard's tracks wastes.
+
+    Returns:
+        The position of the first track of the tail.
+    """
+    median_wasted_time = sorted(wasted_times)[len(wasted_times) // 2] if wasted_times else 0
+    tail = max(len(wasted_times) - 1, 0)
+    while tail > 0 and wasted_times[tail - 1] > median_wasted_time:
+        tail -= 1
+    return tail
+
+
+def schedule_shard(task):
+    """Schedules a single shard's talks for schedule_sharded(), possibly in a
+    worker process, and takes apart the shard's tail (see find_shard_tail()).
+
+    Best Fit Decreasing leaves its last few tracks partly empty, so putting
+    the shards together as they are would waste that much time in every
+    shard. The tails' talks are packed together at the end instead, so the
+    loss against scheduling everything at once is limited to what the
+    repacked tails waste.
+
+    Args:
+        task: A (titles_by_duration, prefer_mornings, template, engine) tuple,
+            where titles_by_duration maps each talk duration to the titles of
+            the shard's talks with that duration.
+
+    Returns:
+        A (track_states, tail_titles, tail_tracks) tuple with a
+        (morning_state, afternoon_state) tuple for each of the shard's tracks
+        before its tail (see TalkSession.get_state()), a dictionary mapping
+        each talk duration to the titles of the tail's talks with that
+        duration, and the number of tracks in the tail.
+    """
+    titles_by_duration, prefer_mornings, template, engine = task
+    schedule = ConferenceSchedule(prefer_mornings=prefer_mornings, engine=engine, template=template)
+    schedule.add_talks([
+        Talk(title, duration) for duration, titles in titles_by_duration.items() for title in titles
+    ])
+    tail = find_shard_tail([track.get_wasted_time() for track in schedule.tracks])
+    tail_titles = {}
+    for track in schedule.tracks[tail:]:
+        for session in (track.morning_session, track.afternoon_session):
+            for title, duration in zip(session.talk_titles, session.talk_durations):
+                tail_titles.setdefault(duration, []).append(title)
+    return (
+        [(track.morning_session.get_state(), track.afternoon_session.get_state()) for track in schedule.tracks[:tail]],
+        tail_titles,
+        len(schedule.tracks) - tail
+    )
+
+
+def schedule_sharded(talks, shards, workers=1, prefer_mornings=False, engine="bfd", verbose=False, hooks=None,
+                     template=DEFAULT_DAY_TEMPLATE):
+    """Schedules a single (very large) day by splitting its talks into shards
+    with balanced total durations (see split_duration_counts()), and
+    scheduling each shard on its own, in parallel across a pool of worker
+    processes. The workers send back the sessions of all of their tracks but
+    those of their tails (see schedule_shard()), so only the tails' talks are
+    left to be packed together and bound at the end, with the tracks numbered
+    across all of the shards.
+
+    Each shard gets the next of each duration's talks (in the order given),
+    and only the talks' titles are sent to the workers, so the Talk instances
+    given aren't changed.
+
+    Args:
+        talks: A sequence of Talk instances to schedule.
+        shards: How many shards to split the talks into.
+        workers: How many worker processes to use.
+        prefer_mornings: Whether to prefer filling up morning sessions before
+            afternoon ones.
+        engine: The engine with which to schedule each shard.
+        verbose: Whether to print out each talk as it is placed, and how the
+            shards' tails were repaired.
+        hooks: Optional ScheduleHooks for the resulting schedule.
+        template: The DayTemplate that gives the shape of each track.
+
+    Returns:
+        The resulting ConferenceSchedule.
+    """
+    start_time = time.perf_counter()
+    titles_by_duration = {}
+    for talk in talks:
+        titles_by_duration.setdefault(talk.duration, []).append(talk.title)
+    duration_counts = dict([(duration, len(titles)) for duration, titles in titles_by_duration.items()])
+    tasks, dealt_counts = [], dict.fromkeys(titles_by_duration, 0)
+    for shard_counts in split_duration_counts(duration_counts, shards):
+        if not shard_counts:
+            continue
+        shard_titles = {}
+        for duration, count in shard_counts.items():
+            dealt = dealt_counts[duration]
+            shard_titles[duration] = titles_by_duration[duration][dealt:dealt+count]
+            dealt_counts[duration] = dealt + count
+        tasks.append((shard_titles, prefer_mornings, template, engine))
+    if hooks is not None:
+        hooks.phase_finished("split", time.perf_counter() - start_time)
+        start_time = time.perf_counter()
+    if workers > 1 and len(tasks) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            results = list(executor.map(schedule_shard, tasks))
+    else:
+        results = [schedule_shard(task) for task in tasks]
+    if hooks is not None:
+        hooks.phase_finished("pack", time.perf_counter() - start_time)
+        start_time = time.perf_counter()
+    schedule = ConferenceSchedule(
+        prefer_mornings=prefer_mornings,
+        verbose=verbose,
+        engine=engine,
+        hooks=hooks,
+        template=template
+    )
+    schedule.add_track_states([states for track_states, _, _ in results for states in track_states])
+    tail_talks, tail_counts, tail_tracks = [], {}, 0
+    for _, tail_titles, shard_tail_tracks in results:
+        for duration, titles in tail_titles.items():
+            tail_talks.extend([Talk(title, duration) for title in titles])
+            tail_counts[duration] = tail_counts.get(duration, 0) + len(titles)
+        tail_tracks += shard_tail_tracks
+    repacked = pack_duration_counts(tail_counts, prefer_mornings=prefer_mornings, template=template)
+    if hooks is not None:
+        hooks.phase_finished("merge", time.perf_counter() - start_time)
+        start_time = time.perf_counter()
+    schedule.add_packing(repacked, tail_talks)
+    if hooks is not None:
+        hooks.phase_finished("bind", time.perf_counter() - start_time)
+    if verbose:
+        print("Packed %d shards, and repacked their %d tail tracks into %d tracks" % (
+            len(results),
+            tail_tracks,
+            len(repacked)
+        ), file=sys.stderr)
+    return schedule
+
+
+class ScheduleEditor:
+    """Withdraws talks from, and inserts talks into, an existing schedule
+    without rescheduling it from scratch, keeping track of the changes so that
+    only the talks that have moved need to be republished.
+
+    Withdrawing a talk moves the talks after it in its session earlier to
+    close the gap. Inserted talks are added to the end of the best fitting
+    session (as per find_best_fit_session()), and a new track is only added if
+    no session has space. Apart from indexing the talks' titles up front,
+    each edit only costs as much as the session it touches.
+    """
+
+    # the kinds of changes, in the order in which they're listed for the
+    # same slot
+    CHANGES = ("withdrawn", "moved", "added")
+
+    def __init__(self, schedule):
+        self.schedule = schedule
+        # maps each title to the sessions containing a talk with that title
+        # (once per talk)
+        self.sessions_by_title = {}
+        for session in schedule.get_all_sessions():
+            for title in session.talk_titles:
+                self.sessions_by_title.setdefault(title, []).append(session)
+        # the (track_no, titles, durations) of each session that has been
+        # edited, from before its first edit
+        self.original_sessions = {}
+        self.original_latest_end_time = schedule.get_latest_end_time()
+        self.withdrawn = 0
+        self.inserted = 0
+
+    def touch(self, session):
+        """Remembers the given session's talks before it's first edited."""
+        if session not in self.original_sessions:
+            self.original_sessions[session] = (
+                session.track.track_no,
+                list(session.talk_titles),
+                list(session.talk_durations)
+            )
+
+    def withdraw(self, title, duration=None):
+        """Withdraws a talk from the schedule, removing any tracks left empty
+        at the end of the schedule.
+
+        Args:
+            title: The title of the talk to withdraw.
+            duration: The duration of the talk, if only a talk with this
+                duration should be withdrawn.
+
+        Returns:
+            The withdrawn Talk, or None if there's no such talk.
+        """
+        sessions = self.sessions_by_title.get(title, [])
+        for i, session in enumerate(sessions):
+            for position, talk_title in enumerate(session.talk_titles):
+                if talk_title == title and (duration is None or session.talk_durations[position] == duration):
+                    self.touch(session)
+                    talk = session.remove_talk_at(position)
+                    del sessions[i]
+                    if not sessions:
+                        del self.sessions_by_title[title]
+                    self.remove_empty_tracks()
+                    self.withdrawn += 1
+                    return talk
+        return None
+
+    def insert(self, talk):
+        """Inserts a talk into the best fitting session.
+
+        Returns:
+            The TalkSession into which the talk was inserted.
+        """
+        schedule = self.schedule
+        hooks = schedule.hooks
+        session = schedule.find_best_fit_session_prefer_mornings(talk) \
+            if schedule.prefer_mornings else schedule.find_best_fit_session(talk)
+        if session is None:
+            track = schedule.create_track()
+            if hooks is not None:
+                hooks.track_added(track, True)
+            session = schedule.find_best_fit_session_prefer_mornings(talk) \
+                if schedule.prefer_mornings else schedule.find_best_fit_session(talk)
+            if session is None:
+                raise Exception("Talk exceeds maximum duration: %s (maximum is %d mins)" % (
+                    talk.title,
+                    schedule.template.max_talk_duration
+                ))
+        self.touch(session)
+        if not session.add_talk(talk):
+            raise Exception("Something went horribly wrong")
+        if hooks is not None:
+            hooks.talk_placed(session, talk)
+        self.sessions_by_title.setdefault(talk.title, []).append(session)
+        self.inserted += 1
+        return session
+
+    def update(self, talks):
+        """Updates the schedule so that it contains exactly the given talks,
+        withdrawing the scheduled talks that aren't among them, and then
+        inserting the talks that aren't scheduled yet (in order of decreasing
+        duration, as in add_talks()). Talks are matched up by their titles
+        and durations, so a talk whose duration has changed is withdrawn and
+        inserted again."""
+        unscheduled = {}
+        for talk in talks:
+            unscheduled.setdefault((talk.title, talk.duration), []).append(talk)
+        withdrawals = []
+        for session in self.schedule.get_all_sessions():
+            for key in zip(session.talk_titles, session.talk_durations):
+                if unscheduled.get(key):
+                    unscheduled[key].pop()
+                else:
+                    withdrawals.append(key)
+        for title, duration in withdrawals:
+            self.withdraw(title, duration)
+        insertions = [talk for key_talks in unscheduled.values() for talk in key_talks]
+        for talk in sorted(insertions, key=lambda talk: -talk.duration):
+            self.insert(talk)
+
+    def remove_empty_tracks(self):
+        tracks = self.schedule.tracks
+        while tracks and not tracks[-1].morning_session.talk_durations and \
+                not tracks[-1].afternoon_session.talk_durations:
+            self.schedule.remove_last_track()
+
+    def get_changes(self):
+        """Works out how the talks in the edited sessions have changed.
+
+        Returns:
+            A list of (change, title, duration, old_slot, new_slot) tuples,
+            where change is "withdrawn", "added" or "moved", and the slots are
+            (track_no, start_time) tuples (with start times in minutes since
+            midnight), or None for the old slot of an added talk and the new
+            slot of a withdrawn one. Talks that have stayed in their slots
+            aren't included. The changes are sorted by slot.
+        """
+        tracks = self.schedule.tracks
+        old_slots, new_slots = {}, {}
+        for session, (track_no, titles, durations) in self.original_sessions.items():
+            self.add_slots(old_slots, track_no, session.start_hour, titles, durations)
+            position = session.track.track_no - 1
+            if position < len(tracks) and tracks[position] is session.track:
+                self.add_slots(
+                    new_slots,
+                    session.track.track_no,
+                    session.start_hour,
+                    session.talk_titles,
+                    session.talk_durations
+                )
+        changes = []
+        for key in set(old_slots) | set(new_slots):
+            old, new = old_slots.get(key, []), new_slots.get(key, [])
+            unchanged = set(old) & set(new)
+            old = [slot for slot in old if slot not in unchanged]
+            new = [slot for slot in new if slot not in unchanged]
+            for old_slot, new_slot in itertools.zip_longest(old, new):
+                change = "withdrawn" if new_slot is None else ("added" if old_slot is None else "moved")
+                changes.append((change, key[0], key[1], old_slot, new_slot))
+        changes.sort(key=lambda change: (change[4] or change[3], self.CHANGES.index(change[0])))
+        return changes
+
+    @staticmethod
+    def add_slots(slots, track_no, start_hour, titles, durations):
+        start_time = start_hour*60
+        for title, duration in zip(titles, durations):
+            slots.setdefault((title, duration), []).append((track_no, start_time))
+            start_time += duration
+
+    def format_changes(self):
+        """Describes the changes to the schedule (see get_changes()), one line
+        per change, followed by the networking event's new start time if it
+        has changed."""
+        def format_slot(slot):
+            return "Track %d %s" % (slot[0], friendly_time(slot[1]))
+
+        lines = []
+        for change, title, duration, old_slot, new_slot in self.get_changes():
+            talk = "%s %s" % (title, Talk(title, duration).get_friendly_duration())
+            if change == "withdrawn":
+                lines.append("- %s %s" % (format_slot(old_slot), talk))
+            elif change == "added":
+                lines.append("+ %s %s" % (format_slot(new_slot), talk))
+            else:
+                lines.append("~ %s -> %s %s" % (format_slot(old_slot), format_slot(new_slot), talk))
+        latest_end_time = self.schedule.get_latest_end_time()
+        if latest_end_time != self.original_latest_end_time:
+            start_hour = self.schedule.template.lunch_end_hour
+            lines.append("~ Networking Event %s -> %s" % (
+                friendly_time(self.original_latest_end_time or 0, start_hour=start_hour),
+                friendly_time(latest_end_time or 0, start_hour=start_hour)
+            ))
+        return lines
+
+
+class OnlineScheduler:
+    """Schedules talks one at a time as they arrive, without sorting them
+    first, keeping at most max_open_tracks tracks open.
+
+    Each talk goes into the best fitting session of the open tracks (as per
+    find_best_fit_session()). If it doesn't fit anywhere, a new track is
+    opened, first closing the fullest open track if there are already
+    max_open_tracks of them. Tracks are also closed as soon as they're full
+    enough, i.e. when they waste at most close_wasted_time minutes. Closed
+    tracks are handed back to the caller and forgotten, so the memory used
+    doesn't depend on the number of talks.
+
+    Tracks are numbered in the order in which they're closed. Only the
+    number of talks of each duration is kept, so that the online schedule's
+    quality can be compared with offline BFD afterwards (see
+    compare_with_offline()).
+    """
+
+    # rebuild the session index (dropping its stale entries) after this many
+    # index updates
+    REINDEX_INTERVAL = 4096
+
+    def __init__(self, max_open_tracks=DEFAULT_OPEN_TRACKS, close_wasted_time=DEFAULT_CLOSE_WASTED_TIME,
+                 prefer_mornings=False, hooks=None):
+        """Constructor.
+
+        Args:
+            max_open_tracks: The maximum number of tracks into which talks can
+                still be placed.
+            close_wasted_time: Tracks with at most this many minutes of
+                wasted time are closed straight away.
+            prefer_mornings: Whether to prefer filling up morning sessions
+                before afternoon ones.
+            hooks: Optional ScheduleHooks to notify as talks are placed and
+                tracks are opened.
+        """
+        if max_open_tracks < 1:
+            raise Exception("At least one track must be kept open")
+        self.max_open_tracks = max_open_tracks
+        self.close_wasted_time = close_wasted_time
+        self.prefer_mornings = prefer_mornings
+        self.hooks = hooks
+        self.open_tracks = []
+        self.tracks_opened = 0
+        self.next_track_no = 1
+        self.duration_counts = {}
+        self.session_index = self.create_session_index()
+
+    def create_session_index(self):
+        if self.hooks is None:
+            return SessionCapacityIndex()
+        return self.hooks.create_session_index()
+
+    def add_talk(self, talk):
+        """Places the given talk into one of the open tracks.
+
+        Returns:
+            A list of the tracks that have been closed as a result.
+        """
+        if talk.constraints is not None:
+            raise Exception("Talk constraints aren't supported when scheduling talks online: %s" % talk.title)
+        closed_tracks = []
+        hooks = self.hooks
+        session = self.session_index.find_best_fit(talk.duration, prefer_mornings=self.prefer_mornings)
+        if session is None:
+            if len(self.open_tracks) >= self.max_open_tracks:
+                closed_tracks.append(self.close_track(min(self.open_tracks, key=TalkTrack.get_wasted_time)))
+            track = self.open_track()
+            if hooks is not None:
+                hooks.track_added(track, True)
+            session = self.session_index.find_best_fit(talk.duration, prefer_mornings=self.prefer_mornings)
+            if session is None:
+                raise Exception("Talk exceeds maximum duration: %s (maximum is %d mins)" % (
+                    talk.title,
+                    MAX_TALK_DURATION
+                ))
+        if not session.add_talk(talk):
+            raise Exception("Something went horribly wrong")
+        if hooks is not None:
+            hooks.talk_placed(session, talk)
+        self.duration_counts[talk.duration] = self.duration_counts.get(talk.duration, 0) + 1
+        if session.track.get_wasted_time() <= self.close_wasted_time:
+            closed_tracks.append(self.close_track(session.track))
+        if self.session_index.seq > self.REINDEX_INTERVAL:
+            self.reindex()
+        return closed_tracks
+
+    def finish(self):
+        """Closes all of the open tracks, in the order in which they were
+        opened, and returns them."""
+        return [self.close_track(track) for track in list(self.open_tracks)]
+
+    def schedule(self, talks):
+        """Places the given talks (e.g. from a read_talks() iterator) one at a
+        time, yielding each track as soon as it's closed."""
+        for talk in talks:
+            yield from self.add_talk(talk)
+        yield from self.finish()
+
+    def open_track(self):
+        self.tracks_opened += 1
+        track = TalkTrack(self.tracks_opened)
+        self.open_tracks.append(track)
+        self.session_index.add(track.morning_session, track.track_no)
+        self.session_index.add(track.afternoon_session, track.track_no)
+        return track
+
+    def close_track(self, track):
+        self.open_tracks.remove(track)
+        self.session_index.remove(track.morning_session)
+        self.session_index.remove(track.afternoon_session)
+        track.track_no = self.next_track_no
+        self.next_track_no += 1
+        return track
+
+    def reindex(self):
+        self.session_index = self.create_session_index()
+        for track in self.open_tracks:
+            self.session_index.add(track.morning_session, track.track_no)
+            self.session_index.add(track.afternoon_session, track.track_no)
+
+    def compare_with_offline(self):
+        """Compares the tracks closed so far with the schedule that offline
+        BFD would have produced for the same talks (as packed by
+        pack_duration_counts(), which takes memory for each track).
+
+        Returns:
+            A JSON-serialisable dictionary with the number of tracks used and
+            minutes wasted by both schedules, as well as the lower bound on
+            the number of tracks (from the talks' total duration).
+        """
+        total_talks_duration = sum([duration*count for duration, count in self.duration_counts.items()])
+        tracks = self.next_track_no - 1
+        offline_tracks = len(pack_duration_counts(self.duration_counts, prefer_mornings=self.prefer_mornings))
+        return {
+            "tracks": tracks,
+            "wasted_time": tracks*TRACK_DURATION - total_talks_duration,
+            "offline_tracks": offline_tracks,
+            "offline_wasted_time": offline_tracks*TRACK_DURATION - total_talks_duration,
+            "min_tracks": compute_lower_bounds(self.duration_counts)[0]
+        }
+
+
+class ScheduleCache:
+    """A persistent, content-addressed cache of packings (see
+    pack_duration_counts()), stored as one JSON file per key in a directory.
+
+    Keys are hashes of a multiset of talk durations and the options that
+    affect how it is packed, so a cached packing can be reused for any list of
+    talks with the same durations by binding the talks' titles to it with
+    ConferenceSchedule.apply_packing().
+
+    Files are written atomically (to a temporary file which then replaces the
+    entry), so concurrent invocations sharing a cache directory only ever see
+    complete entries. Reading an entry updates its modification time, and when
+    the total size of the entries exceeds max_bytes the least recently used
+    entries are removed.
+    """
+
+    FORMAT_VERSION = 1
+    # temporary files older than this (in seconds) were left behind by
+    # interrupted writes, and can be removed
+    STALE_TEMP_FILE_AGE = 3600
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def get_default_dir(cls):
+        """Returns the default cache directory ($XDG_CACHE_HOME/sort_talks or
+        ~/.cache/sort_talks)."""
+        cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        return os.path.join(cache_home, "sort_talks")
+
+    @classmethod
+    def make_key(cls, duration_counts, **options):
+        """Works out the cache key for the given multiset of talk durations (a
+        dictionary mapping durations to talk counts) and packing options."""
+        source = json.dumps({
+            "version": cls.FORMAT_VERSION,
+            "durations": sorted(duration_counts.items()),
+            "options": options
+        }, sort_keys=True)
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+    def get_filename(self, key):
+        return os.path.join(self.cache_dir, "%s.json" % key)
+
+    def get(self, key, duration_counts):
+        """Looks up the packing for the given key.
+
+        Args:
+            key: The key from make_key().
+            duration_counts: The multiset of durations from which the key was
+                made, against which the cached packing is checked.
+
+        Returns:
+            The cached packing, or None if there isn't a valid one.
+        """
+        filename = self.get_filename(key)
+        try:
+            with open(filename, "rt", encoding="utf-8") as inf:
+                entry = json.load(inf)
+            packing = [
+                ([tuple(run) for run in morning_runs], [tuple(run) for run in afternoon_runs])
+                for morning_runs, afternoon_runs in entry["packing"]
+            ]
+        except (OSError, ValueError, KeyError, TypeError):
+            self.misses += 1
+            return None
+        packed_counts = {}
+        for morning_runs, afternoon_runs in packing:
+            for duration, count, _ in morning_runs + afternoon_runs:
+                packed_counts[duration] = packed_counts.get(duration, 0) + count
+        if packed_counts != dict([(duration, count) for duration, count in duration_counts.items() if count]):
+            self.misses += 1
+            return None
+        try:
+            # mark the entry as recently used
+            os.utime(filename)
+        except OSError:
+            pass
+        self.hits += 1
+        return packing
+
+    def put(self, key, packing):
+        """Stores the given packing under the given key, and then evicts the
+        least recently used entries if the cache is too big."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, temp_filename = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, "wt", encoding="utf-8") as outf:
+                json.dump({"version": self.FORMAT_VERSION, "packing": packing}, outf, separators=(",", ":"))
+            os.replace(temp_filename, self.get_filename(key))
+        except BaseException:
+            try:
+                os.unlink(temp_filename)
+            except OSError:
+                pass
+            raise
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used entries until the total size of the
+        entries is no more than max_bytes."""
+        entries, total_size = [], 0
+        now = time.time()
+        with os.scandir(self.cache_dir) as dir_entries:
+            for dir_entry in dir_entries:
+                if not dir_entry.name.endswith(".json"):
+                    continue
+                try:
+                    stat = dir_entry.stat()
+                except OSError:
+                    # removed by another invocation
+                    continue
+                if dir_entry.name.startswith(".tmp-"):
+                    if now - stat.st_mtime > self.STALE_TEMP_FILE_AGE:
+                        self.remove(dir_entry.path)
+                    continue
+                entries.append((stat.st_mtime, dir_entry.path, stat.st_size))
+                total_size += stat.st_size
+        entries.sort()
+        for _, path, size in entries:
+            if total_size <= self.max_bytes:
+                break
+            self.remove(path)
+            total_size -= size
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+class TalkCatalog:
+    """A compact, read-only list of talks, as read by read_talk_catalog(): the
+    talks' titles and durations are kept in separate lists, and Talk instances
+    are only created on demand."""
+
+    __slots__ = ("titles", "durations", "constraints")
+
+    def __init__(self, titles, durations, constraints=None):
+        """Constructor.
+
+        Args:
+            titles: A list of the talks' titles.
+            durations: An array('H') of the talks' durations (in minutes).
+            constraints: An optional dictionary mapping the positions of the
+                talks that have TalkConstraints to their constraints.
+        """
+        self.titles = titles
+        self.durations = durations
+        self.constraints = constraints
+
+    def __len__(self):
+        return len(self.durations)
+
+    def __iter__(self):
+        if self.constraints:
+            constraints = self.constraints
+            for position, (title, duration) in enumerate(zip(self.titles, self.durations)):
+                yield Talk(title, duration, constraints=constraints.get(position))
+            return
+        for title, duration in zip(self.titles, self.durations):
+            yield Talk(title, duration)
+
+    def get_talk(self, position):
+        return Talk(
+            self.titles[position],
+            self.durations[position],
+            constraints=self.constraints.get(position) if self.constraints else None
+        )
+
+    def get_duration_counts(self):
+        """Returns a dictionary mapping each talk duration to the number of
+        talks with that duration."""
+        duration_counts = {}
+        for duration in self.durations:
+            duration_counts[duration] = duration_counts.get(duration, 0) + 1
+        return duration_counts
+
+
+class CatalogTitles:
+    """The titles of a CompiledTalkCatalog, as a read-only sequence backed by
+    the catalog's title offset table and UTF-8 title blob. Each title is only
+    decoded when it's looked up."""
+
+    __slots__ = ("offsets", "blob")
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("title index out of range")
+        return str(self.blob[self.offsets[position]:self.offsets[position + 1]], "utf-8")
+
+    def __iter__(self):
+        blob, offsets = self.blob, self.offsets
+        for i in range(len(offsets) - 1):
+            yield str(blob[offsets[i]:offsets[i + 1]], "utf-8")
+
+
+class CompiledTalkCatalog(TalkCatalog):
+    """A TalkCatalog loaded from a binary catalog file, which is written by
+    compile() from a talk file (which remains the source of truth).
+
+    The file is memory-mapped, and its durations and title offsets are used
+    in place (as memoryviews), so loading a catalog takes about the same time
+    however many talks it has. Titles are only decoded when they're needed
+    (see CatalogTitles), and the number of talks of each duration is stored
+    in the file, so get_duration_counts() doesn't have to look at each talk.
+
+    The file is laid out as a header (HEADER), followed by the path of the
+    talk file (relative to the catalog), the talks' durations (as 16-bit
+    integers), the offsets of their titles in the title blob (as 32-bit
+    integers), the durations and counts of the duration histogram, the
+    positions of the talks with constraints, the offsets of their
+    annotations, the annotation blob and then the title blob, with each part
+    starting on an 8-byte boundary. Numbers are in the byte order of the
+    machine that wrote the file, which is recorded in the header.
+
+    The header also records the talk file's size, modification time and
+    SHA-256 hash. Loading a catalog whose talk file has changed since it was
+    compiled raises an exception, but the talk file only has to be hashed if
+    its size is the same and its modification time isn't.
+    """
+
+    __slots__ = ("duration_counts", "mapped")
+
+    MAGIC = b"TALKCAT\0"
+    VERSION = 1
+    BYTE_ORDER_MARK = 0xFEFF
+    # magic, version, byte order mark, reserved, talk count, distinct duration count,
+    # constrained talk count, annotation blob size, title blob size, source
+    # path size, source size, source modification time (ns), source SHA-256
+    HEADER = struct.Struct("=8sHHIQQQQQQQQ32s")
+
+    def __init__(self, titles, durations, constraints, duration_counts, mapped):
+        super().__init__(titles, durations, constraints=constraints)
+        self.duration_counts = duration_counts
+        self.mapped = mapped
+
+    def get_duration_counts(self):
+        return dict(self.duration_counts)
+
+    @classmethod
+    def is_compiled(cls, filename):
+        """Returns whether the given file is a compiled catalog."""
+        with open(filename, "rb") as inf:
+            return inf.read(len(cls.MAGIC)) == cls.MAGIC
+
+    @staticmethod
+    def hash_file(filename):
+        digest = hashlib.sha256()
+        with open(filename, "rb") as inf:
+            for block in iter(lambda: inf.read(2**20), b""):
+                digest.update(block)
+        return digest.digest()
+
+    @classmethod
+    def compile(cls, source_filename, filename):
+        """Reads a talk file with read_talk_catalog(), and writes it out as a
+        compiled catalog.
+
+        Args:
+            source_filename: The talk file to compile.
+            filename: The file to which to write the compiled catalog.
+
+        Returns:
+            The TalkCatalog that was read from the talk file.
+        """
+        stat = os.stat(source_filename)
+        source_hash = cls.hash_file(source_filename)
+        catalog = read_talk_catalog(source_filename)
+        try:
+            source_path = os.path.relpath(os.path.abspath(source_filename), os.path.dirname(os.path.abspath(filename)))
+        except ValueError:
+            # e.g. on different drives
+            source_path = os.path.abspath(source_filename)
+        source_path = source_path.encode("utf-8")
+
+        encoded_titles = {}
+        title_offsets = array("I", [0])
+        title_blob = bytearray()
+        for title in catalog.titles:
+            encoded = encoded_titles.get(title)
+            if encoded is None:
+                encoded = encoded_titles[title] = title.encode("utf-8")
+            title_blob += encoded
+            title_offsets.append(len(title_blob))
+        constraints = sorted((catalog.constraints or {}).items())
+        annotation_offsets = array("I", [0])
+        annotation_blob = bytearray()
+        for _, talk_constraints in constraints:
+            annotation_blob += str(talk_constraints).encode("utf-8")
+            annotation_offsets.append(len(annotation_blob))
+        if len(title_blob) >= 2**32 or len(annotation_blob) >= 2**32:
+            raise Exception("Too many talks to compile into a catalog: %s" % source_filename)
+        duration_counts = catalog.get_duration_counts()
+        histogram_durations = sorted(duration_counts)
+
+        parts = [
+            source_path,
+            array("H", catalog.durations).tobytes(),
+            title_offsets.tobytes(),
+            array("H", histogram_durations).tobytes(),
+            array("Q", [duration_counts[duration] for duration in histogram_durations]).tobytes(),
+            array("I", [position for position, _ in constraints]).tobytes(),
+            annotation_offsets.tobytes(),
+            bytes(annotation_blob),
+            bytes(title_blob)
+        ]
+        header = cls.HEADER.pack(
+            cls.MAGIC, cls.VERSION, cls.BYTE_ORDER_MARK, 0, len(catalog), len(histogram_durations), len(constraints),
+            len(annotation_blob), len(title_blob), len(source_path), stat.st_size, stat.st_mtime_ns, source_hash
+        )
+        # write to a temporary file first, so that the catalog is replaced
+        # atomically
+        fd, tmp_filename = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as outf:
+                outf.write(header)
+                for part in parts:
+                    outf.write(b"\0"*(-outf.tell() % 8))
+                    outf.write(part)
+            os.replace(tmp_filename, filename)
+        except BaseException:
+            os.unlink(tmp_filename)
+            raise
+        return catalog
+
+    @classmethod
+    def load(cls, filename, check_source=True):
+        """Loads a compiled catalog.
+
+        Args:
+            filename: The compiled catalog file.
+            check_source: Whether to check that the talk file from which the
+                catalog was compiled (if it still exists) hasn't changed.
+
+        Returns:
+            A CompiledTalkCatalog.
+        """
+        with open(filename, "rb") as inf:
+            mapped = mmap.mmap(inf.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        if len(view) < cls.HEADER.size or bytes(view[:len(cls.MAGIC)]) != cls.MAGIC:
+            raise Exception("Not a compiled talk catalog: %s" % filename)
+        (_, version, byte_order_mark, _, talk_count, distinct_count, constrained_count, annotations_size,
+         titles_size, source_path_size, source_size, source_mtime_ns, source_hash) = cls.HEADER.unpack_from(view)
+        if version != cls.VERSION or byte_order_mark != cls.BYTE_ORDER_MARK:
+            raise Exception("Compiled talk catalog from a different version or machine: %s (recompile it)" % filename)
+
+        position = cls.HEADER.size
+        sizes = [
+            source_path_size, 2*talk_count, 4*(talk_count + 1), 2*distinct_count, 8*distinct_count,
+            4*constrained_count, 4*(constrained_count + 1), annotations_size, titles_size
+        ]
+        parts = []
+        for size in sizes:
+            position += -position % 8
+            parts.append(view[position:position + size])
+            position += size
+        if position > len(view):
+            raise Exception("Truncated compiled talk catalog: %s" % filename)
+        (source_path, durations, title_offsets, histogram_durations, histogram_counts, constrained_positions,
+         annotation_offsets, annotation_blob, title_blob) = parts
+
+        if check_source:
+            source_filename = os.path.join(os.path.dirname(os.path.abspath(filename)), str(source_path, "utf-8"))
+            if os.path.exists(source_filename):
+                stat = os.stat(source_filename)
+                if stat.st_size != source_size or (stat.st_mtime_ns != source_mtime_ns and
+                                                   cls.hash_file(source_filename) != source_hash):
+                    raise Exception("The compiled talk catalog %s is out of date with %s (recompile it)" % (
+                        filename,
+                        source_filename
+                    ))
+
+        annotation_offsets = annotation_offsets.cast("I")
+        constraints = {}
+        for i, talk_position in enumerate(constrained_positions.cast("I")):
+            constraints[talk_position] = TalkConstraints.parse(
+                str(annotation_blob[annotation_offsets[i]:annotation_offsets[i + 1]], "utf-8")
+            )
+        return cls(
+            CatalogTitles(title_offsets.cast("I"), title_blob),
+            durations.cast("H"),
+            constraints or None,
+            dict(zip(histogram_durations.cast("H"), histogram_counts.cast("Q"))),
+            mapped
+        )
+
+
+class TalkFileError(Exception):
+    """Raised when a talk file contains invalid lines. Unlike Talk.parse(),
+    this reports all of the invalid lines at once.
+
+    Attributes:
+        filename: The name of the talk file.
+        errors: A list of (line_no, message) tuples, one for each invalid
+            line, where line numbers start at 1.
+    """
+
+    def __init__(self, filename, errors):
+        lines = ["line %d: %s" % error for error in errors[:MAX_REPORTED_ERRORS]]
+        if len(errors) > MAX_REPORTED_ERRORS:
+            lines.append("... and %d more" % (len(errors) - MAX_REPORTED_ERRORS))
+        super().__init__("%d invalid line(s) in %s:\n  %s" % (len(errors), filename, "\n  ".join(lines)))
+        self.filename = filename
+        self.errors = errors
+
+
+def read_talk_catalog(filename):
+    """Reads all of the talks from the given file in bulk. This accepts the
+    same lines as read_talks_from_file(), but is several times faster for
+    large files.
+
+    Rather than parsing each line separately, the whole file is mapped into
+    memory and split up using string methods that each run over all of the
+    lines at once, and each distinct duration string is only parsed once.
+    Repeated titles are only stored once, and only the lines that contain
+    TalkConstraints.SEPARATOR are checked for constraints.
+
+    Args:
+        filename: The name of the file from which to read the talks (one per line).
+
+    The file can also be a catalog compiled by CompiledTalkCatalog.compile(),
+    which is loaded without parsing it.
+
+    Returns:
+        A TalkCatalog with the talks from each non-empty line of the file. If
+        any of the lines are invalid, raises a TalkFileError listing all of
+        them.
+    """
+    if CompiledTalkCatalog.is_compiled(filename):
+        return CompiledTalkCatalog.load(filename)
+    with open(filename, "rb") as inf:
+        if os.fstat(inf.fileno()).st_size == 0:
+            text = ""
+        else:
+            with mmap.mmap(inf.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                text = str(mapped, "utf-8")
+    # the same newline translation as reading the file in text mode
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    has_separator = TalkConstraints.SEPARATOR in text
+    lines = list(filter(None, map(str.strip, text.split("\n"))))
+    del text
+    constraints = {}
+    if has_separator:
+        for position, line in enumerate(lines):
+            if TalkConstraints.SEPARATOR in line:
+                talk_str, talk_constraints = TalkConstraints.split(line)
+                if talk_constraints is not None:
+                    lines[position] = talk_str
+                    constraints[position] = talk_constraints
+    parts = list(map(str.rpartition, lines, itertools.repeat(" ")))
+    del lines
+    # lines have been stripped, so only lines without a space have no title
+    titles = list(map(operator.itemgetter(0), parts))
+    duration_strs = list(map(operator.itemgetter(2), parts))
+    del parts
+    durations = {duration_str: Talk.parse_duration(duration_str) for duration_str in set(duration_strs)}
+    if "" in titles or any(
+            duration is None or duration > MAX_TALK_DURATION for duration in durations.values()):
+        raise TalkFileError(filename, find_talk_errors(filename))
+    shared_titles = {}
+    return TalkCatalog(
+        list(map(shared_titles.setdefault, titles, titles)),
+        array('H', map(durations.__getitem__, duration_strs)),
+        constraints=constraints or None
+    )
 
-    @classmethod
-    def copy_of(cls, other):
-        schedule = ConferenceSchedule()
-        schedule.tracks = [TalkTrack.copy_of(track) for track in other.tracks]
-        schedule.next_track_no = other.next_track_no
-        return schedule
 
+def find_talk_errors(filename):
+    """Parses each line of the given talk file separately, returning a list
+    of (line_no, message) tuples for the invalid lines."""
+    errors = []
+    with open(filename, "rt", encoding="utf-8") as inf:
+        for line_no, line in enumerate(inf, 1):
+            stripped = line.strip()
+            if stripped:
+                try:
+                    Talk.parse(stripped)
+                except Exception as e:
+                    errors.append((line_no, str(e)))
+    return errors
 
-def read_talks_from_file(filename):
+
+def read_talks_from_file(filename, share_titles=True):
     """Reads all of the talks from the given file.
 
     Args:
         filename: The name of the file from which to read the talks (one per line).
+        share_titles: As for read_talks().
     
     Returns:
         An iterator which yields Talk instances, parsed from each non-empty
         line of the given input file.
     """
     with open(filename, "rt", encoding="utf-8") as inf:
-        for line in inf:
-            stripped = line.strip()
-            if stripped and len(stripped) > 0:
-                yield Talk.parse(stripped)
+        yield from read_talks(inf, share_titles=share_titles)
+
+
+def read_talks(lines, share_titles=True):
+    """Parses talks from the given lines (e.g. a file object such as
+    sys.stdin) as they're needed.
+
+    Args:
+        lines: An iterable of lines, one talk per line.
+        share_titles: Whether repeated titles should only be stored once. This
+            takes memory for each distinct title, so it should be turned off
+            when the talks aren't all kept around anyway.
+
+    Returns:
+        An iterator which yields Talk instances, parsed from each non-empty
+        line.
+    """
+    titles = {}
+    for line in lines:
+        stripped = line.strip()
+        if stripped and len(stripped) > 0:
+            talk = Talk.parse(stripped)
+            if share_titles:
+                talk.title = titles.setdefault(talk.title, talk.title)
+            yield talk
+
+
+def parse_talk_strings(talk_strs, source):
+    """Parses a list of talks given as strings (e.g. from a JSON document),
+    in the same format as the lines of a talk file.
+
+    Args:
+        talk_strs: A list of strings, one per talk.
+        source: Where the talks came from, for error messages.
+
+    Returns:
+        A list of Talk instances. If any of the strings are invalid, raises a
+        TalkFileError listing all of them (numbered from 1).
+    """
+    if not isinstance(talk_strs, list):
+        raise Exception("Expected %s to be a list of strings" % source)
+    talks, errors = [], []
+    for talk_no, talk_str in enumerate(talk_strs, 1):
+        try:
+            talks.append(Talk.parse(str(talk_str).strip()))
+        except Exception as e:
+            errors.append((talk_no, str(e)))
+    if errors:
+        raise TalkFileError(source, errors)
+    return talks
+
+
+def read_schedule(filename, prefer_mornings=False, verbose=False, hooks=None):
+    """Reads a schedule from a JSON file written by JsonScheduleWriter (e.g.
+    with --format json), so that it can be edited with a ScheduleEditor.
+
+    Args:
+        filename: The name of the file from which to read the schedule.
+        prefer_mornings, verbose, hooks: As for the ConferenceSchedule
+            constructor. The hooks aren't notified of the talks read from the
+            file.
+
+    Returns:
+        A ConferenceSchedule with the talks from the file. The talks in each
+        session are scheduled back-to-back, in the order in which they appear
+        in the file.
+    """
+    with open(filename, "rt", encoding="utf-8") as inf:
+        document = json.load(inf)
+    schedule = ConferenceSchedule(prefer_mornings=prefer_mornings, verbose=verbose, hooks=hooks)
+    try:
+        for track_document in document["tracks"]:
+            track = TalkTrack(schedule.next_track_no)
+            schedule.tracks.append(track)
+            schedule.next_track_no += 1
+            for session, session_name in ((track.morning_session, "morning"), (track.afternoon_session, "afternoon")):
+                for talk in track_document[session_name]:
+                    duration = talk["duration"]
+                    if not isinstance(duration, int) or duration <= 0:
+                        raise Exception("Invalid duration for talk: %s" % talk["title"])
+                    if not session.add_talk(Talk(str(talk["title"]), duration)):
+                        raise Exception("Talks do not fit into the %s session of track %d" % (
+                            session_name,
+                            track.track_no
+                        ))
+    except (KeyError, TypeError) as e:
+        raise Exception("Invalid schedule file: %s (%s)" % (filename, e))
+    schedule.reindex()
+    return schedule
+
+
+def read_day_templates(filename):
+    """Reads the days of a multi-day event from a JSON file containing a list
+    of objects, each with any of the DayTemplate.FIELDS, e.g.:
+
+        [{"name": "Monday", "rooms": 4}, {"name": "Tuesday", "lunch_start_hour": 13, "lunch_end_hour": 14}]
+
+    Returns:
+        A list of DayTemplate instances.
+    """
+    with open(filename, "rt", encoding="utf-8") as inf:
+        document = json.load(inf)
+    if not isinstance(document, list) or not document:
+        raise Exception("Invalid day templates file: %s (expected a non-empty list of days)" % filename)
+    try:
+        return [DayTemplate.from_dict(day) for day in document]
+    except TypeError as e:
+        raise Exception("Invalid day templates file: %s (%s)" % (filename, e))
+
+
+class TextScheduleWriter:
+    """Writes a schedule to a file object in the same human-readable format as
+    str(schedule), one track at a time, so that large schedules don't have to
+    be built up in memory first."""
+
+    def __init__(self, outf, end="\n\n"):
+        """Constructor.
+
+        Args:
+            outf: The file object to which to write.
+            end: What to write after the last track (str(schedule) has
+                nothing after it).
+        """
+        self.outf = outf
+        self.end = end
+        self.tracks_written = 0
+
+    def write(self, schedule):
+        latest_end_time = schedule.get_latest_end_time()
+        self.write_tracks(
+            schedule.tracks,
+            friendly_time(latest_end_time or 0, start_hour=schedule.template.lunch_end_hour),
+            schedule=schedule
+        )
+
+    def write_tracks(self, tracks, networking_time, schedule=None):
+        """Writes out the given tracks (which can be a generator, such as
+        OnlineScheduler.schedule()) as they're produced.
+
+        Args:
+            tracks: An iterable of TalkTrack instances.
+            networking_time: The time at which the networking event starts
+                (e.g. "05:00PM").
+            schedule: The ConferenceSchedule to which the tracks belong, if
+                any.
+        """
+        self.tracks_written = 0
+        self.write_header(schedule, networking_time)
+        for track in tracks:
+            self.write_track(track, networking_time)
+            self.tracks_written += 1
+        self.write_footer(schedule)
+
+    def write_header(self, schedule, networking_time):
+        self.outf.write("\n")
+
+    def write_track(self, track, networking_time):
+        if self.tracks_written:
+            self.outf.write("\n\n")
+        self.outf.write(self.format_track(track, networking_time))
+
+    def write_footer(self, schedule):
+        self.outf.write(self.end)
+
+    @staticmethod
+    def session_lines(session):
+        """Yields a line for each of the session's talks."""
+        labels = FRIENDLY_TIMES
+        start_time = session.start_hour*60
+        for title, duration in zip(session.talk_titles, session.talk_durations):
+            yield "%s %s %s" % (
+                labels[start_time] if start_time < len(labels) else minutes_to_friendly_time(start_time),
+                title,
+                "lightning" if duration == LIGHTNING_TALK_DURATION else ("%dmin" % duration)
+            )
+            start_time += duration
+
+    @classmethod
+    def format_track(cls, track, networking_time):
+        afternoon_lines = "\n".join(cls.session_lines(track.afternoon_session))
+        return "Track %d\n\n%s\n%s\n%s%s Networking Event" % (
+            track.track_no,
+            "\n".join(cls.session_lines(track.morning_session)),
+            track.get_lunchtime_string(),
+            (afternoon_lines + "\n") if afternoon_lines else "",
+            networking_time
+        )
+
+
+class JsonScheduleWriter(TextScheduleWriter):
+    """Writes a schedule to a file object as a JSON document, one track at a
+    time."""
+
+    def write_header(self, schedule, networking_time):
+        template = schedule.template if schedule is not None else DEFAULT_DAY_TEMPLATE
+        self.outf.write('{"lunch": %s, "networking_event": %s, "tracks": [' % (
+            json.dumps(friendly_time(0, start_hour=template.lunch_start_hour)),
+            json.dumps(networking_time)
+        ))
+
+    def write_track(self, track, networking_time):
+        if self.tracks_written:
+            self.outf.write(",")
+        self.outf.write("\n")
+        self.outf.write(json.dumps({
+            "track_no": track.track_no,
+            "morning": self.session_talks(track.morning_session),
+            "afternoon": self.session_talks(track.afternoon_session)
+        }))
+
+    def write_footer(self, schedule):
+        self.outf.write("\n]}\n")
+
+    @staticmethod
+    def session_talks(session):
+        talks = []
+        start_time = session.start_hour*60
+        for title, duration in zip(session.talk_titles, session.talk_durations):
+            talks.append({"start": friendly_time(start_time), "title": title, "duration": duration})
+            start_time += duration
+        return talks
+
+
+class CsvScheduleWriter(TextScheduleWriter):
+    """Writes a schedule to a file object as CSV, with a row for each talk,
+    lunch and networking event, one track at a time."""
+
+    HEADER = ("track_no", "session", "start", "title", "duration")
+
+    def write_header(self, schedule, networking_time):
+        self.writer = csv.writer(self.outf, lineterminator="\n")
+        self.writer.writerow(self.HEADER)
+
+    def write_track(self, track, networking_time):
+        self.writer.writerows(self.track_rows(track, networking_time))
+
+    def write_footer(self, schedule):
+        pass
+
+    def track_rows(self, track, networking_time):
+        rows = []
+        for session_name, session in (("morning", track.morning_session), ("afternoon", track.afternoon_session)):
+            start_time = session.start_hour*60
+            for title, duration in zip(session.talk_titles, session.talk_durations):
+                rows.append((track.track_no, session_name, friendly_time(start_time), title, duration))
+                start_time += duration
+            if session is track.morning_session:
+                rows.append((track.track_no, "lunch", friendly_time(0, start_hour=track.template.lunch_start_hour), "Lunch", ""))
+        rows.append((track.track_no, "networking", networking_time, "Networking Event", ""))
+        return rows
+
+
+class CsvDaysScheduleWriter(CsvScheduleWriter):
+    """Writes the schedules of several days (see schedule_days()) as a single
+    CSV file, with the day number in the first column."""
+
+    HEADER = ("day",) + CsvScheduleWriter.HEADER
+
+    def __init__(self, outf):
+        super().__init__(outf)
+        self.writer = None
+        self.day_no = 0
+
+    def write_header(self, schedule, networking_time):
+        self.day_no += 1
+        if self.writer is None:
+            super().write_header(schedule, networking_time)
+
+    def track_rows(self, track, networking_time):
+        return [(self.day_no,) + row for row in super().track_rows(track, networking_time)]
+
+
+# The formats in which write_schedule() can write schedules.
+SCHEDULE_WRITERS = {
+    "text": TextScheduleWriter,
+    "json": JsonScheduleWriter,
+    "csv": CsvScheduleWriter
+}
+
+
+def write_schedule(schedule, outf, format="text"):
+    """Writes the given schedule to a file object, one track at a time.
+
+    Args:
+        schedule: The ConferenceSchedule to write.
+        outf: The file object to which to write the schedule.
+        format: One of the formats in SCHEDULE_WRITERS.
+    """
+    if format not in SCHEDULE_WRITERS:
+        raise Exception("Unknown output format: %s" % format)
+    SCHEDULE_WRITERS[format](outf).write(schedule)
+
+
+def write_days(schedules, outf, format="text"):
+    """Writes the schedules of the days of a multi-day event (see
+    schedule_days()) to a file object, one day at a time.
+
+    Args:
+        schedules: A ConferenceSchedule for each day.
+        outf: The file object to which to write the schedules.
+        format: One of the formats in SCHEDULE_WRITERS. Text schedules have a
+            heading for each day, JSON schedules are written as a list of
+            days, each with its template and schedule, and CSV schedules have
+            an extra day column.
+    """
+    if format not in SCHEDULE_WRITERS:
+        raise Exception("Unknown output format: %s" % format)
+    if format == "csv":
+        writer = CsvDaysScheduleWriter(outf)
+        for schedule in schedules:
+            writer.write(schedule)
+        return
+    if format == "json":
+        outf.write('{"days": [')
+    for day_no, schedule in enumerate(schedules, 1):
+        name = schedule.template.name
+        if format == "json":
+            outf.write('%s\n{"day": %d, "template": %s, "schedule": ' % (
+                "," if day_no > 1 else "",
+                day_no,
+                json.dumps(schedule.template.to_dict())
+            ))
+            JsonScheduleWriter(outf).write(schedule)
+            outf.write("}")
+        else:
+            outf.write("Day %d%s\n" % (day_no, (": %s" % name) if name else ""))
+            TextScheduleWriter(outf).write(schedule)
+    if format == "json":
+        outf.write("\n]}\n")
+
+
+class ServiceError(Exception):
+    """Raised while handling a ScheduleService request, with the HTTP status
+    with which to respond."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ScheduleService:
+    """A small HTTP/JSON scheduling service, built on asyncio, which keeps a
+    pool of worker processes warm so that requests don't pay for starting up
+    the interpreter.
+
+    POST /schedule takes a JSON object with a list of talks (as strings, in
+    the same format as the lines of a talk file) and an optional
+    prefer_mornings flag, and returns the number of tracks, the wasted time
+    and the schedule (in the same format as JsonScheduleWriter). The talks
+    are packed by pack_duration_counts() in a worker process, which gives the
+    same schedule as ConferenceSchedule.add_talks(), and are then bound to
+    the packing. Since only the talks' durations go to the worker, concurrent
+    requests with the same durations share a single packing. Parsing the
+    request, binding the talks and writing out the schedule happen in a
+    thread pool, so that large requests don't hold up the event loop (and
+    the other connections).
+
+    At most max_queue packings can be queued or running at once, and further
+    requests are turned away with a 503 response. Requests that take longer
+    than request_timeout seconds (from parsing the request to writing out the
+    schedule) get a 504 response. GET /metrics returns the request counters,
+    latency percentiles and throughput.
+    """
+
+    # how many of the most recent requests' latencies to keep for the
+    # percentiles
+    LATENCY_WINDOW = 1000
+    # the period (in seconds) over which to measure recent throughput
+    THROUGHPUT_WINDOW = 60.0
+    MAX_BODY_BYTES = 64*2**20
+    STATUS_REASONS = {
+        200: "OK",
+        400: "Bad Request",
+        404: "Not Found",
+        405: "Method Not Allowed",
+        413: "Payload Too Large",
+        500: "Internal Server Error",
+        503: "Service Unavailable",
+        504: "Gateway Timeout"
+    }
+
+    def __init__(self, workers=1, max_queue=DEFAULT_MAX_QUEUE, request_timeout=DEFAULT_REQUEST_TIMEOUT,
+                 executor=None, request_executor=None):
+        """Constructor.
+
+        Args:
+            workers: The number of worker processes.
+            max_queue: The maximum number of packings that can be queued or
+                running at once.
+            request_timeout: The maximum number of seconds to spend on a
+                request.
+            executor: The concurrent.futures executor in which to pack talks
+                (by default, a process pool with the given number of workers).
+            request_executor: The concurrent.futures executor in which to
+                parse requests, bind talks and write out schedules (by
+                default, a thread pool).
+        """
+        self.workers = workers
+        self.max_queue = max_queue
+        self.request_timeout = request_timeout
+        self.executor = executor if executor is not None else concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        self.request_executor = request_executor if request_executor is not None else \
+            concurrent.futures.ThreadPoolExecutor()
+        # maps (prefer_mornings, durations) to the future of the packing
+        # that's in progress for them
+        self.in_flight = {}
+        self.start_time = time.monotonic()
+        self.requests = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.responses = {}
+        self.latencies = collections.deque(maxlen=self.LATENCY_WINDOW)
+        self.completion_times = collections.deque()
+
+    def warm_up(self):
+        """Starts all of the worker processes (and waits for them to import
+        this module), so that the first requests don't have to."""
+        futures = [self.executor.submit(pack_duration_counts, {}) for _ in range(self.workers)]
+        concurrent.futures.wait(futures)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.request_executor.shutdown(wait=False)
+
+    async def start(self, host, port):
+        """Starts listening for requests, returning the asyncio server."""
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def serve(self, host, port):
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def schedule(self, talks, prefer_mornings=False):
+        """Schedules the given talks, sharing the packing with any other
+        request for talks with the same durations that is in progress.
+
+        Returns:
+            The ConferenceSchedule. Raises a ServiceError if there are
+            already max_queue packings in progress, or if the request times
+            out.
+        """
+        return await self.with_timeout(self.pack_and_bind(talks, prefer_mornings))
+
+    async def with_timeout(self, awaitable):
+        """Awaits the given coroutine for at most request_timeout seconds,
+        raising a ServiceError if it takes any longer."""
+        try:
+            return await asyncio.wait_for(awaitable, self.request_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise ServiceError(504, "Timed out after %g seconds" % self.request_timeout)
+
+    async def run_in_request_executor(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.request_executor, function, *args)
+
+    @staticmethod
+    def get_duration_counts(talks):
+        duration_counts = {}
+        for talk in talks:
+            duration_counts[talk.duration] = duration_counts.get(talk.duration, 0) + 1
+        return duration_counts
+
+    @staticmethod
+    def bind_talks(packing, talks, prefer_mornings):
+        schedule = ConferenceSchedule(prefer_mornings=prefer_mornings)
+        schedule.apply_packing(packing, talks)
+        return schedule
+
+    async def pack_and_bind(self, talks, prefer_mornings, duration_counts=None):
+        """Does the work of schedule(), without the timeout, given the number
+        of talks of each duration (if they've already been counted)."""
+        if duration_counts is None:
+            duration_counts = self.get_duration_counts(talks)
+        key = (prefer_mornings, tuple(sorted(duration_counts.items())))
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            if len(self.in_flight) >= self.max_queue:
+                self.rejected += 1
+                raise ServiceError(503, "Too many requests in progress (at most %d)" % self.max_queue)
+            future = asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                pack_duration_counts,
+                duration_counts,
+                prefer_mornings
+            )
+            self.in_flight[key] = future
+            future.add_done_callback(lambda future: self.packing_done(key, future))
+        # a timed out request mustn't cancel the packing for the others
+        packing = await asyncio.shield(future)
+        return await self.run_in_request_executor(self.bind_talks, packing, talks, prefer_mornings)
+
+    def packing_done(self, key, future):
+        if self.in_flight.get(key) is future:
+            del self.in_flight[key]
+        # stops asyncio complaining if every request for it has timed out
+        if not future.cancelled():
+            future.exception()
+
+    async def handle_connection(self, reader, writer):
+        """Handles the HTTP/1.1 requests on a connection, until either side
+        closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                parts = request_line.decode("latin-1").split()
+                keep_alive = len(parts) == 3 and parts[2] == "HTTP/1.1" and \
+                    headers.get("connection", "").lower() != "close"
+                try:
+                    content_length = int(headers.get("content-length", 0))
+                except ValueError:
+                    content_length = -1
+                if len(parts) != 3 or content_length < 0:
+                    status, body = self.error_response(400, "Invalid request")
+                    keep_alive = False
+                elif content_length > self.MAX_BODY_BYTES:
+                    status, body = self.error_response(413, "Requests can be at most %d bytes" % self.MAX_BODY_BYTES)
+                    keep_alive = False
+                else:
+                    status, body = await self.handle_request(parts[0], parts[1], await reader.readexactly(content_length))
+                body = body.encode("utf-8")
+                writer.write(("HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n%s\r\n" % (
+                    status,
+                    self.STATUS_REASONS[status],
+                    len(body),
+                    "" if keep_alive else "Connection: close\r\n"
+                )).encode("latin-1") + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, method, path, body):
+        """Handles a single request.
+
+        Returns:
+            A (status, body) tuple, where the body is a JSON string.
+        """
+        if path == "/metrics":
+            if method != "GET":
+                return self.error_response(405, "Use GET for /metrics")
+            return 200, json.dumps(self.get_metrics())
+        if path != "/schedule":
+            return self.error_response(404, "Not found: %s" % path)
+        if method != "POST":
+            return self.error_response(405, "Use POST for /schedule")
+        start_time = time.perf_counter()
+        self.requests += 1
+        try:
+            status, response = await self.with_timeout(self.handle_schedule_request(body))
+        except ServiceError as e:
+            status, response = self.error_response(e.status, str(e))
+        except Exception as e:
+            status, response = self.error_response(500, str(e))
+        self.responses[status] = self.responses.get(status, 0) + 1
+        self.latencies.append(time.perf_counter() - start_time)
+        now = time.monotonic()
+        self.completion_times.append(now)
+        self.prune_completion_times(now)
+        return status, response
+
+    async def handle_schedule_request(self, body):
+        """Handles a POST /schedule request, without the timeout."""
+        talks, prefer_mornings = await self.run_in_request_executor(self.parse_schedule_request, body)
+        duration_counts = await self.run_in_request_executor(self.get_duration_counts, talks)
+        schedule = await self.pack_and_bind(talks, prefer_mornings, duration_counts)
+        return 200, await self.run_in_request_executor(self.format_schedule_response, schedule)
+
+    @staticmethod
+    def parse_schedule_request(body):
+        """Parses the body of a POST /schedule request.
+
+        Returns:
+            A (talks, prefer_mornings) tuple. Raises a ServiceError if the
+            request is invalid.
+        """
+        try:
+            request = json.loads(body)
+        except ValueError as e:
+            raise ServiceError(400, "Invalid JSON: %s" % e)
+        if not isinstance(request, dict) or "talks" not in request:
+            raise ServiceError(400, "Expected a JSON object with a list of talks")
+        try:
+            talks = parse_talk_strings(request["talks"], "talks")
+        except Exception as e:
+            raise ServiceError(400, str(e))
+        if any([talk.constraints is not None for talk in talks]):
+            raise ServiceError(400, "Talk constraints aren't supported by the scheduling service")
+        return talks, bool(request.get("prefer_mornings", False))
+
+    @staticmethod
+    def format_schedule_response(schedule):
+        outf = io.StringIO()
+        JsonScheduleWriter(outf).write(schedule)
+        return '{"tracks": %d, "wasted_time": %d, "schedule": %s}' % (
+            len(schedule.tracks),
+            schedule.get_wasted_time(),
+            outf.getvalue()
+        )
+
+    def prune_completion_times(self, now):
+        """Forgets the completion times from before the THROUGHPUT_WINDOW."""
+        while self.completion_times and self.completion_times[0] < now - self.THROUGHPUT_WINDOW:
+            self.completion_times.popleft()
+
+    @staticmethod
+    def error_response(status, message):
+        return status, json.dumps({"error": message})
+
+    def get_metrics(self):
+        """Returns a JSON-serialisable dictionary with the request counters,
+        the latency percentiles (in milliseconds) of the last LATENCY_WINDOW
+        requests, and the throughput (in requests per second) overall and
+        over the last THROUGHPUT_WINDOW seconds."""
+        now = time.monotonic()
+        uptime = now - self.start_time
+        self.prune_completion_times(now)
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return latencies[max(0, int(math.ceil(p / 100.0 * len(latencies))) - 1)] * 1000
+
+        return {
+            "uptime": uptime,
+            "workers": self.workers,
+            "requests": self.requests,
+            "responses": dict([(str(status), count) for status, count in sorted(self.responses.items())]),
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "in_flight": len(self.in_flight),
+            "max_queue": self.max_queue,
+            "latency_ms": {
+                "p50": percentile(50),
+                "p90": percentile(90),
+                "p99": percentile(99),
+                "max": latencies[-1] * 1000 if latencies else None
+            },
+            "throughput": {
+                "overall": sum(self.responses.values()) / max(uptime, 1e-9),
+                "recent": len(self.completion_times) / max(min(uptime, self.THROUGHPUT_WINDOW), 1e-9)
+            }
+        }
+
+
+def get_cache_options(args, seed, talks):
+    """Works out the options that affect the schedule produced by main(),
+    for ScheduleCache.make_key().
+
+    Returns:
+        A dictionary of options, or None if the schedule depends on a random
+        seed that wasn't given with --seed (so that the same key would never
+        come up again, and the schedule isn't worth caching).
+    """
+    if args.seed is None and (args.restarts > 1 or args.both_strategies or args.improve_ms > 0):
+        return None
+    options = {"prefer_mornings": args.prefer_mornings}
+    if args.restarts > 1 or args.both_strategies:
+        # the perturbed orders depend on the order of the talks
+        options.update({
+            "mode": "restarts",
+            "restarts": args.restarts,
+            "both_strategies": args.both_strategies,
+            "seed": seed,
+            "order": hashlib.sha256(array('H', [talk.duration for talk in talks]).tobytes()).hexdigest()
+        })
+    elif args.exact:
+        options.update({"mode": "exact", "time_limit": args.time_limit})
+    elif args.shards > 1:
+        options.update({"mode": "sharded", "shards": args.shards})
+    else:
+        # both engines produce the same schedule
+        options["mode"] = "bfd"
+    if args.improve_ms > 0:
+        options.update({"improve_ms": args.improve_ms, "improve_seed": seed})
+    return options
+
+
+def schedule_talks(args, seed, talks, hooks, start_time):
+    """Schedules the given talks as per main()'s arguments, notifying the
+    given hooks (if any) of the time taken by each phase since start_time."""
+    if (args.restarts > 1 or args.both_strategies or args.exact or args.improve_ms > 0 or args.shards > 1) and \
+            any([talk.constraints is not None for talk in talks]):
+        raise Exception("Talk constraints are only supported by the default scheduling (without --restarts, " +
+                        "--both-strategies, --exact, --improve-ms or --shards)")
+    if args.restarts > 1 or args.both_strategies:
+        if args.verbose:
+            print("Searching for a schedule with seed %d" % seed, file=sys.stderr)
+        schedule = search_schedules(
+            talks,
+            restarts=args.restarts,
+            workers=args.workers,
+            seed=seed,
+            prefer_mornings=args.prefer_mornings,
+            both_strategies=args.both_strategies,
+            verbose=args.verbose,
+            hooks=hooks
+        )
+        if hooks is not None:
+            hooks.phase_finished("search", time.perf_counter() - start_time)
+    elif args.exact:
+        schedule = ConferenceSchedule(prefer_mornings=args.prefer_mornings, verbose=args.verbose, hooks=hooks)
+        schedule.add_talks_exact(talks, time_limit=args.time_limit)
+        if hooks is not None:
+            hooks.phase_finished("search", time.perf_counter() - start_time)
+    elif args.shards > 1:
+        schedule = schedule_sharded(
+            talks,
+            args.shards,
+            workers=args.workers,
+            prefer_mornings=args.prefer_mornings,
+            engine=args.engine,
+            verbose=args.verbose,
+            hooks=hooks
+        )
+    else:
+        schedule = ConferenceSchedule(
+            prefer_mornings=args.prefer_mornings,
+            verbose=args.verbose,
+            engine=args.engine,
+            hooks=hooks
+        )
+        schedule.add_talks(talks)
+    if args.improve_ms > 0:
+        local_search = LocalSearch(schedule, seed=seed)
+        local_search.run(args.improve_ms / 1000.0)
+        if args.verbose:
+            print("Local search removed %d tracks in %d iterations (%d iterations/sec)" % (
+                local_search.tracks_removed,
+                local_search.iterations,
+                local_search.iterations / max(local_search.elapsed_time, 1e-9)
+            ), file=sys.stderr)
+        if hooks is not None:
+            hooks.phase_finished("improve", local_search.elapsed_time)
+    return schedule
+
+
+def schedule_batch_item(task):
+    """Schedules one of the conferences from a --batch manifest (in a worker
+    process, if there is more than one worker).
+
+    Args:
+        task: A (line_no, line, manifest_dir, defaults) tuple, where line is
+            the conference's line from the manifest, relative input file
+            names are relative to manifest_dir, and defaults is a dictionary
+            with the values of main()'s arguments for the BATCH_OPTIONS.
+
+    Returns:
+        A JSON-serialisable dictionary with the conference's id (which
+        defaults to its line number), and either its schedule (in the same
+        format as JsonScheduleWriter), number of tracks and wasted time, or
+        an error message if it couldn't be scheduled.
+    """
+    line_no, line, manifest_dir, defaults = task
+    result = {"id": line_no}
+    try:
+        item = json.loads(line)
+        if not isinstance(item, dict):
+            raise Exception("Expected a JSON object")
+        result["id"] = item.get("id", line_no)
+        unknown_keys = set(item) - set(BATCH_OPTIONS) - set(["id", "input_file", "talks"])
+        if unknown_keys:
+            raise Exception("Unknown option(s): %s" % ", ".join(sorted(unknown_keys)))
+        options = argparse.Namespace(**defaults)
+        for key in BATCH_OPTIONS:
+            if key in item:
+                setattr(options, key, item[key])
+        options.workers = 1
+        options.shards = 1
+        options.verbose = False
+        if options.engine not in ENGINES:
+            raise Exception("Unknown scheduling engine: %s" % options.engine)
+        if not isinstance(options.restarts, int) or options.restarts < 1:
+            raise Exception("restarts must be at least 1")
+        if ("input_file" in item) == ("talks" in item):
+            raise Exception("Expected either an input_file or a list of talks")
+        if "input_file" in item:
+            talks = list(read_talk_catalog(os.path.join(manifest_dir, item["input_file"])))
+        else:
+            talks = parse_talk_strings(item["talks"], "the talks of %s" % result["id"])
+        if options.shuffle:
+            talks = random.Random(options.seed).sample(talks, k=len(talks))
+        schedule = schedule_talks(options, options.seed, talks, None, time.perf_counter())
+        outf = io.StringIO()
+        JsonScheduleWriter(outf).write(schedule)
+        result["tracks"] = len(schedule.tracks)
+        result["wasted_time"] = schedule.get_wasted_time()
+        result["schedule"] = json.loads(outf.getvalue())
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def run_batch(args, seed):
+    """Schedules each of the conferences in main()'s --batch manifest (see
+    schedule_batch_item()) across a pool of args.workers processes, writing
+    the results to standard output as JSON lines, in the order in which the
+    conferences are finished.
+
+    Returns:
+        The number of conferences that couldn't be scheduled.
+    """
+    defaults = dict([(key, getattr(args, key)) for key in BATCH_OPTIONS])
+    defaults["seed"] = seed
+    manifest_dir = os.path.dirname(os.path.abspath(args.batch))
+    with open(args.batch, "rt", encoding="utf-8") as inf:
+        tasks = [(line_no, line, manifest_dir, defaults) for line_no, line in enumerate(inf, 1) if line.strip()]
+    start_time = time.perf_counter()
+    failures = 0
+
+    def write_result(result):
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+        return "error" in result
+
+    if args.workers > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = [executor.submit(schedule_batch_item, task) for task in tasks]
+            for future in concurrent.futures.as_completed(futures):
+                failures += write_result(future.result())
+    else:
+        for task in tasks:
+            failures += write_result(schedule_batch_item(task))
+    if args.verbose:
+        print("Scheduled %d of %d conferences in %.3f seconds" % (
+            len(tasks) - failures,
+            len(tasks),
+            time.perf_counter() - start_time
+        ), file=sys.stderr)
+    return failures
+
+
+def run_service(host, port, args):
+    """Runs a ScheduleService on the given address until interrupted."""
+    service = ScheduleService(workers=args.workers, max_queue=args.max_queue, request_timeout=args.request_timeout)
+    service.warm_up()
+    print("Serving on http://%s:%d with %d worker(s)" % (host, port, args.workers))
+    sys.stdout.flush()
+    try:
+        asyncio.run(service.serve(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+def schedule_event(args, talks, stats):
+    """Schedules the given talks across main()'s --days, and writes out the
+    days' schedules."""
+    if args.days.isdecimal():
+        if int(args.days) < 1:
+            raise Exception("There must be at least one day")
+        templates = [DayTemplate() for _ in range(int(args.days))]
+    else:
+        templates = read_day_templates(args.days)
+    schedules = schedule_days(
+        talks,
+        templates,
+        prefer_mornings=args.prefer_mornings,
+        workers=args.workers,
+        engine=args.engine,
+        verbose=args.verbose,
+        hooks=stats
+    )
+    start_time = time.perf_counter()
+    write_days(schedules, sys.stdout, format=args.format)
+    if stats is not None:
+        stats.phase_finished("render", time.perf_counter() - start_time)
+        summary = stats.to_dict()
+        summary["days"] = [
+            {"tracks": len(schedule.tracks), "wasted_time": schedule.get_wasted_time()} for schedule in schedules
+        ]
+        with open(args.stats, "wt", encoding="utf-8") as outf:
+            json.dump(summary, outf, indent=2)
+
+    if args.verbose:
+        for day_no, schedule in enumerate(schedules, 1):
+            rooms = schedule.template.rooms
+            print("Day %d: %d tracks (at least %d), %d mins wasted%s" % (
+                day_no,
+                len(schedule.tracks),
+                schedule.get_lower_bounds()[0],
+                schedule.get_wasted_time(),
+                " (WARNING: more tracks than the %d room(s) available)" % rooms if rooms is not None and len(schedule.tracks) > rooms else ""
+            ), file=sys.stderr)
+        print(
+            "Total wasted time in solution: %d mins\n" % sum([schedule.get_wasted_time() for schedule in schedules]),
+            file=sys.stderr
+        )
+
+
+def stream_schedule(args, stats):
+    """Schedules the talks from main()'s input file (or standard input) with
+    an OnlineScheduler, writing out each track as soon as it's closed."""
+    scheduler = OnlineScheduler(max_open_tracks=args.open_tracks, prefer_mornings=args.prefer_mornings, hooks=stats)
+    start_time = time.perf_counter()
+
+    def flushed(tracks):
+        for track in tracks:
+            yield track
+            # the track has been written out by now
+            sys.stdout.flush()
+
+    inf = sys.stdin if args.input_file == "-" else open(args.input_file, "rt", encoding="utf-8")
+    try:
+        # tracks are written out before the last talk is known, so the
+        # networking event starts at the latest possible time
+        SCHEDULE_WRITERS[args.format](sys.stdout).write_tracks(
+            flushed(scheduler.schedule(read_talks(inf, share_titles=False))),
+            friendly_time(0, start_hour=NETWORKING_START_HOUR_MAX)
+        )
+    finally:
+        if inf is not sys.stdin:
+            inf.close()
+    if stats is not None:
+        # reading, placing and writing out the talks are interleaved
+        stats.phase_finished("stream", time.perf_counter() - start_time)
+    if args.verbose or stats is not None:
+        comparison = scheduler.compare_with_offline()
+        if stats is not None:
+            summary = stats.to_dict()
+            summary["online"] = comparison
+            with open(args.stats, "wt", encoding="utf-8") as outf:
+                json.dump(summary, outf, indent=2)
+        if args.verbose:
+            print("Online schedule: %d tracks, %d mins wasted" % (
+                comparison["tracks"],
+                comparison["wasted_time"]
+            ), file=sys.stderr)
+            print("Offline BFD schedule: %d tracks, %d mins wasted (at least %d tracks needed)\n" % (
+                comparison["offline_tracks"],
+                comparison["offline_wasted_time"],
+                comparison["min_tracks"]
+            ), file=sys.stderr)
+
+
+def compile_main(argv):
+    """Runs the compile subcommand with the given arguments."""
+    parser = argparse.ArgumentParser(
+        prog="%s compile" % os.path.basename(sys.argv[0]),
+        description="Compiles a talk file into a binary catalog, which can be given " +
+            "instead of the talk file and is loaded without parsing it."
+    )
+    parser.add_argument("input_file", help="The talk file to compile.")
+    parser.add_argument(
+        "output_file",
+        nargs="?",
+        help="The file to which to write the catalog (default: the talk file " +
+            "with a .catalog extension)."
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Prints how many talks were compiled."
+    )
+    args = parser.parse_args(argv)
+    output_file = args.output_file or os.path.splitext(args.input_file)[0] + ".catalog"
+    if CompiledTalkCatalog.is_compiled(args.input_file):
+        parser.error("%s is already a compiled catalog" % args.input_file)
+    if os.path.exists(output_file) and os.path.samefile(args.input_file, output_file):
+        parser.error("The catalog can't overwrite the talk file")
+    catalog = CompiledTalkCatalog.compile(args.input_file, output_file)
+    if args.verbose:
+        print("Compiled %d talks into %s" % (len(catalog), output_file), file=sys.stderr)
 
 
 def main():
-    parser = argparse.ArgumentParser()
+    if sys.argv[1:2] == ["compile"]:
+        compile_main(sys.argv[2:])
+        return
+    parser = argparse.ArgumentParser(
+        epilog="Run '%(prog)s compile INPUT_FILE [OUTPUT_FILE]' to compile a talk " +
+            "file into a binary catalog that loads faster."
+    )
     parser.add_argument(
         "input_file",
-        help="A text file from which to read the list of talks (one per line)."
+        nargs="?",
+        help="A text file from which to read the list of talks (one per line), " +
+            "or a catalog compiled from one. With --stream, this can be - to read " +
+            "the talks from standard input."
     )
     parser.add_argument(
         "--shuffle",
@@ -378,23 +4806,293 @@ def main():
         help="Indicate to prefer to fill up morning sessions before filling " +
             "up the afternoon sessions."
     )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="bfd",
+        help="The engine to use to schedule the talks. The multiset engine " +
+            "packs counts of talks per duration rather than individual talks, " +
+            "which is much faster for large numbers of talks with only a few " +
+            "different durations. The numpy engine " +
+            "does the same with NumPy arrays, falling back to the multiset " +
+            "engine if NumPy isn't installed (default: bfd)."
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="The random seed to use for --shuffle and --restarts (defaults " +
+            "to the current time)."
+    )
+    parser.add_argument(
+        "--restarts",
+        type=int,
+        default=1,
+        help="Run the scheduling algorithm this many times, with randomly " +
+            "perturbed talk orderings, and keep the best schedule (default: 1)."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="The number of worker processes to use for --restarts, --batch, " +
+            "--serve, --days or --shards (default: 1)."
+    )
+    parser.add_argument(
+        "--both-strategies",
+        action="store_true",
+        help="With --restarts, try both with and without --prefer-mornings " +
+            "on each restart."
+    )
+    parser.add_argument(
+        "--exact",
+        action="store_true",
+        help="Search for a schedule with the fewest possible tracks, starting " +
+            "from the BFD schedule."
+    )
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        default=10.0,
+        help="The maximum number of seconds that --exact may spend searching " +
+            "before settling for the best schedule found so far (default: 10)."
+    )
+    parser.add_argument(
+        "--improve-ms",
+        type=int,
+        default=0,
+        help="After scheduling the talks, spend up to this many milliseconds " +
+            "trying to improve the schedule by moving talks between sessions " +
+            "(default: 0)."
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(SCHEDULE_WRITERS),
+        default="text",
+        help="The format in which to write the schedule (default: text)."
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="The directory in which to cache schedules, so that reruns on " +
+            "talks with the same durations and options can skip scheduling " +
+            "(default: $XDG_CACHE_HOME/sort_talks or ~/.cache/sort_talks)."
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't read or write cached schedules."
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="MANIFEST",
+        help="Instead of a single input file, schedule each of the conferences " +
+            "in this JSON lines file, across --workers processes. Each line is " +
+            "an object with an id, either an input_file or a list of talks, and " +
+            "optionally any of the options %s (which default to the ones given " % ", ".join(BATCH_OPTIONS) +
+            "on the command line). The results are written to standard output " +
+            "as JSON lines, in the order in which they're finished."
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="[HOST:]PORT",
+        help="Instead of scheduling an input file, run an HTTP/JSON scheduling " +
+            "service on this address (with HOST defaulting to 127.0.0.1), with " +
+            "a pool of --workers processes. POST a JSON object with a list of " +
+            "talks to /schedule, and GET /metrics for request statistics."
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=DEFAULT_MAX_QUEUE,
+        help="With --serve, the maximum number of schedules that can be queued " +
+            "or in progress before requests are turned away (default: %d)." % DEFAULT_MAX_QUEUE
+    )
+    parser.add_argument(
+        "--request-timeout",
+        type=float,
+        default=DEFAULT_REQUEST_TIMEOUT,
+        help="With --serve, the maximum number of seconds to spend on a request " +
+            "(default: %g)." % DEFAULT_REQUEST_TIMEOUT
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Place the talks one at a time as they're read, into a bounded " +
+            "number of open tracks, writing out each track as soon as it's " +
+            "full (or needs to make way for a new track). Uses a bounded " +
+            "amount of memory, at the cost of usually wasting more time than " +
+            "the default scheduling."
+    )
+    parser.add_argument(
+        "--open-tracks",
+        type=int,
+        default=DEFAULT_OPEN_TRACKS,
+        help="With --stream, the maximum number of tracks to keep open " +
+            "(default: %d)." % DEFAULT_OPEN_TRACKS
+    )
+    parser.add_argument(
+        "--days",
+        metavar="N|FILE",
+        help="Schedule a multi-day event: either N identical days, or the days " +
+            "in this JSON file, which holds a list of objects with any of the " +
+            "keys %s. The talks are distributed across the days, " % ", ".join(DayTemplate.FIELDS) +
+            "in proportion to their capacity, and each day is then packed in " +
+            "parallel across --workers processes."
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Split the talks into this many shards with balanced total " +
+            "durations, pack each shard on its own across --workers " +
+            "processes, and then merge them, repacking the partly empty " +
+            "tracks at the end of each shard (default: 1)."
+    )
+    parser.add_argument(
+        "--update",
+        metavar="SCHEDULE",
+        help="Instead of scheduling the talks from scratch, update this " +
+            "schedule (written with --format json): withdraw the talks that " +
+            "are no longer in the input file, and insert the new ones into " +
+            "the best fitting sessions, so that most talks keep their slots."
+    )
+    parser.add_argument(
+        "--diff",
+        metavar="FILE",
+        help="With --update, writes the talks that have been withdrawn, added " +
+            "or moved to this file."
+    )
+    parser.add_argument(
+        "--stats",
+        metavar="FILE",
+        help="Writes a JSON summary of counters (e.g. sessions scanned per " +
+            "talk placed) and the time spent on each phase to this file."
+    )
     parser.add_argument(
         "-v", "--verbose",
         action="store_true",
-        help="Adds some verbose output about the quality of the solution."
+        help="Adds some verbose output about the quality of the solution " +
+            "(to standard error, so it doesn't get mixed up with the schedule)."
     )
     args = parser.parse_args()
-    talks = [talk for talk in read_talks_from_file(args.input_file)]
+    if args.restarts < 1 or args.workers < 1 or args.shards < 1:
+        parser.error("--restarts, --workers and --shards must be at least 1")
+    if args.diff and not args.update:
+        parser.error("--diff requires --update")
+    if args.stream and (args.shuffle or args.restarts > 1 or args.both_strategies or args.exact or
+                        args.improve_ms > 0 or args.update):
+        parser.error("--stream can't be combined with --shuffle, --restarts, --both-strategies, " +
+                     "--exact, --improve-ms or --update")
+    if args.open_tracks < 1:
+        parser.error("--open-tracks must be at least 1")
+    if args.batch and (args.input_file or args.stream or args.update or args.stats):
+        parser.error("--batch can't be combined with an input file, --stream, --update or --stats")
+    if args.serve and (args.input_file or args.batch or args.stream or args.update or args.stats):
+        parser.error("--serve can't be combined with an input file, --batch, --stream, --update or --stats")
+    if args.max_queue < 1:
+        parser.error("--max-queue must be at least 1")
+    if args.days and (args.batch or args.serve or args.stream or args.update or args.restarts > 1 or
+                      args.both_strategies or args.exact or args.improve_ms > 0):
+        parser.error("--days can't be combined with --batch, --serve, --stream, --update, --restarts, " +
+                     "--both-strategies, --exact or --improve-ms")
+    if args.shards > 1 and (args.batch or args.serve or args.stream or args.update or args.days or
+                            args.restarts > 1 or args.both_strategies or args.exact):
+        parser.error("--shards can't be combined with --batch, --serve, --stream, --update, --days, " +
+                     "--restarts, --both-strategies or --exact")
+    if not args.batch and not args.serve and not args.input_file:
+        parser.error("the following arguments are required: input_file")
+    if args.serve:
+        host, _, port = args.serve.rpartition(":")
+        if not port.isdecimal():
+            parser.error("Invalid address for --serve: %s" % args.serve)
+        run_service(host or "127.0.0.1", int(port), args)
+        return
+    seed = args.seed if args.seed is not None else int(time.time())
+    if args.batch:
+        if run_batch(args, seed) > 0:
+            sys.exit(1)
+        return
+    stats = ScheduleStats() if args.stats else None
+    if args.stream:
+        if args.input_file != "-" and CompiledTalkCatalog.is_compiled(args.input_file):
+            parser.error("--stream needs a talk file rather than a compiled catalog")
+        stream_schedule(args, stats)
+        return
+    start_time = time.perf_counter()
+    talks = list(read_talk_catalog(args.input_file))
     if args.shuffle:
-        random.seed(time.time())
-        talks = random.sample(talks, k=len(talks))
+        talks = random.Random(seed).sample(talks, k=len(talks))
+    if stats is not None:
+        stats.phase_finished("parse", time.perf_counter() - start_time)
+        start_time = time.perf_counter()
+    constrained = any([talk.constraints is not None for talk in talks])
+    if constrained and (args.days or args.update):
+        parser.error("Talk constraints can't be combined with --days or --update")
+    if args.days:
+        schedule_event(args, talks, stats)
+        return
+
+    cache, packing, cache_options = None, None, None
+    # cached packings only depend on the talks' durations, so they can't be
+    # used for talks with constraints
+    if not args.no_cache and not args.update and not constrained:
+        cache_options = get_cache_options(args, seed, talks)
+    if cache_options is not None:
+        duration_counts = {}
+        for talk in talks:
+            duration_counts[talk.duration] = duration_counts.get(talk.duration, 0) + 1
+        cache = ScheduleCache(args.cache_dir or ScheduleCache.get_default_dir())
+        cache_key = ScheduleCache.make_key(duration_counts, **cache_options)
+        packing = cache.get(cache_key, duration_counts)
+        if stats is not None:
+            stats.phase_finished("cache", time.perf_counter() - start_time)
+            start_time = time.perf_counter()
 
-    schedule = ConferenceSchedule(prefer_mornings=args.prefer_mornings, verbose=args.verbose)
-    schedule.add_talks(talks)
-    print("%s\n" % schedule)
+    if args.update:
+        schedule = read_schedule(args.update, prefer_mornings=args.prefer_mornings, verbose=args.verbose, hooks=stats)
+        if stats is not None:
+            stats.phase_finished("load", time.perf_counter() - start_time)
+            start_time = time.perf_counter()
+        editor = ScheduleEditor(schedule)
+        editor.update(talks)
+        if args.verbose:
+            print("Withdrew %d talks, inserted %d talks and moved %d talks" % (
+                editor.withdrawn,
+                editor.inserted,
+                len([change for change in editor.get_changes() if change[0] == "moved"])
+            ), file=sys.stderr)
+        if args.diff:
+            with open(args.diff, "wt", encoding="utf-8") as outf:
+                for line in editor.format_changes():
+                    outf.write(line + "\n")
+        if stats is not None:
+            stats.phase_finished("edit", time.perf_counter() - start_time)
+    elif packing is not None:
+        if args.verbose:
+            print("Using cached schedule %s" % cache_key, file=sys.stderr)
+        schedule = ConferenceSchedule(prefer_mornings=args.prefer_mornings, verbose=args.verbose, hooks=stats)
+        schedule.apply_packing(packing, talks)
+        if stats is not None:
+            stats.phase_finished("bind", time.perf_counter() - start_time)
+    else:
+        recorder = PackingRecorder() if cache is not None else None
+        schedule = schedule_talks(args, seed, talks, MultiHooks.combine(stats, recorder), start_time)
+        if cache is not None:
+            start_time = time.perf_counter()
+            # the recorded packing doesn't include any changes made by the
+            # local search
+            cache.put(cache_key, schedule.to_packing() if args.improve_ms > 0 else recorder.get_packing(schedule))
+            if stats is not None:
+                stats.phase_finished("cache", time.perf_counter() - start_time)
+    start_time = time.perf_counter()
+    write_schedule(schedule, sys.stdout, format=args.format)
+    if stats is not None:
+        stats.phase_finished("render", time.perf_counter() - start_time)
+        with open(args.stats, "wt", encoding="utf-8") as outf:
+            json.dump(stats.to_dict(schedule), outf, indent=2)
 
     if args.verbose:
-        print("Total wasted time in solution: %d mins\n" % schedule.get_wasted_time())
+        print(schedule.describe_gap(), file=sys.stderr)
+        print("Total wasted time in solution: %d mins\n" % schedule.get_wasted_time(), file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,21 @@
+"""Helpers shared by the test cases."""
+
+import random
+from sort_talks import Talk
+
+# the durations from which make_talks() picks by default
+DURATIONS = (5, 15, 30, 45, 60)
+
+
+def make_talks(count, seed, durations=DURATIONS):
+    """Makes the given number of talks with unique titles and random
+    durations.
+
+    Args:
+        count: The number of talks to make.
+        seed: The seed for the durations, or a random.Random instance from
+            which to pick them.
+        durations: The durations from which to pick.
+    """
+    rng = seed if isinstance(seed, random.Random) else random.Random(seed)
+    return [Talk("Talk %d" % i, rng.choice(durations)) for i in range(count)]
@@ -0,0 +1,84 @@
+"""Test cases for scheduling a batch of conferences from a manifest."""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from sort_talks import BATCH_OPTIONS, ConferenceSchedule, read_talks_from_file, run_batch, schedule_batch_item
+
+TESTS_PATH = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_args(manifest, workers=1, **options):
+    defaults = {
+        "shuffle": False,
+        "prefer_mornings": False,
+        "engine": "bfd",
+        "seed": 1,
+        "restarts": 1,
+        "both_strategies": False,
+        "exact": False,
+        "time_limit": 10.0,
+        "improve_ms": 0
+    }
+    defaults.update(options)
+    return argparse.Namespace(batch=manifest, workers=workers, verbose=False, **defaults)
+
+
+class TestBatchMode(unittest.TestCase):
+    def schedule(self, item, **options):
+        args = make_args(None, **options)
+        defaults = dict([(key, getattr(args, key)) for key in BATCH_OPTIONS])
+        return schedule_batch_item((1, json.dumps(item), TESTS_PATH, defaults))
+
+    def test_scheduling_conferences(self):
+        result = self.schedule({"id": "inline", "talks": ["First 60min", "Second lightning"]})
+        self.assertEqual((1, 355), (result["tracks"], result["wasted_time"]))
+        self.assertEqual(
+            [{"start": "09:00AM", "title": "First", "duration": 60}, {"start": "10:00AM", "title": "Second", "duration": 5}],
+            result["schedule"]["tracks"][0]["morning"]
+        )
+
+        # options can be overridden per conference
+        result = self.schedule({"id": "file", "input_file": "../testcase1.txt", "prefer_mornings": True})
+        schedule = ConferenceSchedule(prefer_mornings=True)
+        schedule.add_talks(list(read_talks_from_file(os.path.join(TESTS_PATH, "..", "testcase1.txt"))))
+        self.assertEqual((len(schedule.tracks), schedule.get_wasted_time()), (result["tracks"], result["wasted_time"]))
+
+    def test_errors(self):
+        self.assertEqual({"id": 1, "error": "Expected a JSON object"}, self.schedule([]))
+        self.assertIn("Unknown option(s): colour", self.schedule({"id": "x", "talks": [], "colour": "red"})["error"])
+        self.assertIn("Unknown scheduling engine", self.schedule({"talks": [], "engine": "magic"})["error"])
+        self.assertIn("either an input_file or a list of talks", self.schedule({"id": "x"})["error"])
+        result = self.schedule({"id": "bad", "talks": ["Fine 30min", "Broken", "Too long 300min"]})
+        self.assertEqual("bad", result["id"])
+        self.assertIn("line 2", result["error"])
+        self.assertIn("line 3", result["error"])
+        self.assertIn("error", self.schedule({"id": "missing", "input_file": "missing.txt"}))
+
+    def test_running_batches(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            shutil.copy(os.path.join(TESTS_PATH, "..", "testcase2.txt"), tmp_dir)
+            manifest = os.path.join(tmp_dir, "manifest.jsonl")
+            with open(manifest, "wt", encoding="utf-8") as outf:
+                outf.write('{"id": "a", "input_file": "testcase2.txt"}\n')
+                outf.write("\n")
+                outf.write("not json\n")
+                outf.write('{"id": "c", "talks": ["Talk 45min"], "exact": true}\n')
+            for workers in (1, 2):
+                stdout = io.StringIO()
+                with contextlib.redirect_stdout(stdout):
+                    failures = run_batch(make_args(manifest, workers=workers), 1)
+                self.assertEqual(1, failures)
+                results = dict([(result["id"], result) for result in map(json.loads, stdout.getvalue().splitlines())])
+                self.assertEqual(set(["a", 3, "c"]), set(results))
+                self.assertIn("error", results[3])
+                self.assertEqual(1, results["c"]["tracks"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""Test cases for compiling talk files into binary catalogs."""
+
+import os
+import tempfile
+import unittest
+from sort_talks import CompiledTalkCatalog, ConferenceSchedule, read_talk_catalog
+
+TALKS = (
+    "Keynote 60min | speaker=Ada, Grace; apart=plenary\n"
+    "Rails | Django 30min\n"
+    "Wrap-up lightning\n"
+    "Café culture 45min | together=food\n"
+    "Rails | Django 30min\n"
+)
+
+
+class TestCompiledCatalog(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp_dir.name, "talks.txt")
+        self.compiled = os.path.join(self.tmp_dir.name, "talks.catalog")
+        with open(self.source, "wt", encoding="utf-8") as outf:
+            outf.write(TALKS)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assertSameTalks(self, expected, actual):
+        self.assertEqual(len(expected), len(actual))
+        for talk, other in zip(expected, actual):
+            self.assertEqual((talk.title, talk.duration), (other.title, other.duration))
+            if talk.constraints is None:
+                self.assertIsNone(other.constraints)
+            else:
+                self.assertEqual(talk.constraints.speakers, other.constraints.speakers)
+                self.assertEqual(talk.constraints.together, other.constraints.together)
+                self.assertEqual(talk.constraints.apart, other.constraints.apart)
+
+    def test_round_trip(self):
+        catalog = CompiledTalkCatalog.compile(self.source, self.compiled)
+        compiled = read_talk_catalog(self.compiled)
+        self.assertIsInstance(compiled, CompiledTalkCatalog)
+        self.assertSameTalks(list(catalog), list(compiled))
+        self.assertEqual(catalog.get_duration_counts(), compiled.get_duration_counts())
+        self.assertEqual("Café culture", compiled.titles[-2])
+        self.assertEqual(["Rails | Django", "Wrap-up"], compiled.titles[1:3])
+        self.assertEqual(catalog.get_talk(3).title, compiled.get_talk(3).title)
+
+    def test_scheduling_compiled_catalog(self):
+        CompiledTalkCatalog.compile(self.source, self.compiled)
+        schedules = []
+        for filename in (self.source, self.compiled):
+            schedule = ConferenceSchedule()
+            schedule.add_talks(list(read_talk_catalog(filename)))
+            schedules.append([session.talk_titles for session in schedule.get_all_sessions()])
+        self.assertEqual(schedules[0], schedules[1])
+
+    def test_stale_catalog(self):
+        CompiledTalkCatalog.compile(self.source, self.compiled)
+        # touching the talk file without changing it doesn't make the catalog
+        # stale
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(5, len(read_talk_catalog(self.compiled)))
+        with open(self.source, "wt", encoding="utf-8") as outf:
+            outf.write(TALKS.replace("Wrap-up", "Wrap-Up"))
+        with self.assertRaises(Exception):
+            read_talk_catalog(self.compiled)
+        self.assertEqual(5, len(CompiledTalkCatalog.load(self.compiled, check_source=False)))
+        CompiledTalkCatalog.compile(self.source, self.compiled)
+        self.assertEqual("Wrap-Up", read_talk_catalog(self.compiled).titles[2])
+
+    def test_moving_and_removing_source(self):
+        CompiledTalkCatalog.compile(self.source, self.compiled)
+        self.assertFalse(CompiledTalkCatalog.is_compiled(self.source))
+        self.assertTrue(CompiledTalkCatalog.is_compiled(self.compiled))
+        # the talk file is found relative to the catalog, so they can be moved
+        # together
+        moved_dir = os.path.join(self.tmp_dir.name, "moved")
+        os.mkdir(moved_dir)
+        os.rename(self.source, os.path.join(moved_dir, "talks.txt"))
+        os.rename(self.compiled, os.path.join(moved_dir, "talks.catalog"))
+        with open(os.path.join(moved_dir, "talks.txt"), "at", encoding="utf-8") as outf:
+            outf.write("Late addition 15min\n")
+        with self.assertRaises(Exception):
+            read_talk_catalog(os.path.join(moved_dir, "talks.catalog"))
+        # and the catalog can still be used without its talk file
+        os.unlink(os.path.join(moved_dir, "talks.txt"))
+        self.assertEqual(5, len(read_talk_catalog(os.path.join(moved_dir, "talks.catalog"))))
@@ -0,0 +1,105 @@
+"""Test cases for scheduling multi-day events with day templates."""
+
+import csv
+import io
+import json
+import unittest
+from sort_talks import ConferenceSchedule, DayTemplate, Talk, TalkSession, distribute_talks, schedule_days, write_days
+from tests.helpers import make_talks
+
+
+class TestDayTemplates(unittest.TestCase):
+    def test_template_sessions(self):
+        template = DayTemplate(start_hour=10, lunch_start_hour=12, lunch_end_hour=13, networking_start_hour_min=15,
+                               networking_start_hour_max=16)
+        self.assertEqual(120, template.morning_session_duration)
+        self.assertEqual(180, template.afternoon_session_duration)
+        self.assertEqual(300, template.track_duration)
+        self.assertEqual(120, template.max_talk_duration)
+        session = TalkSession(False, template=template)
+        self.assertEqual(13, session.start_hour)
+        self.assertEqual(180, session.total_time)
+        self.assertEqual(template.to_dict(), DayTemplate.from_dict(template.to_dict()).to_dict())
+
+        with self.assertRaises(Exception):
+            DayTemplate(start_hour=12, lunch_start_hour=11)
+        with self.assertRaises(Exception):
+            DayTemplate(networking_start_hour_min=12)
+        with self.assertRaises(Exception):
+            DayTemplate.from_dict({"room": 2})
+
+    def test_scheduling_with_template(self):
+        template = DayTemplate(start_hour=10, lunch_start_hour=12, lunch_end_hour=13, networking_start_hour_min=15,
+                               networking_start_hour_max=16)
+        schedule = ConferenceSchedule(template=template)
+        schedule.add_talks([Talk("A", 60), Talk("B", 60), Talk("C", 60)])
+        self.assertEqual(
+            "\nTrack 1\n\n10:00AM A 60min\n11:00AM B 60min\n12:00PM Lunch\n01:00PM C 60min\n02:00PM Networking Event",
+            str(schedule)
+        )
+        self.assertEqual(
+            str(schedule),
+            str(ConferenceSchedule.copy_of(schedule))
+        )
+        multiset_schedule = ConferenceSchedule(engine="multiset", template=template)
+        multiset_schedule.add_talks([Talk("A", 60), Talk("B", 60), Talk("C", 60)])
+        self.assertEqual(str(schedule), str(multiset_schedule))
+
+    def test_distributing_talks(self):
+        talks = make_talks(2000, 1)
+        templates = [DayTemplate(rooms=3), DayTemplate(rooms=1)]
+        days = distribute_talks(talks, templates)
+        self.assertEqual(sorted(talk.title for talk in talks), sorted(talk.title for day in days for talk in day))
+        for day in days:
+            positions = [int(talk.title.split()[1]) for talk in day]
+            self.assertEqual(sorted(positions), positions)
+        loads = [sum(talk.duration for talk in day) for day in days]
+        self.assertAlmostEqual(3.0, loads[0] / loads[1], delta=0.05)
+
+        # long talks only go to days on which they fit
+        short_day = DayTemplate(lunch_start_hour=10, lunch_end_hour=11, networking_start_hour_min=12,
+                                networking_start_hour_max=12)
+        days = distribute_talks([Talk("Long", 90)] + make_talks(10, 2), [short_day, DayTemplate()])
+        self.assertIn("Long", [talk.title for talk in days[1]])
+        with self.assertRaises(Exception):
+            distribute_talks([Talk("Long", 90)], [short_day])
+
+    def test_scheduling_days(self):
+        talks = make_talks(1000, 3)
+        templates = [
+            DayTemplate(name="Monday", rooms=4),
+            DayTemplate(name="Tuesday", start_hour=10, lunch_start_hour=13, lunch_end_hour=14,
+                        networking_start_hour_min=17, networking_start_hour_max=18)
+        ]
+        days = distribute_talks(talks, templates)
+        schedules = schedule_days(talks, templates, workers=2)
+        self.assertEqual(len(templates), len(schedules))
+        for day_talks, template, schedule in zip(days, templates, schedules):
+            self.assertIs(template, schedule.template)
+            expected = ConferenceSchedule(template=template)
+            expected.add_talks(day_talks)
+            self.assertEqual(str(expected), str(schedule))
+
+    def test_writing_days(self):
+        templates = [DayTemplate(name="Monday"), DayTemplate(start_hour=10, lunch_start_hour=12)]
+        schedules = schedule_days(make_talks(40, 4), templates)
+
+        outf = io.StringIO()
+        write_days(schedules, outf)
+        text = outf.getvalue()
+        self.assertTrue(text.startswith("Day 1: Monday\n\nTrack 1\n\n09:00AM "))
+        self.assertIn("\n\nDay 2\n\nTrack 1\n\n10:00AM ", text)
+
+        outf = io.StringIO()
+        write_days(schedules, outf, format="json")
+        document = json.loads(outf.getvalue())
+        self.assertEqual([1, 2], [day["day"] for day in document["days"]])
+        self.assertEqual("Monday", document["days"][0]["template"]["name"])
+        self.assertEqual("10:00AM", document["days"][1]["schedule"]["tracks"][0]["morning"][0]["start"])
+
+        outf = io.StringIO()
+        write_days(schedules, outf, format="csv")
+        rows = list(csv.reader(io.StringIO(outf.getvalue())))
+        self.assertEqual(["day", "track_no", "session", "start", "title", "duration"], rows[0])
+        self.assertEqual({"1", "2"}, set(row[0] for row in rows[1:]))
+        self.assertEqual(40, len([row for row in rows if row[2] in ("morning", "afternoon")]))
@@ -0,0 +1,58 @@
+"""Test cases for the exact (branch-and-bound) solver."""
+
+import unittest
+from sort_talks import ConferenceSchedule, DayTemplate, ExactSolver, Talk
+
+# BFD needs 4 tracks for these, but they fit into 3
+DURATIONS = [25, 95, 100, 110, 110, 110, 125, 150, 150, 170]
+
+
+class TestExactSolver(unittest.TestCase):
+    def test_finds_fewer_tracks_than_bfd(self):
+        talks = [Talk("Talk %d" % i, duration) for i, duration in enumerate(DURATIONS)]
+        bfd_schedule = ConferenceSchedule()
+        bfd_schedule.add_talks(talks)
+        self.assertEqual(4, len(bfd_schedule.tracks))
+
+        schedule = ConferenceSchedule()
+        self.assertTrue(schedule.add_talks_exact(talks))
+        self.assertEqual(3, len(schedule.tracks))
+        self.assertEqual(3*420 - sum(DURATIONS), schedule.get_wasted_time())
+        self.assertEqual(
+            sorted(talk.title for talk in talks),
+            sorted(talk.title for session in schedule.get_all_sessions() for talk in session.talks)
+        )
+        for session in schedule.get_all_sessions():
+            self.assertGreaterEqual(session.wasted_time, 0)
+
+    def test_optimal_bfd_schedule(self):
+        solver = ExactSolver({60: 14})
+        packing, optimal = solver.solve()
+        self.assertTrue(optimal)
+        self.assertEqual(2, len(packing))
+        self.assertEqual(0, solver.nodes)
+
+    def test_time_limit(self):
+        duration_counts = {}
+        for duration in DURATIONS:
+            duration_counts[duration] = duration_counts.get(duration, 0) + 1
+        packing, optimal = ExactSolver(duration_counts, time_limit=0).solve()
+        self.assertFalse(optimal)
+        # falls back to the BFD packing
+        self.assertEqual(4, len(packing))
+
+    def test_day_template(self):
+        # two hour sessions, into which BFD needs 2 tracks for these
+        template = DayTemplate(lunch_start_hour=11, lunch_end_hour=12, networking_start_hour_min=14,
+                               networking_start_hour_max=14)
+        talks = [Talk("Talk %d" % i, duration) for i, duration in enumerate([25, 25, 35, 40, 55, 55])]
+        bfd_schedule = ConferenceSchedule(template=template)
+        bfd_schedule.add_talks(talks)
+        self.assertEqual(2, len(bfd_schedule.tracks))
+
+        schedule = ConferenceSchedule(template=template)
+        self.assertTrue(schedule.add_talks_exact(talks))
+        self.assertEqual(1, len(schedule.tracks))
+        self.assertEqual(240 - 235, schedule.get_wasted_time())
+        for session in schedule.get_all_sessions():
+            self.assertGreaterEqual(session.wasted_time, 0)
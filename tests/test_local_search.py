@@ -0,0 +1,48 @@
+"""Test cases for the local search improvement pass."""
+
+import random
+import unittest
+from sort_talks import ConferenceSchedule, LocalSearch, Talk
+
+
+class TestLocalSearch(unittest.TestCase):
+    def assertConsistent(self, schedule, talks):
+        self.assertEqual(
+            sorted(talk.title for talk in talks),
+            sorted(talk.title for session in schedule.get_all_sessions() for talk in session.talks)
+        )
+        for session in schedule.get_all_sessions():
+            self.assertGreaterEqual(session.wasted_time, 0)
+            self.assertEqual(sum(talk.duration for talk in session.talks), session.used_time)
+            end_time = 0
+            for talk in session.talks:
+                self.assertEqual(end_time, talk.start_time)
+                end_time = talk.end_time
+
+    def test_emptying_last_track(self):
+        schedule = ConferenceSchedule()
+        schedule.create_track()
+        schedule.create_track()
+        talks = [Talk("Talk 1", 60), Talk("Talk 2", 60), Talk("Talk 3", 45)]
+        schedule.tracks[0].morning_session.add_talk(talks[0])
+        schedule.tracks[0].afternoon_session.add_talk(talks[1])
+        schedule.tracks[1].afternoon_session.add_talk(talks[2])
+
+        local_search = LocalSearch(schedule, seed=1)
+        self.assertEqual(1, local_search.run(1.0, max_iterations=1000))
+        self.assertEqual(1, len(schedule.tracks))
+        self.assertEqual(2, schedule.next_track_no)
+        self.assertConsistent(schedule, talks)
+        # the emptied sessions shouldn't be picked for new talks
+        self.assertIs(schedule.tracks[0].morning_session, schedule.find_best_fit_session(Talk("Talk 4", 60)))
+
+    def test_random_schedules_stay_consistent(self):
+        rng = random.Random(99)
+        for i in range(10):
+            talks = [Talk("Talk %d" % j, rng.choice([25, 40, 55, 70, 95, 110, 130, 170])) for j in range(30)]
+            schedule = ConferenceSchedule()
+            schedule.add_talks(talks)
+            track_count = len(schedule.tracks)
+            LocalSearch(schedule, seed=i).run(1.0, max_iterations=2000)
+            self.assertLessEqual(len(schedule.tracks), track_count)
+            self.assertConsistent(schedule, talks)
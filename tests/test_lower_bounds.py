@@ -0,0 +1,66 @@
+"""Test cases for the lower bounds on the number of tracks and sessions."""
+
+import contextlib
+import io
+import random
+import unittest
+from sort_talks import ConferenceSchedule, DayTemplate, ExactSolver, LocalSearch, Talk, pack_duration_counts
+from sort_talks import bin_lower_bound, compute_lower_bounds, search_schedules
+
+
+class TestLowerBounds(unittest.TestCase):
+    def test_bin_lower_bound(self):
+        self.assertEqual(0, bin_lower_bound({}, 240))
+        self.assertEqual(2, bin_lower_bound({60: 7}, 240))
+        # the talks longer than half a bin each need one, and the 100 min
+        # talks fit into the space left over
+        self.assertEqual(4, bin_lower_bound({130: 4, 100: 4}, 240))
+        # but not if they're longer than the space left over
+        self.assertEqual(6, bin_lower_bound({130: 4, 120: 4}, 240))
+
+    def test_lower_bounds(self):
+        self.assertEqual((1, 2), compute_lower_bounds({60: 7}))
+        # only two 150 min talks fit into a track
+        self.assertEqual((2, 3), compute_lower_bounds({150: 3}))
+        # the total duration alone would only need 2 tracks
+        self.assertEqual((3, 6), compute_lower_bounds({125: 6, 60: 1}))
+        template = DayTemplate(lunch_start_hour=11, lunch_end_hour=12, networking_start_hour_min=14,
+                               networking_start_hour_max=14)
+        self.assertEqual((3, 5), compute_lower_bounds({100: 5}, template=template))
+        with self.assertRaises(Exception):
+            compute_lower_bounds({150: 1}, template=template)
+
+    def test_bounds_hold(self):
+        rng = random.Random(1)
+        for _ in range(100):
+            duration_counts = dict((duration, rng.randint(1, 6)) for duration in rng.sample(
+                [5, 15, 30, 45, 60, 90, 100, 120, 125, 130, 150, 170, 180], rng.randint(1, 4)))
+            min_tracks, min_sessions = compute_lower_bounds(duration_counts)
+            # the solver stops at the bound, so check it by searching
+            # exhaustively for a packing with one track fewer (which
+            # find_fills() does without looking at the bound)
+            self.assertIsNone(ExactSolver(duration_counts).find_fills(min_tracks - 1))
+            bfd_packing = pack_duration_counts(duration_counts)
+            self.assertLessEqual(min_sessions, len([runs for track in bfd_packing for runs in track if runs]))
+
+    def test_reporting_the_gap(self):
+        schedule = ConferenceSchedule()
+        schedule.add_talks([Talk("Talk %d" % i, 60) for i in range(7)])
+        self.assertEqual((1, 2), schedule.get_lower_bounds())
+        self.assertEqual("Lower bound: 1 tracks (2 non-empty sessions), so this schedule is optimal",
+                         schedule.describe_gap())
+        schedule.create_track()
+        self.assertIn("at most 1 track(s) (420 mins) from optimal", schedule.describe_gap())
+
+    def test_stopping_at_the_bound(self):
+        talks = [Talk("Talk %d" % i, 60) for i in range(14)]
+        for workers in (1, 2):
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                schedule = search_schedules(talks, restarts=50, workers=workers, both_strategies=True, verbose=True)
+            self.assertEqual(2, len(schedule.tracks))
+            self.assertIn("Stopped after 1 of 100 runs", stderr.getvalue())
+
+        local_search = LocalSearch(schedule)
+        local_search.run(1.0)
+        self.assertEqual(0, local_search.iterations)
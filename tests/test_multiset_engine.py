@@ -0,0 +1,54 @@
+"""Test cases to ensure that the multiset scheduling engine produces exactly
+the same schedules as scheduling talks one at a time."""
+
+import os
+import random
+import unittest
+from sort_talks import ConferenceSchedule, Talk, pack_duration_counts, read_talks_from_file
+
+TESTS_PATH = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestMultisetEngine(unittest.TestCase):
+    def assertSameSchedules(self, talks, prefer_mornings):
+        bfd_schedule = ConferenceSchedule(prefer_mornings=prefer_mornings)
+        bfd_schedule.add_talks(talks)
+        multiset_schedule = ConferenceSchedule(prefer_mornings=prefer_mornings, engine="multiset")
+        multiset_schedule.add_talks(talks)
+        self.assertEqual(bfd_schedule.to_packing(), multiset_schedule.to_packing())
+        self.assertEqual("%s" % bfd_schedule, "%s" % multiset_schedule)
+
+    def test_packing_runs_of_talks(self):
+        packing = pack_duration_counts({60: 7, 30: 1})
+        self.assertEqual([([(60, 3, 0)], [(60, 4, 1)]), ([(30, 1, 2)], [])], packing)
+
+    def test_test_cases(self):
+        for filename in ("testcase1.txt", "testcase2.txt"):
+            talks = list(read_talks_from_file(os.path.join(TESTS_PATH, "..", filename)))
+            for prefer_mornings in (False, True):
+                self.assertSameSchedules(talks, prefer_mornings)
+
+    def test_random_talks(self):
+        rng = random.Random(4321)
+        for i in range(30):
+            talks = [Talk("Talk %d" % j, rng.choice([5, 15, 30, 45, 60, 90, 180])) for j in range(rng.randint(1, 300))]
+            for prefer_mornings in (False, True):
+                self.assertSameSchedules(talks, prefer_mornings)
+
+    def test_falling_back_for_many_durations(self):
+        rng = random.Random(1234)
+        schedule = ConferenceSchedule(engine="multiset")
+        few = [Talk("Talk %d" % i, rng.choice([5, 60])) for i in range(1000)]
+        many = [Talk("Talk %d" % i, rng.choice(range(5, 185, 5))) for i in range(1000)]
+        self.assertFalse(schedule.has_short_runs({5: 500, 60: 500}, 1000))
+        self.assertTrue(schedule.has_short_runs(dict.fromkeys(range(5, 185, 5), 28), 1008))
+        for talks in (few, many):
+            for prefer_mornings in (False, True):
+                self.assertSameSchedules(talks, prefer_mornings)
+
+    def test_applying_mismatched_packing(self):
+        schedule = ConferenceSchedule()
+        with self.assertRaises(Exception):
+            schedule.apply_packing([([(60, 2, 0)], [])], [Talk("Talk 1", 60)])
+        with self.assertRaises(Exception):
+            schedule.apply_packing([([(60, 1, 0)], [])], [Talk("Talk 1", 60), Talk("Talk 2", 30)])
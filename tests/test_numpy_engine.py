@@ -0,0 +1,50 @@
+"""Test cases to ensure that the NumPy scheduling engine produces exactly the
+same schedules as the pure Python engines."""
+
+import random
+import unittest
+from sort_talks import ConferenceSchedule, Talk, pack_duration_counts, pack_duration_counts_numpy
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestNumpyEngine(unittest.TestCase):
+    def test_schedules(self):
+        # without NumPy, this tests the fallback to the multiset engine
+        rng = random.Random(8765)
+        for i in range(20):
+            talks = [Talk("Talk %d" % j, rng.choice([5, 15, 30, 45, 60, 90, 180])) for j in range(rng.randint(1, 300))]
+            for prefer_mornings in (False, True):
+                bfd_schedule = ConferenceSchedule(prefer_mornings=prefer_mornings)
+                bfd_schedule.add_talks(talks)
+                numpy_schedule = ConferenceSchedule(prefer_mornings=prefer_mornings, engine="numpy")
+                numpy_schedule.add_talks(talks)
+                self.assertEqual("%s" % bfd_schedule, "%s" % numpy_schedule)
+
+    @unittest.skipIf(numpy is None, "NumPy isn't installed")
+    def test_packing_runs_of_talks(self):
+        self.assertEqual([([(60, 3, 0)], [(60, 4, 1)]), ([(30, 1, 2)], [])], pack_duration_counts_numpy({60: 7, 30: 1}))
+        self.assertEqual([], pack_duration_counts_numpy({}))
+
+    @unittest.skipIf(numpy is None, "NumPy isn't installed")
+    def test_random_duration_counts(self):
+        rng = random.Random(1234)
+        durations = [0, 5, 10, 15, 25, 30, 35, 45, 50, 60, 70, 90, 100, 120, 150, 170, 180]
+        for i in range(500):
+            choices = rng.sample(durations, rng.randint(1, 8))
+            duration_counts = {}
+            for j in range(rng.randint(0, rng.choice([5, 50, 500]))):
+                duration = rng.choice(choices)
+                duration_counts[duration] = duration_counts.get(duration, 0) + 1
+            for prefer_mornings in (False, True):
+                self.assertEqual(
+                    pack_duration_counts(duration_counts, prefer_mornings=prefer_mornings),
+                    pack_duration_counts_numpy(duration_counts, prefer_mornings=prefer_mornings)
+                )
+
+
+if __name__ == '__main__':
+    unittest.main()
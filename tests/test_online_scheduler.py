@@ -0,0 +1,63 @@
+"""Test cases for scheduling talks online, as they arrive."""
+
+import io
+import unittest
+from sort_talks import ConferenceSchedule, OnlineScheduler, Talk, TRACK_DURATION, read_talks
+from tests.helpers import make_talks
+
+
+class TestOnlineScheduler(unittest.TestCase):
+    def test_scheduling_talks(self):
+        talks = make_talks(1000, 1)
+        for max_open_tracks in (1, 3, 8):
+            scheduler = OnlineScheduler(max_open_tracks=max_open_tracks)
+            tracks = []
+            for talk in talks:
+                tracks.extend(scheduler.add_talk(talk))
+                self.assertLessEqual(len(scheduler.open_tracks), max_open_tracks)
+            tracks.extend(scheduler.finish())
+
+            self.assertEqual(list(range(1, len(tracks) + 1)), [track.track_no for track in tracks])
+            scheduled = sorted(
+                title
+                for track in tracks
+                for session in (track.morning_session, track.afternoon_session)
+                for title in session.talk_titles
+            )
+            self.assertEqual(sorted(talk.title for talk in talks), scheduled)
+            for track in tracks:
+                for session in (track.morning_session, track.afternoon_session):
+                    self.assertLessEqual(session.used_time, session.total_time)
+
+    def test_comparing_with_offline_bfd(self):
+        talks = make_talks(500, 2)
+        scheduler = OnlineScheduler()
+        tracks = list(scheduler.schedule(iter(talks)))
+        schedule = ConferenceSchedule()
+        schedule.add_talks(talks)
+
+        comparison = scheduler.compare_with_offline()
+        self.assertEqual(len(tracks), comparison["tracks"])
+        self.assertEqual(sum(track.get_wasted_time() for track in tracks), comparison["wasted_time"])
+        self.assertEqual(len(schedule.tracks), comparison["offline_tracks"])
+        self.assertEqual(schedule.get_wasted_time(), comparison["offline_wasted_time"])
+        self.assertEqual(-(-sum(talk.duration for talk in talks) // TRACK_DURATION), comparison["min_tracks"])
+        self.assertGreaterEqual(comparison["tracks"], comparison["min_tracks"])
+
+    def test_reindexing(self):
+        talks = make_talks(2000, 3)
+        scheduler = OnlineScheduler()
+        expected = [str(track.morning_session) for track in scheduler.schedule(talks)]
+        scheduler = OnlineScheduler()
+        scheduler.REINDEX_INTERVAL = 20
+        self.assertEqual(expected, [str(track.morning_session) for track in scheduler.schedule(talks)])
+
+    def test_reading_talks_from_a_stream(self):
+        talks = list(read_talks(io.StringIO("A talk 30min\n\nAnother talk lightning\n"), share_titles=False))
+        self.assertEqual([("A talk", 30), ("Another talk", 5)], [(talk.title, talk.duration) for talk in talks])
+        with self.assertRaises(Exception):
+            OnlineScheduler().add_talk(Talk("Too long", 300))
+
+
+if __name__ == '__main__':
+    unittest.main()
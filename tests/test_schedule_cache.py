@@ -0,0 +1,99 @@
+"""Test cases for the on-disk schedule cache."""
+
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from sort_talks import ConferenceSchedule, PackingRecorder, ScheduleCache, Talk, main, pack_duration_counts
+
+TESTS_PATH = os.path.dirname(os.path.abspath(__file__))
+
+
+def schedule_contents(schedule):
+    return [
+        [(talk.title, talk.duration) for talk in session.talks]
+        for session in schedule.get_all_sessions()
+    ]
+
+
+class TestScheduleCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp_dir.name, "cache")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_keys(self):
+        key = ScheduleCache.make_key({60: 2, 30: 1}, mode="bfd", prefer_mornings=False)
+        self.assertEqual(key, ScheduleCache.make_key({30: 1, 60: 2}, prefer_mornings=False, mode="bfd"))
+        self.assertNotEqual(key, ScheduleCache.make_key({30: 1, 60: 2}, prefer_mornings=True, mode="bfd"))
+        self.assertNotEqual(key, ScheduleCache.make_key({30: 2, 60: 1}, prefer_mornings=False, mode="bfd"))
+
+    def test_storing_and_loading_packings(self):
+        cache = ScheduleCache(self.cache_dir)
+        duration_counts = {60: 5, 45: 3, 5: 2}
+        packing = pack_duration_counts(duration_counts)
+        key = ScheduleCache.make_key(duration_counts)
+        self.assertIsNone(cache.get(key, duration_counts))
+        cache.put(key, packing)
+        self.assertEqual(packing, cache.get(key, duration_counts))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+        # a packing for different durations isn't used
+        self.assertIsNone(cache.get(key, {60: 5, 45: 3}))
+        # nor is a corrupt entry
+        with open(cache.get_filename(key), "wt") as outf:
+            outf.write("{\"packing\": [[")
+        self.assertIsNone(cache.get(key, duration_counts))
+        # no temporary files are left behind
+        self.assertEqual(["%s.json" % key], os.listdir(self.cache_dir))
+
+    def test_evicting_least_recently_used_entries(self):
+        cache = ScheduleCache(self.cache_dir)
+        keys = []
+        for i in range(4):
+            duration_counts = {60: i + 1}
+            keys.append(ScheduleCache.make_key(duration_counts))
+            cache.put(keys[-1], pack_duration_counts(duration_counts))
+            os.utime(cache.get_filename(keys[-1]), (1000 + i, 1000 + i))
+        # reading the first entry makes it the most recently used one
+        self.assertIsNotNone(cache.get(keys[0], {60: 1}))
+        sizes = dict([(key, os.path.getsize(cache.get_filename(key))) for key in keys])
+        cache.max_bytes = sizes[keys[0]] + sizes[keys[3]]
+        cache.evict()
+        self.assertEqual(
+            sorted(["%s.json" % keys[0], "%s.json" % keys[3]]),
+            sorted(os.listdir(self.cache_dir))
+        )
+
+    def test_recorded_packings_reproduce_schedules(self):
+        rng = random.Random(5)
+        for engine in ("bfd", "multiset"):
+            for prefer_mornings in (False, True):
+                for _ in range(10):
+                    talks = [Talk("Talk %d" % i, rng.choice([5, 15, 30, 45, 60])) for i in range(rng.randint(1, 100))]
+                    recorder = PackingRecorder()
+                    schedule = ConferenceSchedule(prefer_mornings=prefer_mornings, engine=engine, hooks=recorder)
+                    schedule.add_talks(talks)
+
+                    cached = ConferenceSchedule(prefer_mornings=prefer_mornings)
+                    cached.apply_packing(recorder.get_packing(schedule), talks)
+                    self.assertEqual(schedule_contents(schedule), schedule_contents(cached))
+
+    def test_seeded_schedules_only(self):
+        # schedules from random restarts are only cached if they can be found
+        # again, i.e. if the seed was given
+        input_file = os.path.join(TESTS_PATH, "..", "testcase1.txt")
+        for seed_args, entries in (([], 0), (["--seed", "1"], 1)):
+            argv = ["sort_talks.py", "--cache-dir", self.cache_dir, "--restarts", "2"] + seed_args + [input_file]
+            with mock.patch.object(sys, "argv", argv), contextlib.redirect_stdout(io.StringIO()):
+                main()
+            self.assertEqual(entries, len(os.listdir(self.cache_dir)) if os.path.exists(self.cache_dir) else 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""Test cases for incrementally editing schedules."""
+
+import io
+import os
+import random
+import tempfile
+import unittest
+from sort_talks import ConferenceSchedule, ScheduleEditor, Talk, read_schedule, write_schedule
+
+
+def make_schedule(talks):
+    schedule = ConferenceSchedule()
+    schedule.add_talks(talks)
+    return schedule
+
+
+class TestScheduleEditor(unittest.TestCase):
+    def test_withdrawing_talks(self):
+        schedule = make_schedule([Talk("A", 60), Talk("B", 60), Talk("C", 30), Talk("D", 30)])
+        self.assertEqual(["A", "B", "C", "D"], schedule.tracks[0].morning_session.talk_titles)
+        editor = ScheduleEditor(schedule)
+        self.assertEqual("B", editor.withdraw("B").title)
+        self.assertIsNone(editor.withdraw("B"))
+        self.assertIsNone(editor.withdraw("C", 45))
+
+        self.assertEqual(["A", "C", "D"], schedule.tracks[0].morning_session.talk_titles)
+        self.assertEqual(
+            [
+                ("withdrawn", "B", 60, (1, 600), None),
+                ("moved", "C", 30, (1, 660), (1, 600)),
+                ("moved", "D", 30, (1, 690), (1, 630))
+            ],
+            editor.get_changes()
+        )
+        self.assertEqual(
+            [
+                "- Track 1 10:00AM B 60min",
+                "~ Track 1 11:00AM -> Track 1 10:00AM C 30min",
+                "~ Track 1 11:30AM -> Track 1 10:30AM D 30min",
+                "~ Networking Event 04:00PM -> 03:00PM"
+            ],
+            editor.format_changes()
+        )
+
+    def test_withdrawing_the_last_talks(self):
+        schedule = make_schedule([Talk("Talk %d" % i, 60) for i in range(8)])
+        self.assertEqual(2, len(schedule.tracks))
+        editor = ScheduleEditor(schedule)
+        last_track = schedule.tracks[1]
+        titles = last_track.morning_session.talk_titles + last_track.afternoon_session.talk_titles
+        for title in titles:
+            editor.withdraw(title)
+        self.assertEqual(1, len(schedule.tracks))
+        self.assertEqual(
+            sorted(titles),
+            sorted(change[1] for change in editor.get_changes() if change[0] == "withdrawn")
+        )
+        self.assertEqual(len(titles), len(editor.get_changes()))
+
+    def test_inserting_talks(self):
+        schedule = make_schedule([Talk("Talk %d" % i, 60) for i in range(6)] + [Talk("Short", 30)])
+        editor = ScheduleEditor(schedule)
+        # only the afternoon session has any space left
+        session = editor.insert(Talk("Filler", 30))
+        self.assertIs(schedule.tracks[0].afternoon_session, session)
+        # no space anywhere
+        session = editor.insert(Talk("Long", 60))
+        self.assertEqual(2, len(schedule.tracks))
+        self.assertEqual(
+            [
+                ("added", "Filler", 30, None, (1, 990)),
+                ("added", "Long", 60, None, (2, 540))
+            ],
+            editor.get_changes()
+        )
+
+    def test_updating_schedules(self):
+        rng = random.Random(3)
+        talks = [Talk("Talk %d" % i, rng.choice([5, 15, 30, 45, 60])) for i in range(200)]
+        schedule = make_schedule(talks)
+        editor = ScheduleEditor(schedule)
+        editor.update(talks)
+        self.assertEqual([], editor.get_changes())
+
+        updated_talks = talks[5:] + [Talk("New %d" % i, 30) for i in range(3)]
+        editor.update(updated_talks)
+        self.assertEqual((5, 3), (editor.withdrawn, editor.inserted))
+        scheduled = sorted(
+            (title, duration)
+            for session in schedule.get_all_sessions()
+            for title, duration in zip(session.talk_titles, session.talk_durations)
+        )
+        self.assertEqual(sorted((talk.title, talk.duration) for talk in updated_talks), scheduled)
+        # only the talks in the edited sessions can have moved
+        self.assertLessEqual(len(editor.get_changes()), 8 + sum(
+            session.get_talk_count() for session in editor.original_sessions
+        ))
+        self.assertEqual(
+            set(["Talk %d" % i for i in range(5)]),
+            set(change[1] for change in editor.get_changes() if change[0] == "withdrawn")
+        )
+
+    def test_reading_schedules(self):
+        rng = random.Random(5)
+        schedule = make_schedule([Talk("Talk %d" % i, rng.choice([5, 15, 30, 45, 60])) for i in range(100)])
+        outf = io.StringIO()
+        write_schedule(schedule, outf, format="json")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "schedule.json")
+            with open(filename, "wt", encoding="utf-8") as f:
+                f.write(outf.getvalue())
+            self.assertEqual(str(schedule), str(read_schedule(filename)))
+
+            with open(filename, "wt", encoding="utf-8") as f:
+                f.write('{"tracks": [{"morning": [{"title": "Too long", "duration": 240}], "afternoon": []}]}')
+            with self.assertRaises(Exception):
+                read_schedule(filename)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -26,3 +26,12 @@ class TestConferenceScheduleFunctionality(unittest.TestCase):
         self.assertEqual(2, len(schedule.tracks))
         self.assertEqual(0, schedule.tracks[0].get_wasted_time())
         self.assertEqual(0, schedule.tracks[1].get_wasted_time())
+
+    def test_adding_tracks_when_out_of_space(self):
+        # the estimated single track can only fit 7 of these talks
+        schedule = ConferenceSchedule()
+        schedule.add_talks([Talk("Talk %d" % i, 50) for i in range(8)])
+
+        self.assertEqual(2, len(schedule.tracks))
+        self.assertEqual([1, 2], [track.track_no for track in schedule.tracks])
+        self.assertEqual(2*420 - 8*50, schedule.get_wasted_time())
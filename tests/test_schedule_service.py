@@ -0,0 +1,140 @@
+"""Test cases for the HTTP/JSON scheduling service."""
+
+import asyncio
+import concurrent.futures
+import http.client
+import json
+import threading
+import time
+import unittest
+from sort_talks import ConferenceSchedule, ScheduleService, ServiceError, Talk
+
+
+def make_talks(durations):
+    return [Talk("Talk %d" % i, duration) for i, duration in enumerate(durations)]
+
+
+class TestScheduleService(unittest.TestCase):
+    def make_service(self, **kwargs):
+        service = ScheduleService(executor=concurrent.futures.ThreadPoolExecutor(max_workers=2), **kwargs)
+        self.addCleanup(service.close)
+        return service
+
+    def test_coalescing_requests(self):
+        service = self.make_service()
+        first_talks = make_talks([60, 30, 45, 60, 5])
+        # the same durations, in a different order
+        second_talks = make_talks([5, 60, 60, 45, 30])
+
+        async def schedule_both():
+            return await asyncio.gather(service.schedule(first_talks), service.schedule(second_talks))
+
+        schedules = asyncio.run(schedule_both())
+        self.assertEqual(1, service.coalesced)
+        for talks, schedule in zip((first_talks, second_talks), schedules):
+            expected = ConferenceSchedule()
+            expected.add_talks(talks)
+            self.assertEqual(str(expected), str(schedule))
+        self.assertEqual({}, service.in_flight)
+
+    def test_limiting_requests(self):
+        service = self.make_service(max_queue=1)
+
+        async def schedule_both():
+            return await asyncio.gather(
+                service.schedule(make_talks([60, 30])),
+                service.schedule(make_talks([45])),
+                return_exceptions=True
+            )
+
+        first, second = asyncio.run(schedule_both())
+        self.assertIsInstance(first, ConferenceSchedule)
+        self.assertIsInstance(second, ServiceError)
+        self.assertEqual(503, second.status)
+        self.assertEqual(1, service.rejected)
+
+        service = self.make_service(request_timeout=0)
+        with self.assertRaises(ServiceError) as context:
+            asyncio.run(service.schedule(make_talks([60, 30])))
+        self.assertEqual(504, context.exception.status)
+        self.assertEqual(1, service.timeouts)
+
+    def test_request_timeout(self):
+        # the timeout covers parsing the request and writing out the
+        # schedule (which happen in the request executor), not just the
+        # packing
+        request_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        service = self.make_service(request_timeout=0.05, request_executor=request_executor)
+        request_executor.submit(time.sleep, 0.5)
+        body = json.dumps({"talks": ["Keynote 60min"]}).encode("utf-8")
+        status, response = asyncio.run(service.handle_request("POST", "/schedule", body))
+        self.assertEqual(504, status)
+        self.assertEqual(1, service.timeouts)
+
+    def test_pruning_completion_times(self):
+        service = self.make_service()
+        # completion times from long ago are forgotten as requests finish,
+        # even if nothing asks for the metrics
+        service.completion_times.extend([time.monotonic() - 2*service.THROUGHPUT_WINDOW]*100)
+        body = json.dumps({"talks": ["Keynote 60min"]}).encode("utf-8")
+        status, _ = asyncio.run(service.handle_request("POST", "/schedule", body))
+        self.assertEqual(200, status)
+        self.assertEqual(1, len(service.completion_times))
+
+    def test_http_requests(self):
+        service = ScheduleService(workers=1)
+        self.addCleanup(service.close)
+        service.warm_up()
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        server = asyncio.run_coroutine_threadsafe(service.start("127.0.0.1", 0), loop).result()
+        port = server.sockets[0].getsockname()[1]
+
+        async def shutdown():
+            # lets the connection handlers finish before the loop is closed
+            server.close()
+            await server.wait_closed()
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        def stop():
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+        self.addCleanup(stop)
+
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        self.addCleanup(connection.close)
+
+        def request(method, path, body=None):
+            connection.request(method, path, body=None if body is None else json.dumps(body))
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+
+        # all on the same connection
+        status, result = request("POST", "/schedule", {"talks": ["Keynote 60min", "Wrap-up lightning"]})
+        self.assertEqual(200, status)
+        self.assertEqual(1, result["tracks"])
+        self.assertEqual(
+            ["Keynote", "Wrap-up"],
+            [talk["title"] for talk in result["schedule"]["tracks"][0]["morning"]]
+        )
+        status, result = request("POST", "/schedule", {"talks": ["Keynote 60min", "Broken"]})
+        self.assertEqual(400, status)
+        self.assertIn("line 2", result["error"])
+        self.assertEqual(400, request("POST", "/schedule", "not an object")[0])
+        self.assertEqual(404, request("GET", "/nowhere")[0])
+        self.assertEqual(405, request("GET", "/schedule")[0])
+
+        status, metrics = request("GET", "/metrics")
+        self.assertEqual(200, status)
+        self.assertEqual(3, metrics["requests"])
+        self.assertEqual({"200": 1, "400": 2}, metrics["responses"])
+        self.assertIsNotNone(metrics["latency_ms"]["p99"])
+        self.assertGreater(metrics["throughput"]["overall"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
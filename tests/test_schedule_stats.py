@@ -0,0 +1,69 @@
+"""Test cases for the scheduling instrumentation hooks."""
+
+import contextlib
+import io
+import unittest
+from sort_talks import ConferenceSchedule, ScheduleHooks, ScheduleStats, SessionCapacityIndex, Talk
+
+
+class RecordingHooks(ScheduleHooks):
+    def __init__(self):
+        self.events = []
+
+    def talk_placed(self, session, talk):
+        self.events.append(("talk_placed", talk.title, session.track.track_no, session.is_morning_session))
+
+    def track_added(self, track, no_space):
+        self.events.append(("track_added", track.track_no, no_space))
+
+
+class TestScheduleStats(unittest.TestCase):
+    def test_counting(self):
+        stats = ScheduleStats()
+        schedule = ConferenceSchedule(hooks=stats)
+        # the estimated single track can only fit 7 of these talks
+        schedule.add_talks([Talk("Talk %d" % i, 50) for i in range(8)])
+
+        self.assertEqual(8, stats.talks_placed)
+        self.assertEqual(1, stats.tracks_estimated)
+        self.assertEqual(1, stats.tracks_added_no_space)
+        self.assertGreaterEqual(stats.sessions_scanned, stats.talks_placed)
+        self.assertEqual(["sort", "place"], list(stats.phase_times))
+        summary = stats.to_dict(schedule)
+        self.assertEqual(2, summary["tracks"])
+        self.assertEqual(schedule.get_wasted_time(), summary["wasted_time"])
+
+    def test_hooks(self):
+        hooks = RecordingHooks()
+        schedule = ConferenceSchedule(hooks=hooks)
+        # the estimated single track only has space for three of these talks
+        schedule.add_talks([Talk("Talk %d" % i, 100) for i in range(1, 5)])
+        self.assertEqual([
+            ("track_added", 1, False),
+            ("talk_placed", "Talk 1", 1, True),
+            ("talk_placed", "Talk 2", 1, False),
+            ("talk_placed", "Talk 3", 1, False),
+            ("track_added", 2, True),
+            ("talk_placed", "Talk 4", 2, True),
+        ], hooks.events)
+
+    def test_verbose_output(self):
+        for engine in ("bfd", "multiset"):
+            outf = io.StringIO()
+            with contextlib.redirect_stderr(outf):
+                schedule = ConferenceSchedule(verbose=True, engine=engine, hooks=ScheduleStats())
+                schedule.add_talks([Talk("Talk 1", 60), Talk("Talk 2", 30)])
+            self.assertEqual(
+                "Added talk \"Talk 1\" to morning session of track 1 (now only wasted 120 mins)\n" +
+                "Added talk \"Talk 2\" to morning session of track 1 (now only wasted 90 mins)\n",
+                outf.getvalue()
+            )
+
+    def test_no_instrumentation_without_hooks(self):
+        schedule = ConferenceSchedule()
+        self.assertIsNone(schedule.hooks)
+        self.assertIs(SessionCapacityIndex, type(schedule.session_index))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""Test cases for writing schedules out in different formats."""
+
+import csv
+import io
+import json
+import unittest
+from sort_talks import ConferenceSchedule, Talk, write_schedule
+
+
+def make_schedule():
+    schedule = ConferenceSchedule()
+    track = schedule.create_track()
+    track.morning_session.add_talk(Talk("Long Talk", 180))
+    for title in ("Afternoon Talk 1", "Afternoon Talk 2", "Afternoon Talk 3"):
+        track.afternoon_session.add_talk(Talk(title, 60))
+    track.afternoon_session.add_talk(Talk("Lightning Talk", 5))
+    schedule.create_track().morning_session.add_talk(Talk("Second Track Talk", 45))
+    return schedule
+
+
+def write(schedule, format):
+    outf = io.StringIO()
+    write_schedule(schedule, outf, format=format)
+    return outf.getvalue()
+
+
+class TestScheduleWriters(unittest.TestCase):
+    def test_text_format(self):
+        schedule = make_schedule()
+        self.assertEqual("\n".join([
+            "",
+            "Track 1",
+            "",
+            "09:00AM Long Talk 180min",
+            "12:00PM Lunch",
+            "01:00PM Afternoon Talk 1 60min",
+            "02:00PM Afternoon Talk 2 60min",
+            "03:00PM Afternoon Talk 3 60min",
+            "04:00PM Lightning Talk lightning",
+            "04:05PM Networking Event",
+            "",
+            "Track 2",
+            "",
+            "09:00AM Second Track Talk 45min",
+            "12:00PM Lunch",
+            "04:05PM Networking Event",
+            "",
+            "",
+        ]), write(schedule, "text"))
+        self.assertEqual(write(schedule, "text"), str(schedule) + "\n\n")
+
+    def test_json_format(self):
+        document = json.loads(write(make_schedule(), "json"))
+        self.assertEqual("12:00PM", document["lunch"])
+        self.assertEqual("04:05PM", document["networking_event"])
+        self.assertEqual([1, 2], [track["track_no"] for track in document["tracks"]])
+        self.assertEqual(
+            [{"start": "09:00AM", "title": "Long Talk", "duration": 180}],
+            document["tracks"][0]["morning"]
+        )
+        self.assertEqual(
+            ["01:00PM", "02:00PM", "03:00PM", "04:00PM"],
+            [talk["start"] for talk in document["tracks"][0]["afternoon"]]
+        )
+        self.assertEqual([], document["tracks"][1]["afternoon"])
+
+    def test_csv_format(self):
+        rows = list(csv.reader(io.StringIO(write(make_schedule(), "csv"))))
+        self.assertEqual(["track_no", "session", "start", "title", "duration"], rows[0])
+        self.assertEqual(["1", "morning", "09:00AM", "Long Talk", "180"], rows[1])
+        self.assertEqual(["1", "lunch", "12:00PM", "Lunch", ""], rows[2])
+        self.assertEqual(["1", "networking", "04:05PM", "Networking Event", ""], rows[7])
+        self.assertEqual(
+            [["2", "morning", "09:00AM", "Second Track Talk", "45"],
+             ["2", "lunch", "12:00PM", "Lunch", ""],
+             ["2", "networking", "04:05PM", "Networking Event", ""]],
+            rows[8:]
+        )
+
+    def test_unknown_format(self):
+        with self.assertRaises(Exception):
+            write(make_schedule(), "xml")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+"""Test cases for the multi-restart schedule search."""
+
+import unittest
+from sort_talks import ConferenceSchedule, Talk, search_schedules
+from tests.helpers import make_talks
+
+DURATIONS = (5, 15, 30, 40, 45, 60, 90)
+
+
+class TestSearchSchedules(unittest.TestCase):
+    def test_never_worse_than_bfd(self):
+        talks = make_talks(200, 1, durations=DURATIONS)
+        bfd_schedule = ConferenceSchedule()
+        bfd_schedule.add_talks(talks)
+        schedule = search_schedules(talks, restarts=10, seed=7, both_strategies=True)
+        self.assertLessEqual(schedule.get_wasted_time(), bfd_schedule.get_wasted_time())
+        self.assertEqual(
+            sorted(talk.title for talk in talks),
+            sorted(talk.title for session in schedule.get_all_sessions() for talk in session.talks)
+        )
+
+    def test_deterministic_regardless_of_workers(self):
+        talks = make_talks(150, 2, durations=DURATIONS)
+        schedule = search_schedules(talks, restarts=6, seed=11, both_strategies=True)
+        self.assertEqual("%s" % schedule, "%s" % search_schedules(talks, restarts=6, seed=11, both_strategies=True))
+        self.assertEqual(
+            "%s" % schedule,
+            "%s" % search_schedules(talks, restarts=6, workers=2, seed=11, both_strategies=True)
+        )
+
+    def test_single_restart_is_bfd(self):
+        talks = make_talks(100, 3, durations=DURATIONS)
+        bfd_schedule = ConferenceSchedule()
+        bfd_schedule.add_talks(talks)
+        self.assertEqual("%s" % bfd_schedule, "%s" % search_schedules(talks, seed=5))
@@ -0,0 +1,75 @@
+"""Test cases to ensure that the session capacity index picks the same
+sessions as a linear scan through all of the sessions would."""
+
+import random
+import unittest
+from sort_talks import ConferenceSchedule, SessionCapacityIndex, Talk, TalkSession, TRACK_DURATION
+
+
+def scan_best_fit_session(schedule, talk):
+    best_morning_session, best_afternoon_session = None, None
+    min_morning_wasted_time, min_afternoon_wasted_time = TRACK_DURATION, TRACK_DURATION
+    for session in schedule.get_all_sessions():
+        wasted_time = session.wasted_time - talk.duration
+        if session.is_morning_session:
+            if wasted_time >= 0 and wasted_time < min_morning_wasted_time:
+                best_morning_session, min_morning_wasted_time = session, wasted_time
+        elif wasted_time >= 0 and wasted_time < min_afternoon_wasted_time:
+            best_afternoon_session, min_afternoon_wasted_time = session, wasted_time
+    if best_morning_session and best_afternoon_session:
+        if best_afternoon_session.track.track_no < best_morning_session.track.track_no:
+            return best_afternoon_session
+    return best_morning_session or best_afternoon_session
+
+
+def scan_best_fit_session_prefer_mornings(schedule, talk):
+    best_session, min_wasted_time = None, TRACK_DURATION
+    for session in schedule.get_all_sessions():
+        wasted_time = session.wasted_time - talk.duration
+        if wasted_time >= 0 and wasted_time < min_wasted_time:
+            best_session, min_wasted_time = session, wasted_time
+    return best_session
+
+
+class TestSessionCapacityIndex(unittest.TestCase):
+    def test_best_fit_prefers_least_capacity_then_earliest_track(self):
+        index = SessionCapacityIndex()
+        sessions = [TalkSession(True) for i in range(3)]
+        for track_no, session in enumerate(sessions, 1):
+            index.add(session, track_no)
+        sessions[2].add_talk(Talk("Talk 1", 60))
+        sessions[1].add_talk(Talk("Talk 2", 60))
+        self.assertIs(sessions[1], index.best_fit(30, True))
+        self.assertIs(sessions[0], index.best_fit(150, True))
+        self.assertIsNone(index.best_fit(200, True))
+        self.assertIsNone(index.best_fit(30, False))
+
+    def test_removed_sessions_are_ignored(self):
+        index = SessionCapacityIndex()
+        first, second = TalkSession(False), TalkSession(False)
+        index.add(first, 1)
+        index.add(second, 2)
+        index.remove(first)
+        self.assertIs(second, index.best_fit(60, False))
+        self.assertEqual(1, len(index))
+        # changes to sessions outside of the index shouldn't affect it
+        first.add_talk(Talk("Talk 1", 60))
+        self.assertIs(second, index.best_fit(60, False))
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(1234)
+        for prefer_mornings in (False, True):
+            scan = scan_best_fit_session_prefer_mornings if prefer_mornings else scan_best_fit_session
+            for i in range(20):
+                talks = [Talk("Talk %d" % j, rng.choice([5, 15, 30, 40, 45, 60])) for j in range(rng.randint(1, 200))]
+                schedule = ConferenceSchedule(prefer_mornings=prefer_mornings)
+                for track in range(rng.randint(1, 10)):
+                    schedule.create_track()
+                for talk in sorted(talks, key=lambda talk: -talk.duration):
+                    session = schedule.find_best_fit_session_prefer_mornings(talk) \
+                        if prefer_mornings else schedule.find_best_fit_session(talk)
+                    self.assertIs(scan(schedule, talk), session)
+                    if session is None:
+                        schedule.create_track()
+                        session = scan(schedule, talk)
+                    self.assertTrue(session.add_talk(talk))
@@ -0,0 +1,66 @@
+"""Test cases for packing a conference in shards."""
+
+import unittest
+from array import array
+from sort_talks import DEFAULT_DAY_TEMPLATE, ConferenceSchedule, DayTemplate, ScheduleStats, schedule_sharded
+from sort_talks import find_shard_tail, schedule_shard, split_duration_counts
+from tests.helpers import make_talks
+
+
+class TestSharding(unittest.TestCase):
+    def test_splitting_duration_counts(self):
+        duration_counts = {5: 7, 30: 10, 60: 3, 45: 1}
+        shard_counts = split_duration_counts(duration_counts, 3)
+        self.assertEqual(3, len(shard_counts))
+        for duration, count in duration_counts.items():
+            self.assertEqual(count, sum([counts.get(duration, 0) for counts in shard_counts]))
+        totals = [sum([duration*count for duration, count in counts.items()]) for counts in shard_counts]
+        self.assertLessEqual(max(totals) - min(totals), 60)
+
+    def test_finding_shard_tails(self):
+        self.assertEqual(4, find_shard_tail([0, 0, 300, 10, 200]))
+        self.assertEqual(2, find_shard_tail([0, 50, 300, 200]))
+        self.assertEqual(0, find_shard_tail([100]))
+        self.assertEqual(0, find_shard_tail([]))
+
+    def test_scheduling_shard(self):
+        titles = {60: ["Hour %d" % i for i in range(8)], 30: ["Half %d" % i for i in range(3)]}
+        track_states, tail_titles, tail_tracks = schedule_shard((titles, False, DEFAULT_DAY_TEMPLATE, "bfd"))
+        # the first track is full, and the second one is the tail
+        self.assertEqual(1, tail_tracks)
+        self.assertEqual([
+            ((("Hour 0", "Hour 1", "Hour 2"), bytes(array('H', [60]*3)), 180),
+             (("Hour 3", "Hour 4", "Hour 5", "Hour 6"), bytes(array('H', [60]*4)), 240))
+        ], track_states)
+        self.assertEqual({60: ["Hour 7"], 30: ["Half 0", "Half 1", "Half 2"]}, tail_titles)
+        self.assertEqual((track_states, tail_titles, tail_tracks),
+                         schedule_shard((titles, False, DEFAULT_DAY_TEMPLATE, "multiset")))
+
+    def test_scheduling_in_shards(self):
+        talks = make_talks(5000, 1)
+        for prefer_mornings in (False, True):
+            expected = ConferenceSchedule(prefer_mornings=prefer_mornings)
+            expected.add_talks(talks)
+            for engine in ("bfd", "multiset"):
+                schedule = schedule_sharded(talks, 4, prefer_mornings=prefer_mornings, engine=engine)
+                self.assertEqual(
+                    sorted(talk.title for talk in talks),
+                    sorted(title for session in schedule.get_all_sessions() for title in session.talk_titles)
+                )
+                self.assertEqual(list(range(1, len(schedule.tracks) + 1)), [track.track_no for track in schedule.tracks])
+                # the loss is limited to the repacked tails
+                self.assertLessEqual(len(schedule.tracks), len(expected.tracks) + 1)
+                self.assertEqual(str(schedule), str(ConferenceSchedule.copy_of(schedule)))
+                # the talks that were scheduled in the shards are reported too
+                stats = ScheduleStats()
+                schedule_sharded(talks, 4, prefer_mornings=prefer_mornings, engine=engine, hooks=stats)
+                self.assertEqual(len(talks), stats.talks_placed)
+
+    def test_workers_and_templates(self):
+        talks = make_talks(2000, 2)
+        template = DayTemplate(start_hour=10, lunch_start_hour=12, lunch_end_hour=13, networking_start_hour_min=15,
+                               networking_start_hour_max=16)
+        schedule = schedule_sharded(talks, 3, template=template)
+        self.assertIs(template, schedule.template)
+        self.assertEqual(str(schedule), str(schedule_sharded(talks, 3, workers=2, template=template)))
+        self.assertTrue(str(schedule).startswith("\nTrack 1\n\n10:00AM "))
@@ -0,0 +1,100 @@
+"""Test cases for schedule snapshots."""
+
+import random
+import unittest
+from sort_talks import ConferenceSchedule, LocalSearch, ScheduleSnapshot, Talk
+from tests.helpers import make_talks
+
+
+def schedule_contents(schedule):
+    return [
+        (track.track_no, [(talk.title, talk.duration, talk.start_time) for talk in session.talks])
+        for track in schedule.tracks
+        for session in (track.morning_session, track.afternoon_session)
+    ]
+
+
+class TestScheduleSnapshots(unittest.TestCase):
+    def assertRestores(self, schedule, snapshot, expected):
+        schedule.restore(snapshot)
+        self.assertEqual(expected, schedule_contents(schedule))
+        self.assertEqual(len(schedule.tracks) + 1, schedule.next_track_no)
+        # the index should agree with the restored sessions
+        self.assertEqual(2*len(schedule.tracks), len(schedule.session_index))
+        for session in schedule.get_all_sessions():
+            self.assertEqual(session.total_time - session.used_time, session.wasted_time)
+        reindexed = ConferenceSchedule.copy_of(schedule)
+        for talk in [Talk("New talk", duration) for duration in (5, 60, 240)]:
+            session = schedule.find_best_fit_session(talk)
+            expected_session = reindexed.find_best_fit_session(talk)
+            self.assertEqual(
+                None if expected_session is None else (expected_session.track.track_no, expected_session.is_morning_session),
+                None if session is None else (session.track.track_no, session.is_morning_session)
+            )
+
+    def test_snapshots_share_unchanged_tracks(self):
+        schedule = ConferenceSchedule()
+        schedule.add_talks(make_talks(1000, 1))
+        first = schedule.snapshot()
+        schedule.tracks[0].morning_session.remove_talk_at(0)
+        second = schedule.snapshot()
+
+        self.assertEqual(first.track_count, second.track_count)
+        self.assertIsNot(first.chunks[0], second.chunks[0])
+        self.assertIs(first.chunks[1], second.chunks[1])
+        self.assertIsNot(first.get_track_state(0), second.get_track_state(0))
+        for position in range(1, first.track_count):
+            self.assertIs(first.get_track_state(position), second.get_track_state(position))
+        self.assertEqual([0], first.differences(second))
+        # nothing has changed since the last snapshot
+        self.assertEqual([], second.differences(schedule.snapshot()))
+
+    def test_restoring_after_local_search(self):
+        rng = random.Random(7)
+        for _ in range(20):
+            schedule = ConferenceSchedule()
+            schedule.add_talks(make_talks(rng.randint(1, 300), rng))
+            snapshots = []
+            local_search = LocalSearch(schedule, seed=rng.randrange(1000))
+            for _ in range(5):
+                snapshots.append((schedule.snapshot(), schedule_contents(schedule)))
+                local_search.run(1.0, max_iterations=local_search.iterations + rng.randint(1, 50))
+            # restore the snapshots in a random order, with changes in between
+            rng.shuffle(snapshots)
+            for snapshot, expected in snapshots:
+                self.assertRestores(schedule, snapshot, expected)
+                session = rng.choice(list(schedule.get_all_sessions()))
+                if session.get_talk_count():
+                    session.remove_talk_at(0)
+
+    def test_restoring_removed_and_added_tracks(self):
+        schedule = ConferenceSchedule()
+        for i in range(ScheduleSnapshot.CHUNK_SIZE + 3):
+            schedule.create_track().afternoon_session.add_talk(Talk("Talk %d" % i, 60))
+        snapshot = schedule.snapshot()
+        expected = schedule_contents(schedule)
+
+        for _ in range(5):
+            schedule.tracks[-1].afternoon_session.remove_talk_at(0)
+            schedule.remove_last_track()
+        schedule.create_track().morning_session.add_talk(Talk("Another talk", 30))
+        smaller = schedule.snapshot()
+        smaller_expected = schedule_contents(schedule)
+        self.assertEqual(ScheduleSnapshot.CHUNK_SIZE - 1, smaller.track_count)
+
+        self.assertRestores(schedule, snapshot, expected)
+        self.assertRestores(schedule, smaller, smaller_expected)
+        schedule.create_track()
+        self.assertRestores(schedule, snapshot, expected)
+
+    def test_snapshots_after_rescheduling(self):
+        schedule = ConferenceSchedule()
+        schedule.add_talks(make_talks(100, 3))
+        snapshot = schedule.snapshot()
+        expected = schedule_contents(schedule)
+        schedule.add_talks(make_talks(50, 4))
+        self.assertRestores(schedule, snapshot, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
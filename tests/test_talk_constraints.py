@@ -0,0 +1,103 @@
+"""Test cases for scheduling talks with speaker and track constraints."""
+
+import os
+import random
+import tempfile
+import unittest
+from sort_talks import ConferenceSchedule, OnlineScheduler, Talk, TalkConstraints, read_talk_catalog
+
+
+def make_constrained_talks(count, seed):
+    """Makes talks with unique titles, where each speaker gives three talks
+    (except for the first 60 talks, which are in groups of three that must
+    share a track, and have speakers of their own), and some of the rest have
+    apart tags."""
+    rng = random.Random(seed)
+    talks = []
+    for i in range(count):
+        if i < 60:
+            speakers, together = ["group speaker %d" % i], ["group %d" % (i % 20)]
+        else:
+            speakers, together = ["speaker %d" % (i // 3)], []
+        apart = ["panel %d" % rng.randrange(5)] if i >= 60 and rng.random() < 0.2 else []
+        constraints = TalkConstraints(speakers, together, apart)
+        talks.append(Talk("Talk %d" % i, rng.choice([15, 30, 45, 60]), constraints=constraints))
+    return talks
+
+
+class TestTalkConstraints(unittest.TestCase):
+    def assertConstraintsHold(self, schedule, talks):
+        talks_by_title = dict([(talk.title, talk) for talk in talks])
+        speaker_times, together_tracks, apart_tracks = {}, {}, {}
+        for track in schedule.tracks:
+            for session in (track.morning_session, track.afternoon_session):
+                for talk in session.talks:
+                    constraints = talks_by_title[talk.title].constraints
+                    start_time = session.start_hour*60 + talk.start_time
+                    for speaker in constraints.speakers:
+                        for other_start_time, other_end_time in speaker_times.get(speaker, []):
+                            self.assertFalse(start_time < other_end_time and other_start_time < start_time + talk.duration)
+                        speaker_times.setdefault(speaker, []).append((start_time, start_time + talk.duration))
+                    for tag in constraints.together:
+                        self.assertIs(together_tracks.setdefault(tag, track), track)
+                    for tag in constraints.apart:
+                        self.assertNotIn(track, apart_tracks.get(tag, []))
+                        apart_tracks.setdefault(tag, []).append(track)
+
+    def test_parsing_constraints(self):
+        talk = Talk.parse("Scaling Rails 60min | speaker=Jane Doe, John Roe; together=rails; apart=keynotes, panels")
+        self.assertEqual("Scaling Rails", talk.title)
+        self.assertEqual(60, talk.duration)
+        self.assertEqual(("Jane Doe", "John Roe"), talk.constraints.speakers)
+        self.assertEqual(("rails",), talk.constraints.together)
+        self.assertEqual(("keynotes", "panels"), talk.constraints.apart)
+        # titles can still contain the separator
+        talk = Talk.parse("Rails | Django 30min")
+        self.assertEqual("Rails | Django", talk.title)
+        self.assertIsNone(talk.constraints)
+        with self.assertRaises(Exception):
+            Talk.parse("Scaling Rails 60min | speakers=Jane Doe")
+
+    def test_reading_constraints_from_catalog(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "talks.txt")
+            with open(filename, "wt", encoding="utf-8") as outf:
+                outf.write("Keynote 60min | speaker=Ada\nRails | Django 30min\nWrap-up lightning | apart=plenary\n")
+            talks = list(read_talk_catalog(filename))
+        self.assertEqual(["Keynote", "Rails | Django", "Wrap-up"], [talk.title for talk in talks])
+        self.assertEqual([60, 30, 5], [talk.duration for talk in talks])
+        self.assertEqual(("Ada",), talks[0].constraints.speakers)
+        self.assertIsNone(talks[1].constraints)
+        self.assertEqual(("plenary",), talks[2].constraints.apart)
+
+    def test_scheduling_with_constraints(self):
+        talks = make_constrained_talks(600, 1)
+        for prefer_mornings in (False, True):
+            schedule = ConferenceSchedule(prefer_mornings=prefer_mornings)
+            schedule.add_talks(talks)
+            self.assertConstraintsHold(schedule, talks)
+            scheduled = sorted(title for session in schedule.get_all_sessions() for title in session.talk_titles)
+            self.assertEqual(sorted(talk.title for talk in talks), scheduled)
+
+    def test_speaker_conflicts(self):
+        # without constraints, all three talks would start at 09:00AM
+        talks = [
+            Talk("A", 180, constraints=TalkConstraints(["Ada"])),
+            Talk("B", 180, constraints=TalkConstraints(["Ada"])),
+            Talk("C", 180, constraints=TalkConstraints(["Grace"]))
+        ]
+        schedule = ConferenceSchedule()
+        schedule.add_talks(talks)
+        self.assertEqual(["A"], schedule.tracks[0].morning_session.talk_titles)
+        self.assertEqual(["B"], schedule.tracks[0].afternoon_session.talk_titles)
+        self.assertEqual(["C"], schedule.tracks[1].morning_session.talk_titles)
+
+    def test_impossible_constraints(self):
+        talks = [Talk("Talk %d" % i, 60, constraints=TalkConstraints(together=["all"])) for i in range(8)]
+        with self.assertRaises(Exception):
+            ConferenceSchedule().add_talks(talks)
+        talks = [Talk("Talk %d" % i, 180, constraints=TalkConstraints(["Ada"])) for i in range(3)]
+        with self.assertRaises(Exception):
+            ConferenceSchedule().add_talks(talks)
+        with self.assertRaises(Exception):
+            OnlineScheduler().add_talk(talks[0])
@@ -1,8 +1,10 @@
 """Test cases to ensure talk-related functionality (parsing, setting of times)
 works as intended."""
 
+import os
+import tempfile
 import unittest
-from sort_talks import Talk, MAX_TALK_DURATION
+from sort_talks import Talk, TalkFileError, MAX_TALK_DURATION, read_talk_catalog, read_talks_from_file
 
 
 class TalkParsingTestCase(unittest.TestCase):
@@ -47,3 +49,50 @@ class TalkTimingTestCase(unittest.TestCase):
         self.assertEqual("12:30PM Sample Talk 30min", talk.to_string(12))
         talk.start_at(60)
         self.assertEqual("01:00PM Sample Talk 30min", talk.to_string(12))
+
+
+class TalkReadingTestCase(unittest.TestCase):
+    def read_talks(self, contents, reader=read_talks_from_file):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "talks.txt")
+            with open(filename, "wb") as outf:
+                outf.write(contents.encode("utf-8"))
+            return list(reader(filename))
+
+    def test_repeated_titles_are_shared(self):
+        talks = self.read_talks("Repeated Talk 30min\n\nOther Talk lightning\nRepeated Talk 45min\n")
+        self.assertEqual(["Repeated Talk", "Other Talk", "Repeated Talk"], [talk.title for talk in talks])
+        self.assertEqual([30, 5, 45], [talk.duration for talk in talks])
+        self.assertIs(talks[0].title, talks[2].title)
+
+    def test_reading_catalog(self):
+        contents = "\n".join([
+            "Repeated Talk 30min",
+            "",
+            "  Other  Talk lightning \t",
+            "Repeated Talk 45min\r",
+            "A Talk With a Trailing 60min 15min\r\n\n",
+        ])
+        talks = self.read_talks(contents, reader=read_talk_catalog)
+        self.assertEqual(
+            [(talk.title, talk.duration) for talk in self.read_talks(contents)],
+            [(talk.title, talk.duration) for talk in talks]
+        )
+        self.assertEqual(["Repeated Talk", "Other  Talk", "Repeated Talk"], [talk.title for talk in talks[:3]])
+        self.assertIs(talks[0].title, talks[2].title)
+        self.assertEqual([], self.read_talks("", reader=read_talk_catalog))
+        self.assertEqual([], self.read_talks(" \n\n", reader=read_talk_catalog))
+
+    def test_catalog_reports_all_invalid_lines(self):
+        contents = "\n".join([
+            "A Valid Talk 30min",
+            "NoDuration",
+            "",
+            "Invalid Duration 2hrs",
+            "Too Long %dmin" % (MAX_TALK_DURATION+1),
+            "Another Valid Talk lightning",
+        ])
+        with self.assertRaises(TalkFileError) as context:
+            self.read_talks(contents, reader=read_talk_catalog)
+        self.assertEqual([2, 4, 5], [line_no for line_no, _ in context.exception.errors])
+        self.assertIn("line 4: Invalid duration for talk: Invalid Duration 2hrs", str(context.exception))
@@ -48,3 +48,50 @@ class TestTalkSessionFunctionality(unittest.TestCase):
         self.assertEqual(120, session.wasted_time)
         session.add_talk(Talk("Talk 2", 45))
         self.assertEqual(75, session.wasted_time)
+
+    def test_removing_talks(self):
+        session = TalkSession(False)
+        session.add_talk(Talk("Talk 1", 60))
+        session.add_talk(Talk("Talk 2", 30))
+        session.add_talk(Talk("Talk 3", 45))
+        removed = session.remove_talk_at(1)
+        self.assertEqual("Talk 2", removed.title)
+        self.assertEqual(30, removed.duration)
+
+        # the gap should be closed
+        self.assertEqual(["Talk 1", "Talk 3"], [talk.title for talk in session.talks])
+        self.assertEqual(60, session.talks[1].start_time)
+        self.assertEqual(105, session.get_talk(-1).end_time)
+        self.assertEqual(105, session.used_time)
+        self.assertEqual(135, session.wasted_time)
+
+    def test_getting_talks(self):
+        session = TalkSession(True)
+        for i, duration in enumerate([30, 45, 15, 60]):
+            session.add_talk(Talk("Talk %d" % i, duration))
+        self.assertEqual([0, 30, 75, 90], [session.get_talk(i).start_time for i in range(4)])
+        self.assertEqual(90, session.get_talk(-1).start_time)
+        # the cached start times are worked out again after a change
+        session.remove_talk_at(1)
+        self.assertEqual([0, 30, 45], [session.get_talk(i).start_time for i in range(3)])
+        self.assertEqual("Talk 2", session.get_talk(1).title)
+
+    def test_talks_are_copies(self):
+        session = TalkSession(True)
+        talk = Talk("Talk 1", 60)
+        session.add_talk(talk)
+        self.assertEqual(0, talk.start_time)
+        # the talks can't be changed through the talks property
+        with self.assertRaises(AttributeError):
+            session.talks.append(Talk("Talk 2", 30))
+        self.assertIsNot(talk, session.talks[0])
+        self.assertEqual(1, session.get_talk_count())
+
+    def test_replacing_talks(self):
+        session = TalkSession(True)
+        session.add_talk(Talk("Talk 1", 60))
+        session.talks = [Talk("Talk 2", 30), Talk("Talk 3", 15)]
+        self.assertEqual(["Talk 2", "Talk 3"], [talk.title for talk in session.talks])
+        self.assertEqual(30, session.talks[1].start_time)
+        self.assertEqual(45, session.used_time)
+        self.assertEqual(2, session.get_talk_count())
@@ -1,7 +1,7 @@
 """Tests utility functions."""
 
 import unittest
-from sort_talks import minutes_to_friendly_time
+from sort_talks import friendly_time, minutes_to_friendly_time
 
 
 class TestUtilityFunctions(unittest.TestCase):
@@ -15,3 +15,8 @@ class TestUtilityFunctions(unittest.TestCase):
         self.assertEqual("03:00PM", minutes_to_friendly_time(0, 15))
         self.assertEqual("04:00PM", minutes_to_friendly_time(0, 16))
         self.assertEqual("05:00PM", minutes_to_friendly_time(0, 17))
+
+    def test_friendly_time(self):
+        for start_hour in range(0, 24):
+            for minutes in range(0, 300, 5):
+                self.assertEqual(minutes_to_friendly_time(minutes, start_hour), friendly_time(minutes, start_hour))